@@ -0,0 +1,188 @@
+"""Benchmarks EventManager's hot paths against a simulated guild.
+
+Each run seeds a guild with the given number of stored events (and matching scheduled events), then times
+loading them at startup, adding, editing and cancelling events, and autocompleting event names. Discord's
+side is a FakeGuild, which can be given a simulated API latency. Events are stored on disk, in a temporary
+folder, using the chosen storage mode.
+
+Results are written as JSON, so runs can be compared across releases:
+
+    python -m benchmarks.eventmanager_bench --sizes 100 10000 --storage journal --output results.json
+"""
+import argparse
+import asyncio
+import configparser
+import json
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from unittest.mock import patch
+
+from core import consts
+from core.eventmanager import EventManager
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.scheduledeventmirror import ScheduledEventMirror
+from core.storage.factory import create_storage
+from tests.fakeguild import FakeGuild, fake_context
+
+DEFAULT_SIZES = (100, 10_000, 1_000_000)
+GUILD_ID = 1
+VOICE_CHANNEL_ID = 1
+
+CONFIG = """[global]
+tz = UTC
+overlaps = allow
+
+[discord]
+voice_channel_id = {voice_channel_id}
+
+[storage]
+mode = {storage}
+format = {file_format}
+
+[queue]
+rate = 1000000
+per = 1
+"""
+
+
+def summarize(timings: list[float]) -> dict[str, float]:
+    timings = sorted(timings)
+
+    return {
+        'count': len(timings),
+        'mean': statistics.fmean(timings),
+        'median': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'p99': timings[min(len(timings) - 1, int(len(timings) * 0.99))],
+        'min': timings[0],
+        'max': timings[-1],
+    }
+
+
+def seed(config: configparser.ConfigParser, guild: FakeGuild, size: int, start: datetime):
+    """Stores size events an hour apart from start, each with a matching scheduled event in the guild."""
+    store = EventStore()
+
+    for i in range(size):
+        date = start + timedelta(hours=i)
+        scheduled_event = guild.add(f'Event {i:07d}', '', date, date + timedelta(hours=1), VOICE_CHANNEL_ID)
+        store.add(Event(scheduled_event.name, date, 1, VOICE_CHANNEL_ID, 0, 1, scheduled_event.id))
+
+    storage = create_storage(config, GUILD_ID)
+    storage.save_all(store)
+    storage.close()
+
+
+async def run_size(size: int, operations: int, latency: float, storage: str, file_format: str) -> dict:
+    with tempfile.TemporaryDirectory() as folder, patch.object(consts, 'cwd', return_value=Path(folder)):
+        config = configparser.ConfigParser()
+        config.read_string(CONFIG.format(voice_channel_id=VOICE_CHANNEL_ID, storage=storage,
+                                         file_format=file_format))
+        with open(Path(folder, 'config.ini'), 'w') as config_file:
+            config.write(config_file)
+
+        guild = FakeGuild(GUILD_ID, latency)
+        ctx = fake_context(guild)
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+        seed(config, guild, size, start)
+
+        result = {'size': size}
+
+        began = time.perf_counter()
+        event_manager = EventManager(config)
+        event_manager.load_guild(GUILD_ID)
+        result['startup'] = time.perf_counter() - began
+
+        # New events go after the seeded ones, so none of them collide.
+        first_date = start + timedelta(hours=size + 1)
+        names = [f'Benchmark Event {i}' for i in range(operations)]
+
+        timings = []
+        for i, name in enumerate(names):
+            began = time.perf_counter()
+            await event_manager.add_new_event(ctx, name, first_date + timedelta(hours=i))
+            timings.append(time.perf_counter() - began)
+        result['add'] = summarize(timings)
+
+        # Changes are written behind, so this is how long it takes for them all to reach the disk.
+        began = time.perf_counter()
+        await event_manager.flush(GUILD_ID)
+        result['flush'] = time.perf_counter() - began
+
+        timings = []
+        for i, name in enumerate(names):
+            began = time.perf_counter()
+            await event_manager.edit_event(ctx, name, None, first_date + timedelta(hours=i, minutes=30), None, 1)
+            timings.append(time.perf_counter() - began)
+        result['edit'] = summarize(timings)
+
+        timings = []
+        for name in names:
+            began = time.perf_counter()
+            await event_manager.delete_event(ctx, name)
+            timings.append(time.perf_counter() - began)
+        result['cancel'] = summarize(timings)
+
+        scheduled_events = ScheduledEventMirror()
+        began = time.perf_counter()
+        scheduled_events.rebuild(GUILD_ID, guild.scheduled_events)
+        result['autocomplete_rebuild'] = time.perf_counter() - began
+
+        prefixes = ['', 'e', 'Event 0', f'Event {size // 2:07d}', 'Missing']
+        timings = []
+        for i in range(operations):
+            began = time.perf_counter()
+            scheduled_events.complete(GUILD_ID, prefixes[i % len(prefixes)])
+            timings.append(time.perf_counter() - began)
+        result['autocomplete'] = summarize(timings)
+
+        event_manager.close()
+
+    return result
+
+
+async def run_benchmarks(sizes=DEFAULT_SIZES, operations: int = 20, latency: float = 0,
+                         storage: str = 'json', file_format: str = 'json') -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'storage': storage,
+        'format': file_format,
+        'latency': latency,
+        'operations': operations,
+        'results': [await run_size(size, operations, latency, storage, file_format) for size in sizes],
+    }
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Numbers of stored events to benchmark with.')
+    parser.add_argument('--operations', type=int, default=20,
+                        help='How many times to time each operation at each size.')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='Simulated Discord API latency, in seconds.')
+    parser.add_argument('--storage', choices=('json', 'journal', 'sqlite'), default='json')
+    parser.add_argument('--format', choices=('json', 'ndjson', 'msgpack'), default='json',
+                        help='Event file format, for the json storage mode.')
+    parser.add_argument('--output', help='File to write the results to (default stdout).')
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run_benchmarks(args.sizes, args.operations, args.latency, args.storage, args.format))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+"""Load tests the bot's slash command handlers by replaying a trace of interactions against a simulated guild.
+
+A trace is a JSONL file with one interaction per line, each due a number of seconds (at) after the replay
+starts. Each line runs a command's handler from main with the given options, or its autocomplete for the named
+option with the given value, as Discord would call them:
+
+    {"at": 0.5, "command": "newevent", "options": {"event_name": "Movie Night", "event_date": 26}}
+    {"at": 1.2, "command": "cancelevent", "autocomplete": "event_name", "value": "Mov"}
+    {"at": 1.4, "command": "cancelevent", "options": {"event_name": "Movie Night"}}
+
+An event_date given as a number is that many hours after the replay starts, so traces never go stale. Without
+a trace, a synthetic one is generated: a steady stream of new events, cancels typed a keystroke at a time into
+autocomplete, and regular bursts of new events at once.
+
+Interactions are started when they're due, whether or not earlier ones have finished, and their latency is
+measured from when they were due, so a backlog shows up in the latencies rather than slowing the replay down.
+Discord's side is a FakeGuild, which can be given a simulated API latency and a chance of answering each
+request with a 429; the gateway events it would send back are delivered to main's handlers after
+gateway_latency. Alongside each command's latencies, the results give how many of each failed, the throughput
+and how late the event loop ran a timer waking every 10ms. The handlers report failures in their responses
+rather than raising, so a newevent counts as failed unless its event ends up stored and scheduled, and a
+cancelevent unless an event it found is gone afterwards.
+
+Results are written as JSON, so runs can be compared across releases:
+
+    python -m benchmarks.load_bench --duration 60 --rate 5 --latency 0.1 --rate-limit 0.05 --output results.json
+    python -m benchmarks.load_bench --trace trace.jsonl --speed 2
+"""
+import argparse
+import asyncio
+import configparser
+import contextlib
+import io
+import json
+import platform
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from pathlib import Path
+from typing import Optional
+from unittest.mock import patch
+
+from benchmarks.eventmanager_bench import CONFIG, GUILD_ID, VOICE_CHANNEL_ID, seed, summarize
+from core import consts
+from core.eventmanager import EventManager
+from core.utils import config_utils
+from tests.fakeguild import FakeGuild, fake_context
+
+# How often the event loop lag is sampled, in seconds.
+LAG_INTERVAL = 0.01
+
+
+def generate_trace(duration: float = 30, rate: float = 5, burst_every: float = 10, burst_size: int = 20,
+                   seed: Optional[int] = None) -> list[dict]:
+    """Generates duration seconds of interactions, rate a second on average, with burst_size new events at
+    once every burst_every seconds."""
+    rng = random.Random(seed)
+    names = (f'Load Event {i:05d}' for i in count())
+    slots = count()
+    # Events created so far and not yet cancelled, with when they were created.
+    created: list[tuple[str, float]] = []
+    trace = []
+
+    def new_event(at: float):
+        name = next(names)
+        # Two hours apart from a day out, so none of them overlap.
+        trace.append({'at': at, 'command': 'newevent',
+                      'options': {'event_name': name, 'event_date': 24 + 2 * next(slots), 'hours': 1}})
+        created.append((name, at))
+
+    at = rng.expovariate(rate)
+    while at < duration:
+        # Only cancel events whose creation has had a second to finish.
+        cancellable = [i for i, (_, created_at) in enumerate(created) if created_at < at - 1]
+
+        if cancellable and rng.random() < 0.4:
+            name, _ = created.pop(rng.choice(cancellable))
+            # Type part of the name into autocomplete a keystroke at a time, then run the command.
+            typed = at
+            for length in range(1, rng.randint(3, 8) + 1):
+                typed += rng.uniform(0.05, 0.2)
+                trace.append({'at': typed, 'command': 'cancelevent', 'autocomplete': 'event_name',
+                              'value': name[:length]})
+            trace.append({'at': typed + rng.uniform(0.2, 1), 'command': 'cancelevent',
+                          'options': {'event_name': name}})
+        else:
+            new_event(at)
+
+        at += rng.expovariate(rate)
+
+    if burst_every:
+        burst = burst_every
+        while burst < duration:
+            for _ in range(burst_size):
+                new_event(burst)
+            burst += burst_every
+
+    trace.sort(key=lambda interaction: interaction['at'])
+    return trace
+
+
+def read_trace(path) -> list[dict]:
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def write_trace(trace: list[dict], path):
+    with open(path, 'w') as file:
+        file.writelines(json.dumps(interaction) + '\n' for interaction in trace)
+
+
+async def measure_lag(lags: list[float], stop: asyncio.Event):
+    """Records how much later than asked for the loop wakes a sleeping task, until stop is set."""
+    while not stop.is_set():
+        began = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - began - LAG_INTERVAL))
+
+
+async def replay(trace: list[dict], size: int = 100, latency: float = 0, rate_limit: float = 0,
+                 retry_after: float = 0, gateway_latency: float = 0, speed: float = 1, queue_rate: float = 1_000_000,
+                 seed_value: Optional[int] = None) -> dict:
+    with tempfile.TemporaryDirectory() as folder, patch.object(consts, 'cwd', return_value=Path(folder)):
+        config = configparser.ConfigParser()
+        config.read_string(CONFIG.format(voice_channel_id=VOICE_CHANNEL_ID, storage='json', file_format='json'))
+        config['queue']['rate'] = str(queue_rate)
+        with open(Path(folder, 'config.ini'), 'w') as config_file:
+            config.write(config_file)
+        config_utils.reload_config()
+
+        # Imported here, as it reads config.ini when it's first imported.
+        import main
+
+        guild = FakeGuild(GUILD_ID, latency, rate_limit, retry_after, seed_value)
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        seed(config, guild, size, start)
+
+        # The handlers find these as globals in main, so the replay runs them against its own.
+        event_manager = EventManager(config)
+        with patch.object(main, 'event_manager', event_manager), contextlib.redirect_stdout(io.StringIO()):
+            result = await _replay(main, guild, event_manager, trace, gateway_latency, speed)
+
+        event_manager.close()
+
+    result['rate_limited'] = guild.rate_limited
+    return result
+
+
+async def _replay(main, guild: FakeGuild, event_manager: EventManager, trace: list[dict], gateway_latency: float,
+                  speed: float) -> dict:
+    commands = {command.name: command for command in main.bot.pending_application_commands}
+    gateway_events = set()
+
+    async def deliver(event: str, *args):
+        await asyncio.sleep(gateway_latency)
+        await getattr(main, f'on_{event}')(*args)
+
+    def dispatch(event: str, *args):
+        task = asyncio.ensure_future(deliver(event, *args))
+        gateway_events.add(task)
+        task.add_done_callback(gateway_events.discard)
+
+    guild.dispatch = dispatch
+    await main.on_guild_available(guild)
+
+    began = datetime.now(timezone.utc)
+    interaction_ids = count(1)
+    latencies: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+
+    store = event_manager.guild(GUILD_ID).store
+
+    def created(name: str) -> bool:
+        return name in store and bool(event_manager.scheduled_events.find(GUILD_ID, name))
+
+    async def run(interaction: dict, due: float):
+        command = commands[interaction['command']]
+        label = command.name
+
+        ctx = fake_context(guild, value=interaction.get('value'))
+        ctx.interaction.id = next(interaction_ids)
+        record = ctx.respond
+
+        async def respond(*args, **kwargs):
+            # Responding is a request to Discord too, though not one that's rate limited like the others.
+            await asyncio.sleep(guild.latency)
+            await record(*args, **kwargs)
+
+        ctx.respond = respond
+
+        name = interaction.get('options', {}).get('event_name')
+        existed = name in store
+        try:
+            if 'autocomplete' in interaction:
+                label += ':autocomplete'
+                option = next(option for option in command.options if option.name == interaction['autocomplete'])
+                await option.autocomplete(ctx)
+            else:
+                options = dict(interaction.get('options', {}))
+                if isinstance(options.get('event_date'), (int, float)):
+                    options['event_date'] = (began + timedelta(hours=options['event_date'])).isoformat()
+                await command(ctx, **options)
+
+            # The handlers report failures in their responses rather than raising, so whether they worked is
+            # judged by what they left behind, for the commands the generated traces use.
+            if label == 'newevent':
+                succeeded = created(name)
+            elif label == 'cancelevent':
+                succeeded = existed and not created(name)
+            else:
+                succeeded = True
+        except Exception:
+            succeeded = False
+
+        if not succeeded:
+            errors[label] = errors.get(label, 0) + 1
+
+        latencies.setdefault(label, []).append(time.perf_counter() - due)
+
+    lags = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(lags, stop))
+
+    started = time.perf_counter()
+    tasks = []
+    for interaction in trace:
+        due = started + interaction['at'] / speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(run(interaction, due)))
+
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    while gateway_events:
+        await asyncio.gather(*gateway_events)
+    await event_manager.flush(GUILD_ID)
+
+    stop.set()
+    await lag_task
+
+    return {
+        'interactions': len(trace),
+        'elapsed': elapsed,
+        'throughput': len(trace) / elapsed if elapsed else 0.0,
+        'latency': summarize(sum(latencies.values(), [])) if trace else None,
+        'commands': {label: dict(summarize(timings), errors=errors.get(label, 0))
+                     for label, timings in sorted(latencies.items())},
+        'loop_lag': summarize(lags),
+        'retries': event_manager.guild(GUILD_ID).mutations.rate_limited,
+    }
+
+
+async def run_benchmark(trace: list[dict], size: int = 100, latency: float = 0, rate_limit: float = 0,
+                        retry_after: float = 0, gateway_latency: float = 0, speed: float = 1,
+                        queue_rate: float = 1_000_000, seed_value: Optional[int] = None) -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'size': size,
+        'latency': latency,
+        'rate_limit': rate_limit,
+        'retry_after': retry_after,
+        'gateway_latency': gateway_latency,
+        'speed': speed,
+        'queue_rate': queue_rate,
+        'results': await replay(trace, size, latency, rate_limit, retry_after, gateway_latency, speed, queue_rate,
+                                seed_value),
+    }
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trace', help='JSONL trace to replay (default a generated one).')
+    parser.add_argument('--save-trace', help='File to write the generated trace to, to replay it again later.')
+    parser.add_argument('--duration', type=float, default=30, help='Length of the generated trace, in seconds.')
+    parser.add_argument('--rate', type=float, default=5,
+                        help='Average interactions a second in the generated trace, outside of bursts.')
+    parser.add_argument('--burst-every', type=float, default=10,
+                        help='Seconds between bursts in the generated trace (0 for none).')
+    parser.add_argument('--burst-size', type=int, default=20, help='New events created at once in each burst.')
+    parser.add_argument('--seed', type=int, help='Random seed, for repeatable traces and rate limits.')
+    parser.add_argument('--speed', type=float, default=1, help='How many times faster than recorded to replay.')
+    parser.add_argument('--size', type=int, default=100, help='Number of stored events to start with.')
+    parser.add_argument('--latency', type=float, default=0, help='Simulated Discord API latency, in seconds.')
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help='Chance of each Discord API request being answered with a 429.')
+    parser.add_argument('--retry-after', type=float, default=0.1,
+                        help='Retry-After of the simulated 429s, in seconds.')
+    parser.add_argument('--gateway-latency', type=float, default=0,
+                        help='Delay before gateway events reach the bot, in seconds.')
+    parser.add_argument('--queue-rate', type=float, default=1_000_000,
+                        help='Changes sent to Discord a second (the [queue] rate, with per = 1).')
+    parser.add_argument('--output', help='File to write the results to (default stdout).')
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        trace = read_trace(args.trace)
+    else:
+        trace = generate_trace(args.duration, args.rate, args.burst_every, args.burst_size, args.seed)
+        if args.save_trace:
+            write_trace(trace, args.save_trace)
+
+    results = asyncio.run(run_benchmark(trace, args.size, args.latency, args.rate_limit, args.retry_after,
+                                        args.gateway_latency, args.speed, args.queue_rate, args.seed))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Benchmarks how long a freshly started bot process takes to get ready to serve its guilds.
+
+Each run seeds a temporary folder with a config.ini and the given number of guilds, each with the given number
+of stored events, then starts a new Python process that imports the bot and preloads every guild, as it would
+between starting up and on_ready. The process reports how long importing core, importing the bot and loading
+the guilds each took; the total includes starting the interpreter. Nothing connects to Discord.
+
+Results are written as JSON, so runs can be compared across releases:
+
+    python -m benchmarks.startup_bench --guilds 10 --sizes 100 10000 --runs 5 --output results.json
+"""
+import argparse
+import configparser
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from unittest.mock import patch
+
+from benchmarks.eventmanager_bench import CONFIG, VOICE_CHANNEL_ID, summarize
+from core import consts
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.factory import create_storage
+
+DEFAULT_SIZES = (100, 10_000, 100_000)
+ROOT = Path(__file__).resolve().parent.parent
+
+# Run in the new process, with the seeded folder standing in for the bot's own.
+CHILD = """
+import asyncio, json, sys, time
+from pathlib import Path
+
+began = time.perf_counter()
+from core import consts
+consts.cwd = lambda: Path({folder!r})
+import core.guildstate
+core_import = time.perf_counter() - began
+core_imports_discord = 'discord' in sys.modules
+
+began = time.perf_counter()
+import main
+main_import = time.perf_counter() - began
+
+async def load():
+    await asyncio.gather(*(main.event_manager.preload_guild(guild_id) for guild_id in {guild_ids!r}))
+
+began = time.perf_counter()
+asyncio.run(load())
+load_guilds = time.perf_counter() - began
+
+events = sum(len(state.store) for state in main.event_manager.guilds.values())
+main.event_manager.close()
+
+print(json.dumps({{'core_import': core_import, 'main_import': main_import, 'load_guilds': load_guilds,
+                  'events': events, 'core_imports_discord': core_imports_discord}}))
+"""
+
+
+def seed(config: configparser.ConfigParser, guild_ids: list[int], size: int, start: datetime):
+    """Stores size events an hour apart from start for each guild."""
+    for guild_id in guild_ids:
+        store = EventStore(Event(f'Event {i:07d}', start + timedelta(hours=i), 1, VOICE_CHANNEL_ID, 0, 1, i + 1)
+                           for i in range(size))
+
+        storage = create_storage(config, guild_id)
+        storage.save_all(store)
+        storage.close()
+
+
+def start_process(folder: str, guild_ids: list[int]) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])))
+
+    began = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD.format(folder=folder, guild_ids=guild_ids)],
+                            cwd=folder, env=env, capture_output=True, text=True, check=True).stdout
+    total = time.perf_counter() - began
+
+    return dict(json.loads(output.splitlines()[-1]), total=total)
+
+
+def run_size(size: int, guilds: int, runs: int, storage: str, file_format: str) -> dict:
+    with tempfile.TemporaryDirectory() as folder, patch.object(consts, 'cwd', return_value=Path(folder)):
+        config = configparser.ConfigParser()
+        config.read_string(CONFIG.format(voice_channel_id=VOICE_CHANNEL_ID, storage=storage,
+                                         file_format=file_format))
+        config['discord']['token'] = ''
+        with open(Path(folder, 'config.ini'), 'w') as config_file:
+            config.write(config_file)
+
+        guild_ids = list(range(1, guilds + 1))
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        seed(config, guild_ids, size, start)
+
+        samples = [start_process(folder, guild_ids) for _ in range(runs)]
+
+    result = {'size': size, 'guilds': guilds, 'events': samples[0]['events'],
+              'core_imports_discord': samples[0]['core_imports_discord']}
+    for stage in ('core_import', 'main_import', 'load_guilds', 'total'):
+        result[stage] = summarize([sample[stage] for sample in samples])
+
+    return result
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, guilds: int = 1, runs: int = 5, storage: str = 'json',
+                   file_format: str = 'json') -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'storage': storage,
+        'format': file_format,
+        'guilds': guilds,
+        'runs': runs,
+        'results': [run_size(size, guilds, runs, storage, file_format) for size in sizes],
+    }
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Numbers of stored events per guild to benchmark with.')
+    parser.add_argument('--guilds', type=int, default=1,
+                        help='How many guilds to seed and preload.')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='How many processes to start at each size.')
+    parser.add_argument('--storage', choices=('json', 'journal', 'sqlite'), default='json')
+    parser.add_argument('--format', choices=('json', 'ndjson', 'msgpack'), default='json',
+                        help='Event file format, for the json storage mode.')
+    parser.add_argument('--output', help='File to write the results to (default stdout).')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.guilds, args.runs, args.storage, args.format)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
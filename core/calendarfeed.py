@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.archive import EventArchive
+from core.workerpool import WorkerPool
+
+PRODID = '-//eventnite//Event nights//EN'
+
+# Lines longer than this many bytes are folded onto continuation lines.
+_MAX_LINE_LENGTH = 75
+
+
+def _escape(text: str) -> str:
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _fold(line: str) -> str:
+    """Splits a content line into continuation lines of at most 75 bytes, without splitting a character."""
+    if len(line.encode()) <= _MAX_LINE_LENGTH:
+        return line + '\r\n'
+
+    parts = []
+    part = ''
+    length = 0
+    for char in line:
+        size = len(char.encode())
+        # Continuation lines start with a space, which counts towards their length.
+        if length + size > _MAX_LINE_LENGTH:
+            parts.append(part)
+            part = ' '
+            length = 1
+        part += char
+        length += size
+    parts.append(part)
+
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def render_vevent(guild_id: int, event: Event, stamp: Optional[float] = None, uid_key: Optional[str] = None) -> str:
+    """Renders an event as a VEVENT block, with folded lines and CRLF line endings. Its UID is derived from
+    uid_key, or by default from its name."""
+    # Events only get their Discord id once Discord has created them, so it can't be part of a stable UID.
+    uid = hashlib.sha1((uid_key if uid_key is not None else event.name).encode()).hexdigest()
+
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}@{guild_id}.eventnite',
+        f'DTSTAMP:{_format_time(stamp if stamp is not None else datetime.now(timezone.utc).timestamp())}',
+        f'DTSTART:{_format_time(event.timestamp)}',
+        f'DTEND:{_format_time(event.end_timestamp)}',
+        f'SUMMARY:{_escape(event.name)}',
+    ]
+    if isinstance(event.location, str):
+        lines.append(f'LOCATION:{_escape(event.location)}')
+    if event.id is not None:
+        lines.append(f'URL:https://discord.com/events/{guild_id}/{event.id}')
+    lines.append('END:VEVENT')
+
+    return ''.join(_fold(line) for line in lines)
+
+
+def render_vevents(guild_id: int, events: list[dict]) -> list[str]:
+    """Renders events, in their saved form so they can be sent to a worker process, as VEVENT blocks."""
+    return [render_vevent(guild_id, Event.from_dict(event)) for event in events]
+
+
+class _GuildFeed:
+    def __init__(self, store: EventStore):
+        self.store = store
+        # Rendered VEVENT blocks by event name.
+        self.vevents: dict[str, str] = {}
+        self.body: Optional[str] = None
+        self.etag: Optional[str] = None
+        # Recently archived events, and the (archive version, start of the window) they were read at.
+        self.archived: list[Event] = []
+        self.archived_key: Optional[tuple[int, datetime]] = None
+
+    def changed(self, change: str, event: Event):
+        self.vevents.pop(event.name, None)
+        self.body = None
+        self.etag = None
+
+
+class CalendarFeed:
+    """Renders each guild's events as an iCalendar feed, for calendar apps to subscribe to.
+
+    Each event's VEVENT block is rendered once and kept until the event changes, which the feed hears about by
+    listening to the guild's store; the whole feed and its ETag are kept until any event changes. Calendar apps
+    poll their feeds, so most requests only need the ETag compared.
+
+    Calendar apps remove events that drop out of a feed, so events archived in the last archive_days days are
+    kept in it, read from the archive archives returns for the guild; they're read again once the archive
+    changes or a day has passed.
+
+    stores returns the store of a loaded guild, or None if the guild isn't loaded. With workers, prepare renders
+    a feed's missing VEVENT blocks on a worker process when there are enough of them to hold up the event loop."""
+
+    def __init__(self, stores: Callable[[int], Optional[EventStore]], name: str = 'Event nights',
+                 workers: Optional[WorkerPool] = None,
+                 archives: Optional[Callable[[int], Optional[EventArchive]]] = None, archive_days: int = 0):
+        self.stores = stores
+        self.name = name
+        self.workers = workers
+        self.archives = archives
+        self.archive_days = archive_days
+
+        self._feeds: dict[int, _GuildFeed] = {}
+
+    def _feed(self, guild_id: int) -> Optional[_GuildFeed]:
+        store = self.stores(guild_id)
+        if store is None:
+            self._feeds.pop(guild_id, None)
+            return None
+
+        feed = self._feeds.get(guild_id)
+        # A guild that's been unloaded and loaded again has a new store.
+        if feed is None or feed.store is not store:
+            feed = self._feeds[guild_id] = _GuildFeed(store)
+            store.listeners.append(feed.changed)
+
+        return feed
+
+    def _archive_window(self, guild_id: int) -> tuple[Optional[EventArchive], Optional[tuple[int, datetime]]]:
+        archive = self.archives(guild_id) if self.archives is not None and self.archive_days > 0 else None
+        if archive is None:
+            return None, None
+
+        start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        return archive, (archive.version, start - timedelta(days=self.archive_days))
+
+    @staticmethod
+    def _set_archived(feed: _GuildFeed, key: Optional[tuple[int, datetime]], archived: list[Event]):
+        feed.archived = archived
+        feed.archived_key = key
+        feed.body = None
+        feed.etag = None
+
+    async def prepare(self, guild_id: int):
+        """Reads the archived events a guild's feed is missing, on a worker thread, and renders the VEVENT blocks
+        it's missing, if there are enough for the workers to take them, so that rendering it next doesn't have to."""
+        feed = self._feed(guild_id)
+        if feed is None:
+            return
+
+        archive, key = self._archive_window(guild_id)
+        if key != feed.archived_key:
+            archived = []
+            if archive is not None:
+                archived = await asyncio.get_running_loop().run_in_executor(None, archive.between, key[1],
+                                                                            datetime.now(timezone.utc))
+            self._set_archived(feed, key, archived)
+
+        if feed.body is not None or self.workers is None:
+            return
+
+        missing = [event for event in feed.store if event.name not in feed.vevents]
+        if not self.workers.offloads('export', len(missing)):
+            return
+
+        version = feed.store.version
+        vevents = await self.workers.run('export', render_vevents, guild_id, [event.to_dict() for event in missing],
+                                         size=len(missing))
+
+        # If anything changed while they were being rendered, render picks up the changes itself.
+        if feed.store.version == version and self._feeds.get(guild_id) is feed:
+            feed.vevents.update(zip((event.name for event in missing), vevents))
+
+    def render(self, guild_id: int) -> Optional[tuple[str, str]]:
+        """Returns a guild's feed and its ETag, or None if the guild isn't loaded."""
+        feed = self._feed(guild_id)
+        if feed is None:
+            return None
+
+        archive, key = self._archive_window(guild_id)
+        if key != feed.archived_key:
+            self._set_archived(feed, key, archive.between(key[1], datetime.now(timezone.utc))
+                               if archive is not None else [])
+
+        if feed.body is None:
+            # Past events may share a name with each other or with an upcoming event, and then get a UID of
+            # their own.
+            names = Counter(event.name for event in feed.archived)
+            vevents = [render_vevent(guild_id, event, uid_key=f'{event.name}@{event.timestamp}'
+                                     if names[event.name] > 1 or event.name in feed.store else None)
+                       for event in feed.archived]
+            for event in feed.store:
+                vevent = feed.vevents.get(event.name)
+                if vevent is None:
+                    vevent = feed.vevents[event.name] = render_vevent(guild_id, event)
+                vevents.append(vevent)
+
+            feed.body = ''.join([
+                'BEGIN:VCALENDAR\r\n',
+                'VERSION:2.0\r\n',
+                f'PRODID:{PRODID}\r\n',
+                _fold(f'X-WR-CALNAME:{_escape(self.name)}'),
+                *vevents,
+                'END:VCALENDAR\r\n',
+            ])
+            feed.etag = f'"{hashlib.sha1(feed.body.encode()).hexdigest()}"'
+
+        return feed.body, feed.etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks an If-None-Match header against an ETag, ignoring weak validator prefixes."""
+    if not if_none_match:
+        return False
+
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in (tag[2:] if tag.startswith('W/') else tag for tag in tags)
+
+
+async def serve_calendar(feed: CalendarFeed, host: str, port: int):
+    """Serves each loaded guild's feed over HTTP at /calendar/<guild id>.ics, returning the runner so the server
+    can be shut down."""
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        try:
+            guild_id = int(request.match_info['guild_id'])
+        except ValueError:
+            raise web.HTTPNotFound()
+
+        await feed.prepare(guild_id)
+        rendered = feed.render(guild_id)
+        if rendered is None:
+            raise web.HTTPNotFound()
+
+        body, etag = rendered
+        # Clients should check back each time, which costs almost nothing while the feed hasn't changed.
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return web.Response(status=304, headers=headers)
+
+        return web.Response(body=body.encode(), headers={**headers, 'Content-Type': 'text/calendar; charset=utf-8'})
+
+    app = web.Application()
+    app.router.add_get('/calendar/{guild_id}.ics', handle)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    return runner
@@ -1,34 +1,103 @@
 import json
 import os
-from json import JSONDecodeError
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from core import serialization
+from core.metrics import metrics
+
+# Names of a guild's event file in each format it can be saved in.
+EVENT_FILE_NAMES = {'json': 'events.json', 'ndjson': 'events.ndjson', 'msgpack': 'events.msgpack'}
+
+# Files making up a guild's saved events, whichever storage mode wrote them.
+EVENT_FILES = (*EVENT_FILE_NAMES.values(), 'events.journal', 'events.journal.old')
 
 
 def cwd() -> Path:
     return Path(os.path.abspath(__file__)).parent.parent
 
 
-def data_folder() -> Path:
-    return Path(cwd(), 'data')
+def data_folder(guild_id: Optional[int] = None) -> Path:
+    if guild_id is None:
+        return Path(cwd(), 'data')
+
+    return Path(cwd(), 'data', 'guilds', str(guild_id))
 
 
-def read_event_file():
-    event_path = Path(data_folder(), 'events.json')
+def archive_folder(guild_id: int) -> Path:
+    return Path(data_folder(guild_id), 'archive')
 
-    if not os.path.isfile(event_path):
+
+def _read_json_file(file_path: Path):
+    if not os.path.isfile(file_path):
         return []
 
-    with open(event_path, 'r') as event_file:
-        return json.loads(event_file.read())
+    with metrics.timed('file_io_seconds', op='read', file=file_path.name):
+        with open(file_path, 'r') as json_file:
+            return json.loads(json_file.read())
+
+
+def _write_json_file(file_path: Path, data):
+    with metrics.timed('file_io_seconds', op='write', file=file_path.name):
+        serialization.write_records(file_path, data)
+
+
+def event_file_path(guild_id: Optional[int] = None) -> Optional[Path]:
+    """Finds the event file in a folder, whichever format it was saved in.
+
+    Saving in one format removes the files saved in any other, but if a crash left more than one behind, the
+    newest is the one that's current."""
+    paths = [p for p in (Path(data_folder(guild_id), name) for name in EVENT_FILE_NAMES.values()) if p.is_file()]
+
+    return max(paths, key=os.path.getmtime) if paths else None
+
+
+def iter_event_file(guild_id: Optional[int] = None) -> Iterator[dict]:
+    """Lazily yields the events saved in an event file, in whichever format it was saved in."""
+    file_path = event_file_path(guild_id)
+    if file_path is None:
+        return
+
+    with metrics.timed('file_io_seconds', op='read', file=file_path.name):
+        yield from serialization.iter_records(file_path)
+
+
+def read_event_file(guild_id: Optional[int] = None) -> list[dict]:
+    return list(iter_event_file(guild_id))
+
+
+def write_event_file(data: Iterable[dict], guild_id: Optional[int] = None, file_format: str = 'json'):
+    file_path = Path(data_folder(guild_id), EVENT_FILE_NAMES[file_format])
+
+    with metrics.timed('file_io_seconds', op='write', file=file_path.name):
+        serialization.write_records(file_path, data, file_format)
+
+    for name in EVENT_FILE_NAMES.values():
+        if name != file_path.name and os.path.isfile(Path(file_path.parent, name)):
+            os.remove(Path(file_path.parent, name))
+
+
+def read_series_file(guild_id: int):
+    return _read_json_file(Path(data_folder(guild_id), 'series.json'))
+
+
+def write_series_file(data, guild_id: int):
+    _write_json_file(Path(data_folder(guild_id), 'series.json'), data)
+
 
+def adopt_legacy_event_files(guild_id: int) -> bool:
+    """Moves event files saved before events were kept per guild into the given guild's folder.
 
-def write_event_file(data):
-    event_path = Path(data_folder(), 'events.json')
+    Nothing is moved if the guild already has event files of its own. Returns whether anything was moved."""
+    legacy_paths = [Path(data_folder(), name) for name in EVENT_FILES]
+    if not any(os.path.isfile(p) for p in legacy_paths):
+        return False
+    if any(os.path.isfile(Path(data_folder(guild_id), name)) for name in EVENT_FILES):
+        return False
 
-    try:
-        json.dumps(data)
-    except JSONDecodeError:
-        return  # Testing if we can parse the data before trying to write it.
+    os.makedirs(data_folder(guild_id), exist_ok=True)
+    for legacy_path in legacy_paths:
+        if os.path.isfile(legacy_path):
+            os.replace(legacy_path, Path(data_folder(guild_id), legacy_path.name))
 
-    with open(event_path, 'w') as event_file:
-        event_file.write(json.dumps(data))
+    return True
@@ -1,32 +1,72 @@
-from datetime import datetime, time
+import re
+from datetime import datetime, date, tzinfo
+from functools import lru_cache
+from typing import Optional
 
 from dateutil.parser import parse
-from dateutil.tz import tz, gettz
-from discord.ext import commands
-from discord.ext.commands import Context
-
-
-def is_dst(time: datetime) -> bool:
-    return time.dst() == 1
+from dateutil.tz import gettz
 
+# Generic abbreviations map to the real zone, so whether they mean standard or daylight time is decided by
+# the zone's rules at the event's own date rather than whenever the bot happened to start.
+_ZONE_NAMES = {
+    'UT': 'UTC',
+    'ET': 'America/New_York',
+    'CT': 'America/Chicago',
+    'MT': 'America/Denver',
+    'PT': 'America/Los_Angeles',
+}
 
-# TODO: Figure out more robust timezone logic.
-tzinfos = {
-    'UT': gettz('GMT'),
+# Explicit standard/daylight abbreviations mean a fixed offset, whatever the date.
+_FIXED_OFFSETS = {
     'EST': -18000,
     'EDT': -14400,
-    'ET': -18000 if is_dst(datetime.now()) else -14400,
     'CST': -21600,
     'CDT': -18000,
-    'CT': -21600 if is_dst(datetime.now()) else -18000,
     'MST': -25200,
     'MDT': -21600,
-    'MT': -25200 if is_dst(datetime.now()) else -21600,
     'PST': -28800,
     'PDT': -25200,
-    'PT': -28800 if is_dst(datetime.now()) else -25200,
 }
 
+_ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+@lru_cache(maxsize=None)
+def resolve_tz(name: str) -> Optional[tzinfo | int]:
+    """Looks up a time zone abbreviation or IANA name, caching the resulting tz object."""
+    abbreviation = name.upper()
+
+    if abbreviation in _FIXED_OFFSETS:
+        return _FIXED_OFFSETS[abbreviation]
+    elif abbreviation in _ZONE_NAMES:
+        return gettz(_ZONE_NAMES[abbreviation])
+
+    return gettz(name)
+
+
+def _tzinfos(name: Optional[str], offset: Optional[int]) -> Optional[tzinfo | int]:
+    if name is None:
+        return offset
+
+    resolved = resolve_tz(name)
+    return resolved if resolved is not None else offset
+
+
+@lru_cache(maxsize=1024)
+def _parse(time: str, today: date) -> datetime:
+    # today is only part of the cache key; dateutil fills in missing fields from the current date, so the
+    # same input can mean something different tomorrow.
+    if _ISO_DATE.match(time):
+        try:
+            return datetime.fromisoformat(time)
+        except ValueError:
+            pass
+
+    return parse(time, tzinfos=_tzinfos)
+
 
 def add_tzinfo_to_datetime(time: datetime | str) -> datetime:
-    return parse(time, tzinfos=tzinfos)
+    if isinstance(time, datetime):
+        return time
+
+    return _parse(time.strip(), date.today())
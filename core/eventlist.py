@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+
+from core.eventstore import EventStore
+from core.objects.event import Event
+
+# How many events are shown on each page of /listevents.
+PAGE_SIZE = 10
+
+# Where a page starts: the (timestamp, name) key of the last event on the page before it.
+Cursor = Optional[tuple[float, str]]
+
+
+class EventFilter(NamedTuple):
+    """Which events to list: those starting in [start, end) (as timestamps), optionally only those created by
+    creator_id or with text in their names."""
+    start: float
+    end: float
+    creator_id: Optional[int] = None
+    text: Optional[str] = None
+
+    def matches(self, event: Event) -> bool:
+        if self.creator_id is not None and event.creator_id != self.creator_id:
+            return False
+        if self.text and self.text.lower() not in event.name.lower():
+            return False
+        return True
+
+
+class EventPage(NamedTuple):
+    lines: tuple[str, ...]
+    # Where the next page starts, or None if this is the last.
+    next_cursor: Cursor
+
+
+def render_line(event: Event, subscriber_count: Optional[int]) -> str:
+    # Discord timestamp markup, which shows the time in each reader's own time zone.
+    line = f'<t:{int(event.timestamp)}:f> **{event.name}**'
+    if subscriber_count:
+        line += f' ({subscriber_count} interested)'
+    return line
+
+
+class EventListCache:
+    """Renders pages of a guild's events, caching them per filter and cursor until the guild's events change.
+
+    A page is a range scan of the store's start time index from its cursor, skipping events the filter
+    doesn't match, so it costs a bisect plus the events it looks at, however long the schedule is. Pages are
+    cached against the store's version and the version of whatever the subscriber counts come from; when
+    either moves on, the guild's cached pages are thrown away."""
+
+    def __init__(self, page_size: int = PAGE_SIZE, max_pages: int = 256):
+        self.page_size = page_size
+        self.max_pages = max_pages
+
+        # Per guild: the store and versions the pages were rendered at, and the pages, least recently used first.
+        self._pages: dict[int, tuple[EventStore, tuple, OrderedDict[tuple[EventFilter, Cursor], EventPage]]] = {}
+
+    def page(self, guild_id: int, store: EventStore, event_filter: EventFilter, cursor: Cursor = None,
+             subscriber_count: Callable[[Event], Optional[int]] = lambda event: event.subscriber_count,
+             subscriber_version=None) -> EventPage:
+        versions = (store.version, subscriber_version)
+        cached = self._pages.get(guild_id)
+        if cached is None or cached[0] is not store or cached[1] != versions:
+            cached = self._pages[guild_id] = (store, versions, OrderedDict())
+        pages = cached[2]
+
+        key = (event_filter, cursor)
+        if key in pages:
+            pages.move_to_end(key)
+            return pages[key]
+
+        events = []
+        has_more = False
+        for event in store.range(event_filter.start, event_filter.end, cursor):
+            if not event_filter.matches(event):
+                continue
+            if len(events) == self.page_size:
+                has_more = True
+                break
+            events.append(event)
+
+        page = EventPage(tuple(render_line(event, subscriber_count(event)) for event in events),
+                         (events[-1].timestamp, events[-1].name) if has_more else None)
+
+        pages[key] = page
+        if len(pages) > self.max_pages:
+            pages.popitem(last=False)
+
+        return page
+
+    def forget(self, guild_id: int):
+        self._pages.pop(guild_id, None)
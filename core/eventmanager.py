@@ -1,119 +1,688 @@
+import asyncio
 import configparser
 import logging
-from datetime import datetime, timedelta
-from os import path
-from typing import Optional
+import time
+from datetime import datetime, timedelta, date
+from functools import partial
+from itertools import islice, takewhile
+from typing import Awaitable, Callable, Iterator, Optional
 
 import discord
 from discord import HTTPException
 
 from core import consts
+from core.eventlist import Cursor, EventFilter, EventListCache, EventPage
+from core.eventstore import ConflictError, EventStore
+from core.guildstate import GuildState
+from core.importer import ImportRow, validate_import_rows
+from core.metrics import metrics
+from core.mutationqueue import CREATE, EDIT, CANCEL, Mutation
 from core.objects.event import Event
+from core.objects.series import Series
+from core.reconcile import ReconcileResult, reconcile
+from core.scheduledeventmirror import ScheduledEventMirror
+from core.scheduler import Scheduler
 from core.utils import config_utils
 
 
 class EventManager:
-    events: list[Event]
+    """Keeps each guild's events partitioned by guild id.
 
-    def __init__(self):
-        self.events = consts.read_event_file()
+    A guild's partition is loaded the first time it's needed (or when the bot sees the guild become available),
+    so a shard only ever loads and persists the guilds it's responsible for."""
+    guilds: dict[int, GuildState]
 
-        self._config = configparser.ConfigParser()
-        self._config.read(path.join(consts.cwd(), 'config.ini'))
+    def __init__(self, config: Optional[configparser.ConfigParser] = None):
+        self._config = config if config is not None else config_utils.get_config()
 
+        self.guilds = {}
+
+        # Each guild's live scheduled events, kept up to date from the gateway (see main.py) and our own changes.
+        self.scheduled_events = ScheduledEventMirror()
+        self.event_lists = EventListCache()
+
+        # With this set, commands return as soon as their changes are queued for Discord, instead of waiting
+        # for Discord to confirm them.
+        self._acknowledge_early = self._config.getboolean('queue', 'acknowledge_early', fallback=False)
+
+        # Reminders and moving finished events to completed are scheduled as events are stored; on_reminder is
+        # called with the guild id, the event and how far ahead of it the reminder is.
+        self.scheduler = Scheduler()
+        self.on_reminder: Optional[Callable[[int, Event, timedelta], Awaitable]] = None
+        # Finished events are moved into the guild's archive, or just marked completed if archiving is off.
+        self._archive = self._config.getboolean('storage', 'archive', fallback=True)
+        offsets = self._config.get('reminders', 'offsets', fallback='1440, 15')
+        self._reminder_offsets = [timedelta(minutes=float(minutes)) for minutes in offsets.split(',')
+                                  if minutes.strip()]
+
+    def guild(self, guild_id: int) -> GuildState:
+        if guild_id not in self.guilds:
+            self.load_guild(guild_id)
+
+        return self.guilds[guild_id]
+
+    @metrics.instrument('eventmanager_seconds')
+    def load_guild(self, guild_id: int) -> GuildState:
+        if guild_id in self.guilds:
+            return self.guilds[guild_id]
+
+        return self._add_guild(self._open_guild(guild_id))
+
+    @metrics.instrument('eventmanager_seconds')
+    async def preload_guild(self, guild_id: int) -> GuildState:
+        """Loads a guild's partition on a worker thread, so reading its events doesn't hold up the event loop."""
+        if guild_id in self.guilds:
+            return self.guilds[guild_id]
+
+        state = await asyncio.get_running_loop().run_in_executor(None, self._open_guild, guild_id)
+
+        # Something may have needed the guild (and loaded it itself) in the meantime.
+        if guild_id in self.guilds:
+            state.close()
+            return self.guilds[guild_id]
+
+        return self._add_guild(state)
+
+    def _open_guild(self, guild_id: int) -> GuildState:
+        legacy_guild_id = self._config.get('discord', 'guild_id', fallback='')
+        if legacy_guild_id in ('', str(guild_id)) and consts.adopt_legacy_event_files(guild_id):
+            logging.info(f'Moved existing event files into the folder for guild {guild_id}.')
+
+        state = GuildState(guild_id, self._config)
+
+        # Events that finished while we weren't running are archived before they're scheduled for anything.
+        if self._archive:
+            archived = state.archive_finished(time.time())
+            if archived:
+                logging.info(f'Archived {archived} finished events for guild {guild_id}.')
+
+        return state
+
+    def _add_guild(self, state: GuildState) -> GuildState:
+        self.guilds[state.guild_id] = state
+
+        state.store.listeners.append(partial(self._on_store_change, state.guild_id))
+        state.mutations.listeners.append(partial(self._on_mutation_sent, state.guild_id))
+
+        now = time.time()
+        self.scheduler.schedule_many(entry for event in state.store
+                                     for entry in self._scheduled_for(state.guild_id, event, now))
+
+        return state
+
+    async def flush(self, guild_id: int):
+        """Waits until every change made to a guild's events so far has been saved."""
+        if guild_id in self.guilds:
+            await self.guilds[guild_id].storage.flush()
+
+    @metrics.instrument('eventmanager_seconds')
+    def unload_guild(self, guild_id: int):
+        state = self.guilds.pop(guild_id, None)
+        if state is None:
+            return
+
+        for event in state.store:
+            self._unschedule_event(guild_id, event.name)
+        self.scheduled_events.forget(guild_id)
+        self.event_lists.forget(guild_id)
+        state.close()
+
+    def close(self):
+        self.scheduler.stop()
+
+        for guild_id in list(self.guilds):
+            self.unload_guild(guild_id)
+
+    def metric_gauges(self) -> Iterator[tuple[str, dict, float]]:
+        """Yields the number of events and the mutation queue stats of each loaded guild, as metrics gauges."""
+        for guild_id, guild in self.guilds.items():
+            yield 'events', {'guild': guild_id}, len(guild.store)
+            for stat, value in guild.mutations.stats().items():
+                yield f'queue_{stat}', {'guild': guild_id}, value
+
+    def _on_store_change(self, guild_id: int, change: str, event: Event):
+        if change == 'add':
+            self._schedule_event(guild_id, event)
+        elif change == 'remove':
+            self._unschedule_event(guild_id, event.name)
+
+    def _mirror(self, discord_guild: discord.Guild):
+        # Normally done when the guild becomes available; this covers guilds we haven't heard about yet.
+        if discord_guild.id not in self.scheduled_events:
+            self.scheduled_events.rebuild(discord_guild.id, discord_guild.scheduled_events)
+
+    def _on_mutation_sent(self, guild_id: int, mutation: Mutation, result):
+        # Mirrored straight away, rather than waiting for the gateway to tell us about our own change.
+        if result is None:
+            return
+        if guild_id in self.guilds:
+            self.guilds[guild_id].changed(result.id)
+        if mutation.method == CREATE:
+            self.scheduled_events.add(result)
+        else:
+            self.scheduled_events.update(result)
+
+    def _schedule_event(self, guild_id: int, event: Event):
+        for key, when, callback in self._scheduled_for(guild_id, event, time.time()):
+            self.scheduler.schedule(key, when, callback)
+
+    def _scheduled_for(self, guild_id: int, event: Event, now: float) -> Iterator[tuple]:
+        """Yields the (key, when, callback) scheduler entries for an event's reminders and completion."""
+        if event.completed:
+            return
+
+        for offset in self._reminder_offsets:
+            when = event.timestamp - offset.total_seconds()
+            if when > now:
+                yield (guild_id, event.name, offset), when, partial(self._send_reminder, guild_id, event.name, offset)
+
+        # Events that finished while we weren't running are due straight away.
+        yield (guild_id, event.name, 'complete'), event.end_timestamp, partial(self._complete_event, guild_id,
+                                                                              event.name)
+
+    def _unschedule_event(self, guild_id: int, event_name: str):
+        for offset in self._reminder_offsets:
+            self.scheduler.cancel((guild_id, event_name, offset))
+        self.scheduler.cancel((guild_id, event_name, 'complete'))
+
+    async def _send_reminder(self, guild_id: int, event_name: str, offset: timedelta):
+        guild = self.guilds.get(guild_id)
+        event = guild.store.get(event_name) if guild is not None else None
+
+        if event is not None and not event.completed and self.on_reminder is not None:
+            await self.on_reminder(guild_id, event, offset)
+
+    async def _complete_event(self, guild_id: int, event_name: str):
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            return
+
+        # Waits for any command changing the event to finish. If it did change the event (an edit may have moved
+        # it into the future), the event was rescheduled and this is out of date.
+        version = guild.store.version_of(event_name)
+        async with guild.locks(event_name):
+            event = guild.store.get(event_name)
+            if event is None or event.completed or guild.store.version_of(event_name) != version:
+                return
+
+            if not self._archive:
+                event.completed = True
+                guild.storage.put(guild.store, event)
+                return
+
+            # Out of the store while it's archived, so it can't be changed in the meantime.
+            guild.store.remove(event_name)
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, guild.archive.add, [event])
+            except Exception as exc:
+                logging.exception(exc)
+                event.completed = True
+                guild.store.add(event)
+                guild.storage.put(guild.store, event)
+                return
+
+            guild.storage.delete(guild.store, event_name)
+
+    @metrics.instrument('eventmanager_seconds')
     async def add_new_event(self, ctx: discord.ApplicationContext,
                             event_name: str,
                             event_date: datetime,
                             description='',
-                            hours=1) -> (Event, str):
-        if event_date < datetime.now(config_utils.gettz()):
-            raise ValueError('Cannot create events in the past.')
+                            hours=1,
+                            persist=True) -> (Event, str):
+        return await self._create_event(ctx.channel.guild,
+                                        f'EventNite: add_new_event called by {str(ctx.interaction.user)}.',
+                                        event_name, event_date, description, hours, persist)
 
-        self.events = consts.read_event_file()
-        scheduled_events = [e for e in self.events if e['name'] == event_name]
+    async def _create_event(self, discord_guild: discord.Guild,
+                            reason: str,
+                            event_name: str,
+                            event_date: datetime,
+                            description='',
+                            hours=1,
+                            persist=True) -> (Event, str):
+        guild = self.guild(discord_guild.id)
+        self._mirror(discord_guild)
 
-        if len(scheduled_events) > 1:
-            raise ValueError(f'Multiple events with name {event_name} were found; Were some added by mistake?')
-        elif len(scheduled_events) == 1:
-            raise ValueError('An event with that name already exists.')
+        if event_date < datetime.now(config_utils.gettz(guild.guild_id, self._config)):
+            raise ValueError('Cannot create events in the past.')
 
         if description != '':
             description += '\n\n'
         description += '[Event managed by EventNite]'
 
-        location = int(self._config['discord']['voice_channel_id'])
+        location = config_utils.get_voice_channel_id(guild.guild_id, self._config)
+
+        async with guild.locks(event_name):
+            if event_name in guild.store:
+                raise ValueError('An event with that name already exists.')
 
-        event = Event(event_name, event_date, hours, location)
-        self.events.append(event)
+            event = Event(event_name, event_date, hours, location)
+            message = self._check_overlaps(guild, location, event.date, event.end_date)
+            version = guild.store.version
 
-        scheduled_event = None
-        try:
-            scheduled_event = await ctx.channel.guild.create_scheduled_event(
+            pending = guild.mutations.submit(
+                event_name,
+                discord_guild,
+                CREATE,
                 name=event_name,
                 description=description,
                 start_time=event.date,
                 end_time=event.end_date,
                 location=location,
-                reason=f'EventNite: add_new_event called by {str(ctx.interaction.user)}.'
+                reason=reason
             )
-        except HTTPException as exc:
-            logging.exception(exc)
 
-            if 'Cannot schedule event in the past.' in exc.text:
-                return None, 'Cannot schedule event in the past.'
+            if self._acknowledge_early:
+                guild.store.add(event)
+                if persist:
+                    guild.storage.put(guild.store, event)
+
+                pending.add_done_callback(partial(self._on_event_created, guild, event_name))
+                return event, message
+
+            try:
+                scheduled_event = await pending
+            except HTTPException as exc:
+                logging.exception(exc)
+
+                if 'Cannot schedule event in the past.' in exc.text:
+                    return None, 'Cannot schedule event in the past.'
+                raise
+
+            # Other events may have been stored while Discord was creating this one, so the overlap check is
+            # redone; if one of them now overlaps, this event is cancelled rather than double booking.
+            if guild.store.version != version:
+                try:
+                    message = self._check_overlaps(guild, location, event.date, event.end_date)
+                except ValueError:
+                    await guild.mutations.submit(event_name, scheduled_event, CANCEL,
+                                                 reason='EventNite: overlapped an event created at the same time.')
+                    raise
+
+            event.id = scheduled_event.id
+            event.subscriber_count = scheduled_event.subscriber_count
+            event.creator_id = scheduled_event.creator_id
+
+            guild.store.add(event)
+            if persist:
+                guild.storage.put(guild.store, event)
+
+            return event, message
+
+    def _check_overlaps(self, guild: GuildState, location, start: datetime, end: datetime,
+                        ignore: Optional[str] = None, store: Optional[EventStore] = None) -> str:
+        """Checks a time range against the other events in a location (in the guild's store, unless another is
+        given), according to the guild's overlaps option.
+
+        With reject (the default) an overlap raises a ValueError, with warn it's described in the returned
+        message, and with allow it isn't checked for at all."""
+        mode = (config_utils.get_guild_option(guild.guild_id, 'overlaps', 'global', self._config) or 'reject').lower()
+        if mode == 'allow':
+            return ''
+
+        overlapping = (store or guild.store).overlapping(location, start, end, ignore)
+        if not overlapping:
+            return ''
+
+        message = f'Overlaps with {", ".join(e.name for e in overlapping)}.'
+        if mode == 'warn':
+            return message
+        raise ValueError(message)
+
+    @metrics.instrument('eventmanager_seconds')
+    def list_events(self, guild_id: int, event_filter: EventFilter, cursor: Cursor = None) -> EventPage:
+        """Returns a page of a guild's events matching the filter, with subscriber counts from the mirror."""
+        def subscriber_count(event: Event) -> Optional[int]:
+            count = self.scheduled_events.subscriber_count(guild_id, event.id)
+            return count if count is not None else event.subscriber_count
+
+        return self.event_lists.page(guild_id, self.guild(guild_id).store, event_filter, cursor, subscriber_count,
+                                     self.scheduled_events.version(guild_id))
+
+    @metrics.instrument('eventmanager_seconds')
+    def free_slots(self, guild_id: int, start: datetime, end: datetime,
+                   min_length: timedelta = timedelta()) -> list[tuple[datetime, datetime]]:
+        """Returns the stretches of [start, end) at least min_length long when the guild's voice channel is free."""
+        guild = self.guild(guild_id)
+        location = config_utils.get_voice_channel_id(guild.guild_id, self._config)
+
+        return guild.store.free_slots(location, start, end, min_length)
+
+    def _on_event_created(self, guild: GuildState, event_name: str, pending):
+        """Fills in the Discord side of an event added with acknowledge_early, once Discord has created it."""
+        if pending.cancelled():
+            return
 
-        event.id = scheduled_event.id
+        if pending.exception() is not None:
+            logging.exception(pending.exception())
+
+            if guild.store.remove(event_name) is not None:
+                guild.storage.delete(guild.store, event_name)
+            return
+
+        scheduled_event = pending.result()
+        if scheduled_event is None:
+            return  # Cancelled before it was ever created.
+
+        # Edits made while the create was queued were folded into it, so it may have been created under a new name.
+        event = guild.store.get(scheduled_event.name) or guild.store.get(event_name)
+        if event is None:
+            return
+
+        guild.store.set_id(event.name, scheduled_event.id)
         event.subscriber_count = scheduled_event.subscriber_count
         event.creator_id = scheduled_event.creator_id
+        guild.storage.put(guild.store, event)
 
-        consts.write_event_file(self.events)
+    def _find_mutation_target(self, ctx: discord.ApplicationContext, guild: GuildState, event_name: str):
+        """Finds the scheduled event an edit or cancel applies to, which may still be on its way to Discord."""
+        target = guild.mutations.created(event_name)
+        if target is not None or guild.mutations.has_pending(event_name):
+            return target
 
-        return event, ''
-
-    async def delete_event(self, ctx: discord.ApplicationContext, event_name: str):
-        scheduled_events = [e for e in ctx.channel.guild.scheduled_events if e.name == event_name]
+        self._mirror(ctx.channel.guild)
+        scheduled_events = self.scheduled_events.find(guild.guild_id, event_name)
 
         if len(scheduled_events) > 1:
             raise ValueError(f'Multiple events with name {event_name} were found; Were some added by mistake?')
         elif len(scheduled_events) == 0:
             raise ValueError(f'No active schedule found with name {event_name}.')
 
-        await scheduled_events[0].cancel(reason=f'delete_event called by {str(ctx.interaction.user)}.')
+        return scheduled_events[0]
+
+    @metrics.instrument('eventmanager_seconds')
+    async def import_events(self, ctx: discord.ApplicationContext,
+                            rows: list[ImportRow]) -> list[(ImportRow, Optional[Event])]:
+        """Adds every valid row as an event, creating them concurrently and saving them all at once.
+
+        Every row is validated before anything is created; rows that fail have their error set."""
+        guild = self.guild(ctx.channel.guild.id)
+        validate_import_rows(rows, guild.store, datetime.now(config_utils.gettz(guild.guild_id, self._config)))
+
+        # The rows are created concurrently, so they're checked against each other for overlaps up front;
+        # each is checked against the events already stored as it's created.
+        location = config_utils.get_voice_channel_id(guild.guild_id, self._config)
+        batch = EventStore()
+        for row in rows:
+            if row.error is not None:
+                continue
 
-        self.events = consts.read_event_file()
-        self.events = [e for e in self.events if e['name'] != event_name]
+            event = Event(row.name, row.date, row.hours, location)
+            try:
+                self._check_overlaps(guild, location, event.date, event.end_date, store=batch)
+            except ValueError as exc:
+                row.error = str(exc)
+            else:
+                batch.add(event)
+
+        semaphore = asyncio.Semaphore(self._config.getint('import', 'concurrency', fallback=5))
+
+        async def create_event(row: ImportRow) -> Optional[Event]:
+            if row.error is not None:
+                return None
+
+            async with semaphore:
+                try:
+                    event, message = await self.add_new_event(ctx, row.name, row.date, row.description, row.hours,
+                                                              persist=False)
+                    row.error = message or None
+                    return event
+                except HTTPException as exc:
+                    row.error = f'Failed to add event ({exc.text or exc}).'
+                except ValueError as exc:
+                    row.error = str(exc)
+
+        events = await asyncio.gather(*(create_event(row) for row in rows))
+
+        created = [event for event in events if event is not None]
+        if created:
+            guild.storage.put_many(guild.store, created)
+
+        return list(zip(rows, events))
+
+    @metrics.instrument('eventmanager_seconds')
+    async def delete_event(self, ctx: discord.ApplicationContext, event_name: str):
+        guild = self.guild(ctx.channel.guild.id)
 
-        consts.write_event_file(self.events)
+        async with guild.locks(event_name):
+            target = self._find_mutation_target(ctx, guild, event_name)
+            pending = guild.mutations.submit(event_name, target, CANCEL,
+                                             reason=f'delete_event called by {str(ctx.interaction.user)}.')
+            guild.changed(getattr(target, 'id', None))
+            if not self._acknowledge_early:
+                await pending
 
+            if guild.store.remove(event_name) is not None:
+                guild.storage.delete(guild.store, event_name)
+
+    @metrics.instrument('eventmanager_seconds')
     async def edit_event(self, ctx: discord.ApplicationContext,
                          event_name: str,
                          new_event_name: Optional[str],
                          event_date: Optional[datetime],
                          description: Optional[str],
-                         hours: Optional[int]):
-        scheduled_events = [e for e in ctx.channel.guild.scheduled_events if e.name == event_name]
+                         hours: Optional[float]) -> str:
+        guild = self.guild(ctx.channel.guild.id)
 
-        if len(scheduled_events) != 1:
-            raise ValueError(f'No active schedule found with name {event_name}.')
+        async with guild.locks(event_name, new_event_name):
+            old_event = guild.store.get(event_name)
+            version = guild.store.version_of(event_name)
+            location = (old_event.location if old_event else
+                        config_utils.get_voice_channel_id(guild.guild_id, self._config))
+            message = self._check_overlaps(guild, location, event_date, event_date + timedelta(hours=hours),
+                                           event_name)
+
+            target = self._find_mutation_target(ctx, guild, event_name)
+            pending = guild.mutations.submit(
+                event_name,
+                target,
+                EDIT,
+                name=new_event_name or event_name,
+                description=description,
+                start_time=event_date,
+                end_time=event_date + timedelta(hours=hours),
+                reason=f'EventNite: edit_event called by {str(ctx.interaction.user)}'
+            )
+            guild.changed(getattr(target, 'id', None))
+
+            if self._acknowledge_early:
+                updated_event = Event(new_event_name or event_name,
+                                      event_date,
+                                      hours,
+                                      location,
+                                      old_event.subscriber_count if old_event else None,
+                                      old_event.creator_id if old_event else None,
+                                      old_event.id if old_event else None)
+            else:
+                updated_scheduled_event = await pending
+
+                # The stored location rather than the scheduled event's, which Discord gives back as a
+                # ScheduledEventLocation that can't be saved.
+                updated_event = Event(updated_scheduled_event.name,
+                                      updated_scheduled_event.start_time,
+                                      hours,
+                                      location,
+                                      updated_scheduled_event.subscriber_count,
+                                      updated_scheduled_event.creator_id,
+                                      updated_scheduled_event.id)
+
+            try:
+                guild.store.replace(event_name, updated_event, expected_version=version)
+            except ConflictError:
+                # Something that doesn't take the lock (a sync, or Discord confirming a create) changed the event
+                # while Discord was editing it. Discord has the edit, so it's applied again over what's stored
+                # now, unless the event has gone altogether.
+                if event_name not in guild.store:
+                    raise ValueError(f'{event_name} was removed while it was being edited.')
+                guild.store.replace(event_name, updated_event, expected_version=guild.store.version_of(event_name))
+            guild.storage.put(guild.store, updated_event, replaces=event_name)
+
+            return message
+
+    @metrics.instrument('eventmanager_seconds')
+    async def reconcile(self, discord_guild: discord.Guild) -> ReconcileResult:
+        """Syncs a guild's stored events with its scheduled events on Discord, which may have been edited or
+        cancelled from Discord itself.
+
+        The scheduled events are fetched once and the stored events are saved at most once, however much changed."""
+        guild = self.guild(discord_guild.id)
+        known_ids = {e.id for e in guild.store if e.id is not None}
+
+        # What we change while the fetch is in flight may have been fetched as it was before the change.
+        with guild.syncing() as changed_ids:
+            with metrics.timed('discord_api_seconds', method='fetch_scheduled_events'):
+                scheduled_events = await discord_guild.fetch_scheduled_events()
+
+        # Fetched scheduled events come with up to date subscriber counts.
+        self.scheduled_events.rebuild(guild.guild_id, scheduled_events, keep=changed_ids)
+
+        skip_names = {e.name for e in guild.store
+                      if guild.mutations.has_pending(e.name) or guild.locks.locked(e.name)}
+        result = reconcile(guild.store, scheduled_events, known_ids, skip_names,
+                           config_utils.gettz(guild.guild_id, self._config), skip_ids=changed_ids, now=time.time())
+
+        if result:
+            # Events that finished go to the archive rather than disappearing with their scheduled events.
+            finished = [event for event in result.removed if event.end_timestamp <= time.time()]
+            if finished and self._archive:
+                await asyncio.get_running_loop().run_in_executor(None, guild.archive.add, finished)
+            guild.storage.save_all(guild.store)
+
+        return result
+
+    @metrics.instrument('eventmanager_seconds')
+    async def past_events(self, guild_id: int, start: datetime, end: datetime) -> list[Event]:
+        """Returns a guild's archived events starting in the range [start, end), read on a worker thread."""
+        archive = self.guild(guild_id).archive
+
+        return await asyncio.get_running_loop().run_in_executor(None, archive.between, start, end)
+
+    @metrics.instrument('eventmanager_seconds')
+    async def add_series(self, ctx: discord.ApplicationContext,
+                         series_name: str,
+                         first_date: datetime,
+                         rule: str,
+                         description='',
+                         hours=1) -> (Series, list[Event]):
+        """Adds a recurring event, then creates its first few occurrences."""
+        guild = self.guild(ctx.channel.guild.id)
+
+        if first_date < datetime.now(config_utils.gettz(guild.guild_id, self._config)):
+            raise ValueError('Cannot create events in the past.')
+
+        if series_name in guild.series:
+            raise ValueError('A series with that name already exists.')
+
+        tz_name = config_utils.get_guild_option(guild.guild_id, 'tz', 'global', self._config)
+        series = Series(series_name, rule, first_date, tz_name, hours, description)
+        guild.series[series_name] = series
+        guild.save_series()
+
+        return series, await self.materialize_series(ctx.channel.guild)
+
+    @metrics.instrument('eventmanager_seconds')
+    async def materialize_series(self, discord_guild: discord.Guild) -> list[Event]:
+        """Creates events for the upcoming occurrences of each of a guild's series.
+
+        Only the next max_occurrences occurrences within horizon_days are created, so a series costs the same
+        to keep around however long it runs. Run periodically, this rolls each series forward as its
+        occurrences pass."""
+        guild = self.guild(discord_guild.id)
+
+        now = datetime.now(config_utils.gettz(guild.guild_id, self._config))
+        horizon = now + timedelta(days=self._config.getfloat('recurrence', 'horizon_days', fallback=14))
+        max_occurrences = self._config.getint('recurrence', 'max_occurrences', fallback=4)
+
+        created = []
+        series_changed = False
+
+        for series in list(guild.series.values()):
+            start_after = now
+            upcoming = 0
+
+            if series.materialized_until is not None:
+                materialized_until = datetime.fromtimestamp(series.materialized_until, tz=now.tzinfo)
+                upcoming = sum(1 for _ in takewhile(lambda d: d <= materialized_until, series.occurrences(now)))
+                start_after = max(now, materialized_until)
+
+            for occurrence in islice(series.occurrences(start_after), max(max_occurrences - upcoming, 0)):
+                if occurrence > horizon:
+                    break
+
+                try:
+                    event, message = await self._create_event(discord_guild,
+                                                              f'EventNite: occurrence of series {series.name}.',
+                                                              series.occurrence_name(occurrence),
+                                                              occurrence,
+                                                              series.description,
+                                                              series.hours,
+                                                              persist=False)
+                except HTTPException as exc:
+                    # Try again on the next pass.
+                    logging.exception(exc)
+                    break
+                except ValueError as exc:
+                    logging.warning(f'Skipping {series.occurrence_name(occurrence)} ({exc})')
+                    event = None
+
+                if event is not None:
+                    created.append(event)
+
+                series.materialized_until = occurrence.timestamp()
+                series_changed = True
+
+        if created:
+            guild.storage.put_many(guild.store, created)
+        if series_changed:
+            guild.save_series()
+
+        return created
+
+    def _upcoming_occurrence_names(self, guild: GuildState, series: Series) -> list[str]:
+        """Returns the names of the series' occurrences that have been created but haven't started yet."""
+        if series.materialized_until is None:
+            return []
+
+        now = datetime.now(config_utils.gettz(guild.guild_id, self._config))
+        materialized_until = datetime.fromtimestamp(series.materialized_until, tz=now.tzinfo)
+
+        return [series.occurrence_name(d) for d in takewhile(lambda d: d <= materialized_until,
+                                                             series.occurrences(now))
+                if series.occurrence_name(d) in guild.store]
+
+    @metrics.instrument('eventmanager_seconds')
+    async def cancel_series(self, ctx: discord.ApplicationContext, series_name: str) -> int:
+        """Removes a series, cancelling any of its occurrences that haven't started yet.
+
+        Returns the number of occurrences cancelled."""
+        guild = self.guild(ctx.channel.guild.id)
+
+        series = guild.series.get(series_name)
+        if series is None:
+            raise ValueError(f'No series found with name {series_name}.')
+
+        occurrence_names = self._upcoming_occurrence_names(guild, series)
+        for occurrence_name in occurrence_names:
+            await self.delete_event(ctx, occurrence_name)
+
+        del guild.series[series_name]
+        guild.save_series()
+
+        return len(occurrence_names)
+
+    @metrics.instrument('eventmanager_seconds')
+    async def skip_occurrence(self, ctx: discord.ApplicationContext, series_name: str, occurrence_date: date):
+        """Skips a single occurrence of a series, cancelling it if it's already been created."""
+        guild = self.guild(ctx.channel.guild.id)
+
+        series = guild.series.get(series_name)
+        if series is None:
+            raise ValueError(f'No series found with name {series_name}.')
+
+        occurrence_name = series.occurrence_name(occurrence_date)
+        if occurrence_name in self._upcoming_occurrence_names(guild, series):
+            await self.delete_event(ctx, occurrence_name)
 
-        updated_scheduled_event = await scheduled_events[0].edit(
-            name=new_event_name or event_name,
-            description=description,
-            start_time=event_date,
-            end_time=event_date + timedelta(hours=hours),
-            reason=f'EventNite: edit_event called by {str(ctx.interaction.user)}'
-        )
-
-        self.events = consts.read_event_file()
-        self.events = [e for e in self.events if e['name'] != event_name]
-
-        updated_event = Event(updated_scheduled_event.name,
-                              updated_scheduled_event.start_time,
-                              hours,
-                              updated_scheduled_event.location,
-                              updated_scheduled_event.subscriber_count,
-                              updated_scheduled_event.creator_id,
-                              updated_scheduled_event.id)
-        self.events.append(updated_event)
-
-        consts.write_event_file(self.events)
+        series.exceptions.add(occurrence_date)
+        guild.save_series()
@@ -0,0 +1,188 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Callable, Hashable, Iterable, Iterator, Optional
+
+from core.intervalindex import IntervalIndex
+from core.objects.event import Event
+
+
+def location_key(location) -> Hashable:
+    """Reduces an event's location (a channel id, a channel, or a scheduled event location) to a channel id,
+    or to the location's text for external events."""
+    value = getattr(location, 'value', location)
+    value = getattr(value, 'id', value)
+
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class ConflictError(ValueError):
+    """Raised when a change expects an event to be at a version it no longer is."""
+
+
+class EventStore:
+    """Authoritative in-memory copy of the event file.
+
+    Events are indexed by name, by Discord id, by start time and by the time range they take up in each
+    location, so lookups, duplicate checks and overlap checks don't need to re-read or scan the event file.
+    Listeners are called with 'add' or 'remove' and the event whenever the store changes (an edit being a
+    remove followed by an add), and with 'update' when a stored event's Discord id is set.
+
+    Every change bumps the store's version, and each event remembers the version it was last changed at. A
+    caller that reads an event, waits on something, then changes it can pass the version it read as
+    expected_version, and gets a ConflictError instead of overwriting a change made in the meantime."""
+
+    def __init__(self, events: Iterable[Event] = ()):
+        self._by_name: dict[str, Event] = {}
+        self._by_id: dict[int, Event] = {}
+        self._by_date: list[tuple[float, str]] = []
+        self._by_location: dict[Hashable, IntervalIndex] = {}
+        self._intervals: dict[str, tuple[Hashable, float, float]] = {}
+        self.listeners: list[Callable[[str, Event], None]] = []
+
+        self.version = 0
+        self._versions: dict[str, int] = {}
+
+        # Sorting the initial events once is much cheaper than inserting each of them in order.
+        intervals: dict[Hashable, list[tuple[float, float, str]]] = {}
+        for event in events:
+            location, start, end = self._index(event)
+            self._by_date.append((start, event.name))
+            intervals.setdefault(location, []).append((start, end, event.name))
+
+        self._by_date.sort()
+        self._by_location = {location: IntervalIndex(i) for location, i in intervals.items()}
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __contains__(self, event_name: str) -> bool:
+        return event_name in self._by_name
+
+    def __iter__(self) -> Iterator[Event]:
+        """Iterates over the stored events in order of start time."""
+        return (self._by_name[name] for _, name in self._by_date)
+
+    def get(self, event_name: str) -> Optional[Event]:
+        return self._by_name.get(event_name)
+
+    def get_by_id(self, event_id: int) -> Optional[Event]:
+        return self._by_id.get(event_id)
+
+    def version_of(self, event_name: str) -> Optional[int]:
+        """The version a stored event was last changed at, or None if there's no such event."""
+        return self._versions.get(event_name)
+
+    def _check_version(self, event_name: str, expected_version: Optional[int]):
+        if expected_version is not None and self._versions.get(event_name) != expected_version:
+            raise ConflictError(f'{event_name} was changed by something else in the meantime.')
+
+    def _index(self, event: Event) -> tuple[Hashable, float, float]:
+        if event.name in self._by_name:
+            raise ValueError('An event with that name already exists.')
+
+        self._by_name[event.name] = event
+        self._versions[event.name] = self.version
+        if event.id is not None:
+            self._by_id[event.id] = event
+
+        interval = (location_key(event.location), event.timestamp, event.end_timestamp)
+        self._intervals[event.name] = interval
+
+        return interval
+
+    def add(self, event: Event):
+        self.version += 1
+        location, start, end = self._index(event)
+        insort(self._by_date, (start, event.name))
+
+        index = self._by_location.get(location)
+        if index is None:
+            index = self._by_location[location] = IntervalIndex()
+        index.add(start, end, event.name)
+
+        for listener in self.listeners:
+            listener('add', event)
+
+    def remove(self, event_name: str, expected_version: Optional[int] = None) -> Optional[Event]:
+        self._check_version(event_name, expected_version)
+
+        event = self._by_name.pop(event_name, None)
+        if event is None:
+            return None
+
+        self.version += 1
+        del self._versions[event_name]
+
+        if event.id is not None:
+            self._by_id.pop(event.id, None)
+
+        key = (event.timestamp, event_name)
+        index = bisect_left(self._by_date, key)
+        if index < len(self._by_date) and self._by_date[index] == key:
+            del self._by_date[index]
+
+        location, start, end = self._intervals.pop(event_name)
+        self._by_location[location].remove(start, end, event_name)
+
+        for listener in self.listeners:
+            listener('remove', event)
+
+        return event
+
+    def replace(self, event_name: str, event: Event, expected_version: Optional[int] = None):
+        """Swaps out the event stored as event_name for a new one, which may have a different name."""
+        self._check_version(event_name, expected_version)
+        if event.name != event_name and event.name in self._by_name:
+            raise ValueError('An event with that name already exists.')
+
+        self.remove(event_name)
+        self.add(event)
+
+    def set_id(self, event_name: str, event_id: int):
+        """Sets the Discord id of a stored event, which may not have been known when it was added."""
+        event = self._by_name[event_name]
+
+        if event.id is not None:
+            self._by_id.pop(event.id, None)
+        event.id = event_id
+        self._by_id[event_id] = event
+
+        self.version += 1
+        self._versions[event_name] = self.version
+
+        for listener in self.listeners:
+            listener('update', event)
+
+    def range(self, start: float, end: float, after: Optional[tuple[float, str]] = None) -> Iterator[Event]:
+        """Iterates over the events starting in the range [start, end) (as timestamps) in order of start time,
+        beginning after the event with the given (timestamp, name) key if there is one.
+
+        Finding where to start is a bisect, so a page from anywhere in a long schedule costs the same."""
+        index = bisect_left(self._by_date, (start,))
+        if after is not None:
+            index = max(index, bisect_right(self._by_date, after))
+
+        while index < len(self._by_date) and self._by_date[index][0] < end:
+            yield self._by_name[self._by_date[index][1]]
+            index += 1
+
+    def overlapping(self, location, start: datetime, end: datetime, ignore: Optional[str] = None) -> list[Event]:
+        """Returns the events in a location whose time ranges overlap [start, end), other than the one named ignore."""
+        index = self._by_location.get(location_key(location))
+        if index is None:
+            return []
+
+        return [self._by_name[name] for _, _, name in index.overlapping(start.timestamp(), end.timestamp())
+                if name != ignore]
+
+    def free_slots(self, location, start: datetime, end: datetime,
+                   min_length: timedelta = timedelta()) -> list[tuple[datetime, datetime]]:
+        """Returns the stretches of [start, end) at least min_length long when nothing is on in a location."""
+        index = self._by_location.get(location_key(location)) or IntervalIndex()
+        gaps = index.gaps(start.timestamp(), end.timestamp(), min_length.total_seconds())
+
+        return [(datetime.fromtimestamp(gap_start, start.tzinfo), datetime.fromtimestamp(gap_end, start.tzinfo))
+                for gap_start, gap_end in gaps]
@@ -0,0 +1,73 @@
+import configparser
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from core import consts
+from core.eventstore import EventStore
+from core.keyedlock import KeyedLock
+from core.mutationqueue import MutationQueue
+from core.objects.series import Series
+from core.storage.archive import EventArchive
+from core.storage.factory import create_storage
+
+
+class GuildState:
+    """The partition of EventManager's state belonging to a single guild."""
+
+    def __init__(self, guild_id: int, config: configparser.ConfigParser):
+        self.guild_id = guild_id
+
+        self.storage = create_storage(config, guild_id)
+        self.archive = EventArchive(guild_id, config.get('storage', 'format', fallback='json'))
+        self.store = EventStore(self.storage.load())
+        self.series: dict[str, Series] = {s['name']: Series.from_dict(s) for s in consts.read_series_file(guild_id)}
+
+        # Held by event name while a command changes that event, so commands on different events run in parallel.
+        self.locks = KeyedLock()
+
+        self.mutations = MutationQueue(config.getfloat('queue', 'rate', fallback=5),
+                                       config.getfloat('queue', 'per', fallback=5),
+                                       config.getint('queue', 'max_attempts', fallback=3))
+
+        # For each sync in progress, the ids of the scheduled events we've changed since it started fetching
+        # them, which it may have fetched as they were beforehand.
+        self._syncs: list[set[int]] = []
+
+    def changed(self, event_id: Optional[int]):
+        """Notes that we've changed (or cancelled) a scheduled event, for any syncs in progress."""
+        if event_id is None:
+            return
+
+        for ids in self._syncs:
+            ids.add(event_id)
+
+    @contextmanager
+    def syncing(self) -> Iterator[set[int]]:
+        """Collects the ids of the scheduled events changed while the block runs."""
+        ids = set()
+        self._syncs.append(ids)
+        try:
+            yield ids
+        finally:
+            self._syncs = [other for other in self._syncs if other is not ids]
+
+    def archive_finished(self, now: float) -> int:
+        """Moves the events that finished before now into the archive, returning how many there were."""
+        finished = [event for event in self.store if event.end_timestamp <= now]
+        if not finished:
+            return 0
+
+        # Archived first, so a crash in between leaves the events in both places rather than neither.
+        self.archive.add(finished)
+        for event in finished:
+            self.store.remove(event.name)
+        self.storage.save_all(self.store)
+
+        return len(finished)
+
+    def save_series(self):
+        consts.write_series_file([s.to_dict() for s in self.series.values()], self.guild_id)
+
+    def close(self):
+        self.mutations.close()
+        self.storage.close()
@@ -0,0 +1,160 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from dateutil.tz import gettz
+
+from core.converters import add_tzinfo_to_datetime
+
+
+class ImportRow:
+    """A single event read from an import file, or the reason it couldn't be."""
+
+    def __init__(self, line: int, name: str = '', date: Optional[datetime] = None, hours: float = 1,
+                 description: str = '', error: Optional[str] = None):
+        self.line = line
+        self.name = name
+        self.date = date
+        self.hours = hours
+        self.description = description
+        self.error = error
+
+
+def parse_import_file(filename: str, text: str) -> list[ImportRow]:
+    if filename.lower().endswith('.ics') or text.lstrip().startswith('BEGIN:VCALENDAR'):
+        return parse_ics(text)
+
+    return parse_csv(text)
+
+
+def parse_csv(text: str) -> list[ImportRow]:
+    """Reads events from a CSV file with name and date columns, and optional hours and description columns."""
+    rows = []
+    reader = csv.DictReader(io.StringIO(text))
+
+    if reader.fieldnames is None or not {'name', 'date'} <= {f.strip().lower() for f in reader.fieldnames}:
+        return [ImportRow(1, error='The file needs a header row with at least name and date columns.')]
+
+    for values in reader:
+        values = {k.strip().lower(): (v or '').strip() for k, v in values.items() if k is not None}
+        row = ImportRow(reader.line_num, values['name'], description=values.get('description', ''))
+        rows.append(row)
+
+        try:
+            row.date = add_tzinfo_to_datetime(values['date'])
+            if values.get('hours'):
+                row.hours = float(values['hours'])
+        except (ValueError, OverflowError) as exc:
+            row.error = f'Unable to parse row ({exc}).'
+
+    return rows
+
+
+def _unfold_ics_lines(text: str) -> list[str]:
+    lines = []
+
+    for line in text.splitlines():
+        if line.startswith((' ', '\t')) and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+
+    return lines
+
+
+def _parse_ics_date(params: dict[str, str], value: str) -> datetime:
+    if params.get('VALUE') == 'DATE':
+        raise ValueError('all-day events aren\'t supported')
+
+    if value.endswith('Z'):
+        return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+
+    date = datetime.strptime(value, '%Y%m%dT%H%M%S')
+    if 'TZID' in params:
+        date = date.replace(tzinfo=gettz(params['TZID']))
+
+    return date
+
+
+def _parse_ics_duration(value: str) -> float:
+    hours = 0.0
+    number = ''
+
+    for char in value.lstrip('+P').replace('T', ''):
+        if char.isdigit():
+            number += char
+            continue
+
+        hours += int(number or 0) * {'W': 168, 'D': 24, 'H': 1, 'M': 1 / 60, 'S': 1 / 3600}[char]
+        number = ''
+
+    return hours
+
+
+def parse_ics(text: str) -> list[ImportRow]:
+    """Reads the VEVENTs from an iCalendar file."""
+    rows = []
+    row: Optional[ImportRow] = None
+    end: Optional[datetime] = None
+
+    for line_number, line in enumerate(_unfold_ics_lines(text), start=1):
+        key, _, value = line.partition(':')
+        name, *param_list = key.split(';')
+        params = dict(p.split('=', 1) for p in param_list if '=' in p)
+
+        if line == 'BEGIN:VEVENT':
+            row = ImportRow(line_number)
+            end = None
+            continue
+        elif row is None:
+            continue
+
+        try:
+            if name == 'SUMMARY':
+                row.name = value.replace('\\,', ',').replace('\\n', '\n')
+            elif name == 'DESCRIPTION':
+                row.description = value.replace('\\,', ',').replace('\\n', '\n')
+            elif name == 'DTSTART':
+                row.date = _parse_ics_date(params, value)
+            elif name == 'DTEND':
+                end = _parse_ics_date(params, value)
+            elif name == 'DURATION':
+                row.hours = _parse_ics_duration(value)
+        except (ValueError, KeyError) as exc:
+            row.error = f'Unable to parse {name} ({exc}).'
+
+        if line == 'END:VEVENT':
+            if end is not None and row.date is not None and row.error is None:
+                # A DTEND without a time zone (a floating time) is read as being in DTSTART's.
+                if (end.tzinfo is None) != (row.date.tzinfo is None):
+                    end = end.replace(tzinfo=row.date.tzinfo)
+                row.hours = (end - row.date) / timedelta(hours=1)
+            rows.append(row)
+            row = None
+
+    return rows
+
+
+def validate_import_rows(rows: list[ImportRow], existing_names, now: datetime):
+    """Marks rows that can't be added as events, so nothing is created until every row has been checked."""
+    seen_names = set()
+
+    for row in rows:
+        if row.error is not None:
+            continue
+
+        if not row.name:
+            row.error = 'No event name given.'
+        elif row.date is None:
+            row.error = 'No event date given.'
+        elif row.date.tzinfo is None:
+            row.error = 'No time zone given for the event date.'
+        elif row.date < now:
+            row.error = 'Cannot create events in the past.'
+        elif row.hours <= 0:
+            row.error = 'Events must last longer than zero hours.'
+        elif row.name in existing_names or row.name in seen_names:
+            row.error = 'An event with that name already exists.'
+
+        seen_names.add(row.name)
@@ -0,0 +1,67 @@
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Hashable, Iterable, Iterator
+
+
+class IntervalIndex:
+    """Half-open [start, end) intervals kept sorted by start, for finding the ones overlapping a range.
+
+    Anything overlapping [start, end) has to start after start minus the longest interval's length, so a
+    query is a bisect to that point followed by a walk over the intervals up to end; the cost doesn't grow
+    with the number of intervals that ended long before the range."""
+
+    def __init__(self, intervals: Iterable[tuple[float, float, Hashable]] = ()):
+        self._intervals: list[tuple[float, float, Hashable]] = sorted(intervals)
+        self._lengths: Counter[float] = Counter(end - start for start, end, _ in self._intervals)
+        self._max_length = max(self._lengths, default=0.0)
+
+    def __len__(self) -> int:
+        return len(self._intervals)
+
+    def add(self, start: float, end: float, key: Hashable):
+        insort(self._intervals, (start, end, key))
+
+        length = end - start
+        self._lengths[length] += 1
+        self._max_length = max(self._max_length, length)
+
+    def remove(self, start: float, end: float, key: Hashable):
+        interval = (start, end, key)
+        index = bisect_left(self._intervals, interval)
+        if index == len(self._intervals) or self._intervals[index] != interval:
+            return
+
+        del self._intervals[index]
+
+        length = end - start
+        self._lengths[length] -= 1
+        if not self._lengths[length]:
+            del self._lengths[length]
+            if length == self._max_length:
+                self._max_length = max(self._lengths, default=0.0)
+
+    def overlapping(self, start: float, end: float) -> Iterator[tuple[float, float, Hashable]]:
+        """Yields the intervals overlapping [start, end), ordered by start."""
+        index = bisect_left(self._intervals, (start - self._max_length,))
+
+        for i in range(index, len(self._intervals)):
+            interval = self._intervals[i]
+            if interval[0] >= end:
+                break
+            if interval[1] > start:
+                yield interval
+
+    def gaps(self, start: float, end: float, min_length: float = 0) -> list[tuple[float, float]]:
+        """Returns the parts of [start, end) not covered by any interval that are at least min_length long."""
+        gaps = []
+        cursor = start
+
+        for interval_start, interval_end, _ in self.overlapping(start, end):
+            if interval_start - cursor >= min_length and interval_start > cursor:
+                gaps.append((cursor, interval_start))
+            cursor = max(cursor, interval_end)
+
+        if end - cursor >= min_length and end > cursor:
+            gaps.append((cursor, end))
+
+        return gaps
@@ -0,0 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+
+class KeyedLock:
+    """An asyncio lock per key, so work on one key never waits for work on another.
+
+    Locking several keys at once takes them in a fixed order, so two callers locking overlapping sets of keys
+    can't deadlock. A key's lock only exists while something holds or is waiting for it."""
+
+    def __init__(self):
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        # How many callers hold or are waiting for each key's lock.
+        self._users: dict[Hashable, int] = {}
+
+    def locked(self, key: Hashable) -> bool:
+        return key in self._locks and self._locks[key].locked()
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def __call__(self, *keys: Hashable) -> AsyncIterator[None]:
+        keys = sorted({key for key in keys if key is not None}, key=repr)
+
+        for key in keys:
+            if key not in self._locks:
+                self._locks[key] = asyncio.Lock()
+            self._users[key] = self._users.get(key, 0) + 1
+
+        acquired = []
+        try:
+            for key in keys:
+                await self._locks[key].acquire()
+                acquired.append(key)
+
+            yield
+        finally:
+            for key in acquired:
+                self._locks[key].release()
+
+            for key in keys:
+                self._users[key] -= 1
+                if not self._users[key]:
+                    del self._users[key]
+                    del self._locks[key]
@@ -0,0 +1,200 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+# Upper bounds of the latency histogram buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+
+# Prefixed to every metric's name when they're exposed.
+NAMESPACE = 'eventnite'
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels, **extra) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ''
+
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile as the upper bound of the bucket it falls in (or the largest value seen)."""
+        rank = q * self.count
+        seen = 0
+
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max)
+
+        return self.max
+
+
+class Metrics:
+    """Latency histograms and counters, keyed by name and labels, exposable in Prometheus' text format.
+
+    Collectors are called when the metrics are rendered, and return (name, labels, value) gauges for state
+    that's cheaper to read on demand than to keep updated, like queue depths."""
+
+    def __init__(self):
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.collectors: list[Callable[[], Iterable[tuple[str, dict, float]]]] = []
+
+        # Storage can be written to from worker threads.
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels):
+        with self._lock:
+            histograms = self.histograms.setdefault(name, {})
+            key = _labels(labels)
+            if key not in histograms:
+                histograms[key] = Histogram()
+            histograms[key].observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        with self._lock:
+            counters = self.counters.setdefault(name, {})
+            key = _labels(labels)
+            counters[key] = counters.get(key, 0) + amount
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self.histograms.get(name, {}).get(_labels(labels))
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get(name, {}).get(_labels(labels), 0)
+
+    @contextmanager
+    def timed(self, name: str, **labels):
+        """Observes how long the body of the with statement takes, whether or not it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def instrument(self, name: str, label: str = 'method'):
+        """Decorates a function (or coroutine function) to observe how long each call takes, labelled with the
+        function's name."""
+        def decorator(func):
+            labels = {label: func.__name__}
+
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def wrapper(*args, **kwargs):
+                    with self.timed(name, **labels):
+                        return await func(*args, **kwargs)
+            else:
+                @functools.wraps(func)
+                def wrapper(*args, **kwargs):
+                    with self.timed(name, **labels):
+                        return func(*args, **kwargs)
+
+            return wrapper
+        return decorator
+
+    def render(self) -> str:
+        """Renders every metric in Prometheus' text exposition format."""
+        lines = []
+
+        with self._lock:
+            for name, histograms in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {NAMESPACE}_{name} histogram')
+                for labels, histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{NAMESPACE}_{name}_bucket{_format_labels(labels, le=_format_bound(bound))} '
+                                     f'{cumulative}')
+                    lines.append(f'{NAMESPACE}_{name}_sum{_format_labels(labels)} {histogram.sum}')
+                    lines.append(f'{NAMESPACE}_{name}_count{_format_labels(labels)} {histogram.count}')
+
+            for name, counters in sorted(self.counters.items()):
+                lines.append(f'# TYPE {NAMESPACE}_{name} counter')
+                for labels, value in sorted(counters.items()):
+                    lines.append(f'{NAMESPACE}_{name}{_format_labels(labels)} {value}')
+
+        gauges: dict[str, list[str]] = {}
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                gauges.setdefault(name, []).append(f'{NAMESPACE}_{name}{_format_labels(_labels(labels))} {value}')
+
+        for name, samples in sorted(gauges.items()):
+            lines.append(f'# TYPE {NAMESPACE}_{name} gauge')
+            lines.extend(samples)
+
+        return '\n'.join(lines) + '\n'
+
+
+# The bot only ever has the one set of metrics; everything records into this.
+metrics = Metrics()
+
+
+class RateLimitLogHandler(logging.Handler):
+    """Counts the rate limits Discord answers requests with, as discord_rate_limited_total by route.
+
+    py-cord's HTTP client sleeps out and retries a 429 itself, up to 5 times, so callers only see the ones it
+    gives up on; the warning it logs to the discord.http logger before each retry is the only sign of the rest.
+    Attach it to that logger, which has to let warnings through."""
+
+    def __init__(self, metrics: Metrics = metrics):
+        super().__init__(logging.WARNING)
+        self.metrics = metrics
+
+    def emit(self, record: logging.LogRecord):
+        if not isinstance(record.msg, str) or not record.msg.startswith('We are being rate limited'):
+            return
+
+        # Buckets are "<channel id>:<guild id>:<route>"; the route alone keeps the labels few.
+        bucket = str(record.args[1]) if isinstance(record.args, tuple) and len(record.args) > 1 else ''
+        self.metrics.increment('discord_rate_limited_total', route=bucket.rsplit(':', 1)[-1])
+
+
+async def serve_metrics(host: str, port: int):
+    """Serves the metrics over HTTP at /metrics, returning the runner so the server can be shut down."""
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(body=metrics.render().encode(),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+
+    return runner
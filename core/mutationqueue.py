@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+
+from core.metrics import metrics
+
+CREATE = 'create_scheduled_event'
+EDIT = 'edit'
+CANCEL = 'cancel'
+
+
+class Mutation:
+    """A pending call to one of Discord's scheduled event endpoints.
+
+    target is the object the call is made on: the guild for a create, or the scheduled event (or a future
+    resolving to it, if its create is still in flight) for an edit or cancel."""
+
+    def __init__(self, key: str, target: Any, method: str, kwargs: dict, enqueued_at: float):
+        self.key = key
+        self.target = target
+        self.method = method
+        self.kwargs = kwargs
+        self.enqueued_at = enqueued_at
+        self.futures: list[asyncio.Future] = []
+
+
+class MutationQueue:
+    """Outbound queue of scheduled event mutations for a single guild.
+
+    Mutations are sent one at a time, no faster than rate per per seconds, and mutations to an event that
+    haven't been sent yet are coalesced: edits are merged into a pending create or edit, and a cancel
+    replaces a pending edit or cancels out a pending create entirely. Each submitted mutation gets a future
+    resolving to the result of the call that ended up covering it (None if nothing needed to be sent).
+    Listeners are called with each mutation that's sent and its result, before those futures resolve."""
+
+    def __init__(self, rate: float = 5, per: float = 5, max_attempts: int = 3):
+        self.rate = rate
+        self.per = per
+        self.max_attempts = max_attempts
+
+        self.listeners: list[Callable[[Mutation, Any], None]] = []
+
+        self._pending: dict[str, Mutation] = {}
+        self._in_flight: Optional[Mutation] = None
+        self._drainer: Optional[asyncio.Task] = None
+
+        self._tokens = rate
+        self._last_refill: Optional[float] = None
+
+        self._waits: deque[float] = deque(maxlen=100)
+        self.sent = 0
+        self.coalesced = 0
+        self.rate_limited = 0
+
+    def __len__(self) -> int:
+        return len(self._pending) + (self._in_flight is not None)
+
+    def submit(self, key: str, target: Any, method: str, **kwargs) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        mutation = self._pending.get(key)
+
+        if mutation is None:
+            mutation = Mutation(key, target, method, kwargs, time.monotonic())
+            self._pending[key] = mutation
+        elif method == CANCEL and mutation.method == CREATE:
+            # The event was never created, so there's nothing to cancel.
+            del self._pending[key]
+            for pending_future in mutation.futures:
+                pending_future.set_result(None)
+            future.set_result(None)
+            self.coalesced += 2
+            return future
+        elif mutation.method == CANCEL and method != CANCEL:
+            raise ValueError(f'{key} is already being cancelled.')
+        elif method == EDIT:
+            mutation.kwargs.update(kwargs)
+            self.coalesced += 1
+        elif method == CANCEL:
+            mutation.method = CANCEL
+            mutation.kwargs = kwargs
+            self.coalesced += 1
+        else:
+            raise ValueError(f'Can\'t queue {method} after a pending {mutation.method} of {key}.')
+
+        if method == EDIT and 'name' in kwargs and kwargs['name'] != key:
+            # Later mutations will refer to the event by its new name.
+            self._pending[kwargs['name']] = self._pending.pop(key)
+            mutation.key = kwargs['name']
+
+        mutation.futures.append(future)
+        self._ensure_drainer()
+
+        return future
+
+    def created(self, key: str) -> Optional[asyncio.Future]:
+        """Returns a future for the scheduled event being created under key, if its create hasn't finished yet."""
+        mutation = self._in_flight
+        if mutation is None or mutation.key != key or mutation.method != CREATE or not mutation.futures:
+            return None
+
+        return asyncio.shield(mutation.futures[0])
+
+    def has_pending(self, key: str) -> bool:
+        return key in self._pending
+
+    def stats(self) -> dict[str, float]:
+        now = time.monotonic()
+        return {
+            'depth': len(self),
+            'oldest_wait': max((now - m.enqueued_at for m in self._pending.values()), default=0),
+            'average_wait': sum(self._waits) / len(self._waits) if self._waits else 0,
+            'max_wait': max(self._waits, default=0),
+            'sent': self.sent,
+            'coalesced': self.coalesced,
+            'rate_limited': self.rate_limited,
+        }
+
+    async def join(self):
+        """Waits until everything queued so far has been sent."""
+        while self._pending or self._in_flight is not None:
+            futures = [f for m in [*self._pending.values(), self._in_flight] if m is not None for f in m.futures]
+            if not futures:
+                await asyncio.sleep(0)
+                continue
+            await asyncio.wait(futures)
+
+    def close(self):
+        if self._drainer is not None and not self._drainer.done():
+            self._drainer.cancel()
+            self._drainer = None
+
+    def _ensure_drainer(self):
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _take_token(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            now = loop.time()
+            if self._last_refill is not None:
+                self._tokens = min(self.rate, self._tokens + (now - self._last_refill) * self.rate / self.per)
+            self._last_refill = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    async def _drain(self):
+        # Runs until the queue is empty; submit starts it again when something new comes in.
+        while self._pending:
+            await self._take_token()
+            if not self._pending:
+                continue
+
+            key = next(iter(self._pending))
+            mutation = self._pending.pop(key)
+            self._in_flight = mutation
+            self._waits.append(time.monotonic() - mutation.enqueued_at)
+
+            try:
+                result = await self._send(mutation)
+            except Exception as exc:
+                for future in mutation.futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            else:
+                for listener in self.listeners:
+                    listener(mutation, result)
+                for future in mutation.futures:
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                self._in_flight = None
+
+    async def _send(self, mutation: Mutation):
+        # Imported here so the queue (and the guild state that owns it) can be imported without discord.
+        from discord import HTTPException
+
+        target = mutation.target
+        if isinstance(target, asyncio.Future):
+            target = await target
+            if target is None:
+                return None
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with metrics.timed('discord_api_seconds', method=mutation.method):
+                    result = await getattr(target, mutation.method)(**mutation.kwargs)
+                self.sent += 1
+                return result
+            except HTTPException as exc:
+                # py-cord retries 429s itself before giving up and raising one, and RateLimitLogHandler counts
+                # those, so this only retries (and counts in discord_retries_total) the ones it gave up on.
+                if exc.status != 429 or attempt == self.max_attempts:
+                    raise
+
+                self.rate_limited += 1
+                metrics.increment('discord_retries_total', method=mutation.method)
+                retry_after = float(exc.response.headers.get('Retry-After', self.per / self.rate))
+                logging.warning(f'Rate limited sending {mutation.method} for {mutation.key}; '
+                                f'retrying in {retry_after}s.')
+                await asyncio.sleep(retry_after)
@@ -0,0 +1,37 @@
+from bisect import bisect_left, insort
+from typing import Iterable
+
+# Discord only shows this many autocomplete choices.
+MAX_CHOICES = 25
+
+
+class PrefixIndex:
+    """Sorted array of names supporting case-insensitive prefix lookups with bisect."""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._keys: list[tuple[str, str]] = sorted((name.lower(), name) for name in names)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, name: str):
+        insort(self._keys, (name.lower(), name))
+
+    def remove(self, name: str):
+        key = (name.lower(), name)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def complete(self, prefix: str, limit: int = MAX_CHOICES) -> list[str]:
+        prefix = prefix.lower()
+        names = []
+
+        for index in range(bisect_left(self._keys, (prefix,)), len(self._keys)):
+            key, name = self._keys[index]
+            if not key.startswith(prefix) or len(names) == limit:
+                break
+            names.append(name)
+
+        return names
+
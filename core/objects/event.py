@@ -1,87 +1,180 @@
+import re
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, TYPE_CHECKING
 
-from discord import VoiceChannel, StageChannel, ScheduledEventLocation
+# Only needed for annotations; events are also loaded by tools that don't run the bot.
+if TYPE_CHECKING:
+    from discord import VoiceChannel, StageChannel, ScheduledEventLocation
 
+# Offsets used to be saved as utcoffset().seconds, which wraps negative offsets around to the previous day
+# (UTC-5 was saved as 68400); no real offset is more than 14 hours ahead, so anything past that is one of those.
+# No real offset is more than 12 hours behind either, so anything from 12 to 14 hours could be either; the
+# saved time zone name decides those.
+_MAX_UTC_OFFSET = 14 * 60 * 60
+_MIN_AMBIGUOUS_OFFSET = 12 * 60 * 60
+_DAY = 24 * 60 * 60
+
+# Names zones without an abbreviation of their own go by, like -10 or UTC-10:00.
+_NUMERIC_TZ_NAME = re.compile(r'(?:UTC|GMT)?([+-])(\d{1,2})(?::?(\d{2}))?$')
+
+# Abbreviations of the zones 10 to 12 hours behind UTC that there's no zone file for.
+_WRAPPED_ABBREVIATIONS = {'SST': -11 * 60 * 60}
+
+
+@lru_cache(maxsize=None)
+def _timezone(offset: int, name: Optional[str]) -> timezone:
+    return timezone(timedelta(seconds=offset), name)
+
+
+def _offset_of(name: Optional[str], timestamp: float) -> Optional[int]:
+    """The UTC offset, in seconds, a saved time zone name had at the given time, if it can be worked out."""
+    if not name:
+        return None
+
+    match = _NUMERIC_TZ_NAME.match(name)
+    if match is not None:
+        sign, hours, minutes = match.groups()
+        seconds = int(hours) * 60 * 60 + int(minutes or 0) * 60
+        return -seconds if sign == '-' else seconds
+    if name.upper() in _WRAPPED_ABBREVIATIONS:
+        return _WRAPPED_ABBREVIATIONS[name.upper()]
+
+    # Imported here, as only legacy records need it.
+    from core.converters import resolve_tz
+
+    tz = resolve_tz(name)
+    if tz is None or isinstance(tz, int):
+        return tz
+
+    offset = datetime.fromtimestamp(timestamp, tz).utcoffset()
+    return int(offset.total_seconds()) if offset is not None else None
+
+
+def _saved_offset(offset: int, name: Optional[str], timestamp: float) -> int:
+    """Undoes the wrapping of negative offsets saved by earlier versions."""
+    if offset > _MAX_UTC_OFFSET:
+        return offset - _DAY
+    if offset >= _MIN_AMBIGUOUS_OFFSET and _offset_of(name, timestamp) == offset - _DAY:
+        return offset - _DAY
+
+    return offset
+
+
+class Event:
+    __slots__ = ('_name', '_timestamp', '_hours', '_tz_offset', '_tz_name', '_date', '_end_date',
+                 'location', 'subscriber_count', 'creator_id', 'id', 'completed')
 
-class Event(dict):
     def __init__(self,
                  name: str,
                  date: datetime,
-                 hours: int,
-                 location: str | int | VoiceChannel | StageChannel | ScheduledEventLocation,
+                 hours: float,
+                 location: 'str | int | VoiceChannel | StageChannel | ScheduledEventLocation',
                  subscriber_count: Optional[int] = None,
                  creator_id: Optional[int] = None,
                  id: Optional[int] = None
                  ):
-        dict.__init__(self, name=name,
-                      date=date.timestamp(),
-                      hours=hours,
-                      location=location,
-                      subscriber_count=subscriber_count,
-                      creator_id=creator_id,
-                      id=id)
-        self['tz_offset'] = date.utcoffset().seconds
-        self['tz_name'] = date.tzname()
+        self._name = name
+        # Slash command options arrive as strings unless they're declared otherwise.
+        self._hours = float(hours)
+        self.location = location
+        self.subscriber_count = subscriber_count
+        self.creator_id = creator_id
+        self.id = id
+        self.completed = False
+
+        self.date = date
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Event':
+        """Builds an event from its saved form, without materializing its date until it's needed."""
+        event = cls.__new__(cls)
+
+        event._name = data['name']
+        event._timestamp = data['date']
+        event._hours = float(data['hours'])
+        event.location = data['location']
+        event.subscriber_count = data.get('subscriber_count')
+        event.creator_id = data.get('creator_id')
+        event.id = data.get('id')
+        event.completed = data.get('completed', False)
+
+        event._tz_name = data.get('tz_name')
+        event._tz_offset = _saved_offset(data['tz_offset'], event._tz_name, event._timestamp)
+
+        event._date = None
+        event._end_date = None
+
+        return event
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self._name,
+            'date': self._timestamp,
+            'hours': self._hours,
+            'location': self.location,
+            'subscriber_count': self.subscriber_count,
+            'creator_id': self.creator_id,
+            'id': self.id,
+            'tz_offset': self._tz_offset,
+            'tz_name': self._tz_name,
+            'completed': self.completed,
+        }
+
+    def __repr__(self) -> str:
+        return f'Event({self._name!r}, {self.date.isoformat()}, {self._hours}h)'
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Event) and self.to_dict() == other.to_dict()
+
+    def __lt__(self, other: 'Event') -> bool:
+        return (self._timestamp, self._name) < (other._timestamp, other._name)
 
     @property
     def name(self) -> str:
-        return self['name']
+        return self._name
 
     @name.setter
     def name(self, value: str):
-        self['name'] = value
+        self._name = value
+
+    @property
+    def timestamp(self) -> float:
+        return self._timestamp
 
     @property
     def date(self) -> datetime:
-        tz = timezone(timedelta(seconds=self['tz_offset']), self['tz_name'])
-        date = datetime.fromtimestamp(self['date'], tz=tz)
-        return date
+        if self._date is None:
+            tz = _timezone(self._tz_offset, self._tz_name)
+            self._date = datetime.fromtimestamp(self._timestamp, tz=tz)
+        return self._date
 
     @date.setter
     def date(self, value: datetime):
-        self['date'] = value.timestamp()
-
-    @property
-    def hours(self) -> int:
-        return int(self['hours'])
-
-    @hours.setter
-    def hours(self, value: int):
-        self['hours'] = value
+        self._timestamp = value.timestamp()
+        self._tz_offset = int(value.utcoffset().total_seconds())
+        self._tz_name = value.tzname()
 
-    @property
-    def location(self) -> str | int | VoiceChannel | StageChannel | ScheduledEventLocation:
-        return self['location']
-
-    @location.setter
-    def location(self, value: str | int | VoiceChannel | StageChannel | ScheduledEventLocation):
-        self['location'] = value
+        self._date = None
+        self._end_date = None
 
     @property
-    def subscriber_count(self) -> int:
-        return self['subscriber_count']
+    def hours(self) -> float:
+        # Not rounded: imported and synced events can last part of an hour.
+        return self._hours
 
-    @subscriber_count.setter
-    def subscriber_count(self, value: int):
-        self['subscriber_count'] = value
-
-    @property
-    def creator_id(self) -> int:
-        return self['creator_id']
-
-    @creator_id.setter
-    def creator_id(self, value: int):
-        self['creator_id'] = value
+    @hours.setter
+    def hours(self, value: float):
+        self._hours = float(value)
+        self._end_date = None
 
     @property
-    def id(self) -> int:
-        return self['id']
-
-    @id.setter
-    def id(self, value: int):
-        self['id'] = value
+    def end_timestamp(self) -> float:
+        # Dates are always in a fixed offset zone, so this is the same as end_date.timestamp().
+        return self._timestamp + self.hours * 60 * 60
 
     @property
     def end_date(self) -> datetime:
-        return self.date + timedelta(hours=self.hours)
+        if self._end_date is None:
+            self._end_date = self.date + timedelta(hours=self.hours)
+        return self._end_date
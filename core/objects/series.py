@@ -0,0 +1,80 @@
+from datetime import datetime, date
+from typing import Iterable, Iterator, Optional
+
+from dateutil.rrule import rrule, rrulestr
+from dateutil.tz import gettz
+
+# Shorthands accepted in place of a full RRULE.
+RULE_SHORTHANDS = {
+    'daily': 'FREQ=DAILY',
+    'weekly': 'FREQ=WEEKLY',
+    'biweekly': 'FREQ=WEEKLY;INTERVAL=2',
+    'monthly': 'FREQ=MONTHLY',
+}
+
+
+class Series:
+    """A recurring event, stored as an RRULE plus the dates of any skipped occurrences.
+
+    The first occurrence is kept as a wall clock time in a named zone, so later occurrences stay at the same
+    local time across DST changes. Occurrences are generated lazily; materialized_until is the start of the
+    latest one that's been created as an event."""
+    __slots__ = ('name', 'rule', 'start', 'tz_name', 'hours', 'description', 'exceptions', 'materialized_until',
+                 'rrule')
+
+    def __init__(self,
+                 name: str,
+                 rule: str,
+                 start: datetime,
+                 tz_name: str,
+                 hours: float,
+                 description: str = '',
+                 exceptions: Iterable[date] = (),
+                 materialized_until: Optional[float] = None
+                 ):
+        rule = RULE_SHORTHANDS.get(rule.strip().lower(), rule.strip())
+        if rule.upper().startswith('RRULE:'):
+            rule = rule[len('RRULE:'):]
+
+        self.name = name
+        self.rule = rule
+        self.tz_name = tz_name
+        self.start = start.astimezone(gettz(tz_name))
+        self.hours = float(hours)
+        self.description = description
+        self.exceptions = set(exceptions)
+        self.materialized_until = materialized_until
+
+        self.rrule: rrule = rrulestr(self.rule, dtstart=self.start)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Series':
+        return cls(data['name'],
+                   data['rule'],
+                   datetime.fromisoformat(data['start']).replace(tzinfo=gettz(data['tz_name'])),
+                   data['tz_name'],
+                   data['hours'],
+                   data.get('description', ''),
+                   (date.fromisoformat(d) for d in data.get('exceptions', [])),
+                   data.get('materialized_until'))
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'rule': self.rule,
+            'start': self.start.replace(tzinfo=None).isoformat(),
+            'tz_name': self.tz_name,
+            'hours': self.hours,
+            'description': self.description,
+            'exceptions': sorted(d.isoformat() for d in self.exceptions),
+            'materialized_until': self.materialized_until,
+        }
+
+    def occurrences(self, after: datetime) -> Iterator[datetime]:
+        """Lazily yields the start of each occurrence after the given time, skipping exceptions."""
+        for occurrence in self.rrule.xafter(after):
+            if occurrence.date() not in self.exceptions:
+                yield occurrence
+
+    def occurrence_name(self, occurrence: datetime | date) -> str:
+        return f'{self.name} ({occurrence:%Y-%m-%d})'
@@ -0,0 +1,105 @@
+import logging
+from datetime import timedelta, tzinfo
+from typing import Iterable, Optional
+
+import discord
+from discord import ScheduledEventStatus
+
+from core.eventstore import EventStore
+from core.objects.event import Event
+
+
+class ReconcileResult:
+    def __init__(self):
+        self.added: list[Event] = []
+        self.changed: list[Event] = []
+        self.removed: list[Event] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def __str__(self) -> str:
+        return f'{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed'
+
+
+def _location_of(scheduled_event: discord.ScheduledEvent) -> str | int:
+    value = scheduled_event.location.value if scheduled_event.location is not None else None
+    return getattr(value, 'id', value)
+
+
+def event_from_scheduled_event(scheduled_event: discord.ScheduledEvent,
+                               existing: Optional[Event] = None,
+                               tz: Optional[tzinfo] = None) -> Event:
+    """Builds an event from a scheduled event, keeping the time zone and length of the existing copy if it has one."""
+    start_time = scheduled_event.start_time
+    hours = existing.hours if existing is not None else 1
+
+    if existing is not None:
+        start_time = start_time.astimezone(existing.date.tzinfo)
+    elif tz is not None:
+        start_time = start_time.astimezone(tz)
+    if scheduled_event.end_time is not None:
+        hours = (scheduled_event.end_time - scheduled_event.start_time) / timedelta(hours=1)
+
+    return Event(scheduled_event.name,
+                 start_time,
+                 hours,
+                 _location_of(scheduled_event),
+                 scheduled_event.subscriber_count,
+                 scheduled_event.creator_id,
+                 scheduled_event.id)
+
+
+def _differs(event: Event, other: Event) -> bool:
+    return ((event.name, event.timestamp, event.hours, event.location, event.subscriber_count, event.creator_id) !=
+            (other.name, other.timestamp, other.hours, other.location, other.subscriber_count, other.creator_id))
+
+
+def reconcile(store: EventStore,
+              scheduled_events: Iterable[discord.ScheduledEvent],
+              known_ids: set[int],
+              skip_names: set[str] = frozenset(),
+              tz: Optional[tzinfo] = None,
+              skip_ids: set[int] = frozenset(),
+              now: Optional[float] = None) -> ReconcileResult:
+    """Brings the store in line with a guild's scheduled events in a single pass, joining them on Discord id.
+
+    Only events whose ids are in known_ids (the ones stored before the scheduled events were fetched) can be
+    treated as vanished, so events added while the fetch was in flight aren't thrown away; events named in
+    skip_names have changes of our own on their way to Discord, and those with ids in skip_ids were changed
+    by us while the fetch was in flight, so both are left alone. Events new to the store are given the time
+    zone tz, and aren't added at all if they ended before now (they've been archived, or are about to be,
+    though Discord may not have ended them yet)."""
+    result = ReconcileResult()
+    remote = {e.id: e for e in scheduled_events
+              if e.status in (ScheduledEventStatus.scheduled, ScheduledEventStatus.active)}
+
+    for event_id in known_ids:
+        event = store.get_by_id(event_id)
+        if event is None or event.name in skip_names or event_id in remote or event_id in skip_ids:
+            continue
+
+        store.remove(event.name)
+        result.removed.append(event)
+
+    for event_id, scheduled_event in remote.items():
+        event = store.get_by_id(event_id)
+        if (event is not None and event.name in skip_names) or event_id in skip_ids:
+            continue
+
+        updated_event = event_from_scheduled_event(scheduled_event, event, tz)
+        if event is None and now is not None and updated_event.end_timestamp <= now:
+            continue
+
+        try:
+            if event is None:
+                store.add(updated_event)
+                result.added.append(updated_event)
+            elif _differs(event, updated_event):
+                store.replace(event.name, updated_event)
+                result.changed.append(updated_event)
+        except ValueError:
+            logging.warning(f'Not syncing scheduled event {scheduled_event.name} ({event_id}); '
+                            f'another event already has that name.')
+
+    return result
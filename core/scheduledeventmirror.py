@@ -0,0 +1,162 @@
+from itertools import count
+from typing import Collection, Iterable, Optional
+
+import discord
+from discord import ScheduledEventStatus
+
+from core.nameindex import PrefixIndex
+
+# Scheduled events in any other state are over, and are dropped from the mirror.
+LIVE_STATUSES = (ScheduledEventStatus.scheduled, ScheduledEventStatus.active)
+
+# Shared by every guild's mirror, so a rebuilt mirror never reuses the version of the one it replaced.
+_versions = count(1)
+
+
+class _GuildMirror:
+    def __init__(self):
+        self.by_id: dict[int, discord.ScheduledEvent] = {}
+        # Ids by name; Discord doesn't stop two scheduled events having the same name.
+        self.by_name: dict[str, set[int]] = {}
+        # The name each event was indexed under, which its object may since have been edited away from.
+        self.names: dict[int, str] = {}
+        self.subscriber_counts: dict[int, int] = {}
+        # Names of the events that haven't started yet, for autocomplete, and the ids they're indexed for.
+        self.upcoming = PrefixIndex()
+        self.upcoming_ids: set[int] = set()
+        # Changed on every change, so whatever's derived from the mirror can tell when it's out of date.
+        self.version = next(_versions)
+
+    def add(self, scheduled_event: discord.ScheduledEvent):
+        self.version = next(_versions)
+        self.remove(scheduled_event.id)
+        if scheduled_event.status not in LIVE_STATUSES:
+            return
+
+        self.by_id[scheduled_event.id] = scheduled_event
+        self.names[scheduled_event.id] = scheduled_event.name
+        self.by_name.setdefault(scheduled_event.name, set()).add(scheduled_event.id)
+        if scheduled_event.status == ScheduledEventStatus.scheduled:
+            self.upcoming.add(scheduled_event.name)
+            self.upcoming_ids.add(scheduled_event.id)
+
+    def remove(self, event_id: int):
+        self.version = next(_versions)
+        name = self.names.pop(event_id, None)
+        if name is None:
+            return
+
+        del self.by_id[event_id]
+        if event_id in self.upcoming_ids:
+            self.upcoming.remove(name)
+            self.upcoming_ids.discard(event_id)
+        ids = self.by_name[name]
+        ids.discard(event_id)
+        if not ids:
+            del self.by_name[name]
+
+
+class ScheduledEventMirror:
+    """Per-guild copies of the live scheduled events, indexed by id and by name, with their subscriber counts.
+
+    A guild's mirror is seeded from its cached (or freshly fetched) scheduled events, then kept up to date from
+    the scheduled event and subscription gateway events, and from the results of our own mutations, so finding
+    a scheduled event, its subscriber count or the names to autocomplete never needs a request to Discord or a
+    walk of the guild's events.
+
+    Subscriber counts are taken from the scheduled events when they're seeded, created or fetched, and counted
+    up and down from subscriptions in between; gateway updates to a scheduled event don't carry its count."""
+
+    def __init__(self):
+        self._guilds: dict[int, _GuildMirror] = {}
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._guilds
+
+    def rebuild(self, guild_id: int, scheduled_events: Iterable[discord.ScheduledEvent], keep: Collection[int] = ()):
+        """Replaces a guild's mirror with the given scheduled events, except those with ids in keep, which are
+        left as they're mirrored now (or left out, if they aren't)."""
+        old = self._guilds.get(guild_id)
+        mirror = _GuildMirror()
+        for scheduled_event in scheduled_events:
+            if scheduled_event.id not in keep:
+                mirror.add(scheduled_event)
+                mirror.subscriber_counts[scheduled_event.id] = scheduled_event.subscriber_count or 0
+
+        for event_id in keep:
+            if old is not None and event_id in old.by_id:
+                mirror.add(old.by_id[event_id])
+                mirror.subscriber_counts[event_id] = old.subscriber_counts.get(event_id, 0)
+
+        self._guilds[guild_id] = mirror
+
+    def forget(self, guild_id: int):
+        self._guilds.pop(guild_id, None)
+
+    def add(self, scheduled_event: discord.ScheduledEvent):
+        mirror = self._guilds.get(scheduled_event.guild.id)
+        if mirror is None:
+            return
+
+        mirror.add(scheduled_event)
+        mirror.subscriber_counts[scheduled_event.id] = scheduled_event.subscriber_count or 0
+
+    def update(self, scheduled_event: discord.ScheduledEvent):
+        mirror = self._guilds.get(scheduled_event.guild.id)
+        if mirror is None:
+            return
+
+        mirror.add(scheduled_event)
+        if scheduled_event.id not in mirror.by_id:
+            mirror.subscriber_counts.pop(scheduled_event.id, None)
+        elif scheduled_event.id not in mirror.subscriber_counts:
+            mirror.subscriber_counts[scheduled_event.id] = scheduled_event.subscriber_count or 0
+
+    def remove(self, scheduled_event: discord.ScheduledEvent):
+        mirror = self._guilds.get(scheduled_event.guild.id)
+        if mirror is None:
+            return
+
+        mirror.remove(scheduled_event.id)
+        mirror.subscriber_counts.pop(scheduled_event.id, None)
+
+    def subscribed(self, guild_id: int, event_id: int, change: int):
+        """Counts a user subscribing to (change 1) or unsubscribing from (change -1) a scheduled event."""
+        mirror = self._guilds.get(guild_id)
+        if mirror is None or event_id not in mirror.by_id:
+            return
+
+        mirror.subscriber_counts[event_id] = max(0, mirror.subscriber_counts.get(event_id, 0) + change)
+        mirror.version = next(_versions)
+
+    def version(self, guild_id: int) -> Optional[int]:
+        """A number that changes whenever anything in the guild's mirror does, or None if it isn't mirrored."""
+        mirror = self._guilds.get(guild_id)
+        return mirror.version if mirror is not None else None
+
+    def get(self, guild_id: int, event_id: int) -> Optional[discord.ScheduledEvent]:
+        mirror = self._guilds.get(guild_id)
+        return mirror.by_id.get(event_id) if mirror is not None else None
+
+    def find(self, guild_id: int, name: str) -> list[discord.ScheduledEvent]:
+        """Returns the live scheduled events with the given name."""
+        mirror = self._guilds.get(guild_id)
+        if mirror is None:
+            return []
+
+        return [mirror.by_id[event_id] for event_id in mirror.by_name.get(name, ())]
+
+    def complete(self, guild_id: int, prefix: str) -> list[str]:
+        """Returns the names of the guild's scheduled events that haven't started yet beginning with prefix."""
+        mirror = self._guilds.get(guild_id)
+        return mirror.upcoming.complete(prefix) if mirror is not None else []
+
+    def subscriber_count(self, guild_id: int, event_id: Optional[int]) -> Optional[int]:
+        mirror = self._guilds.get(guild_id)
+        if mirror is None or event_id is None:
+            return None
+
+        return mirror.subscriber_counts.get(event_id)
+
+    def __len__(self) -> int:
+        return sum(len(mirror.by_id) for mirror in self._guilds.values())
@@ -0,0 +1,133 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Hashable, Iterable, Optional
+
+# Longest we'll sleep without re-checking the clock, in case the system clock jumps or the host sleeps.
+MAX_SLEEP = 60 * 60
+
+
+class _Entry:
+    __slots__ = ('when', 'order', 'key', 'callback', 'cancelled')
+
+    def __init__(self, when: float, order: int, key: Hashable, callback: Callable[[], Awaitable]):
+        self.when = when
+        self.order = order
+        self.key = key
+        self.callback = callback
+        self.cancelled = False
+
+    def __lt__(self, other: '_Entry') -> bool:
+        return (self.when, self.order) < (other.when, other.order)
+
+
+class Scheduler:
+    """Fires timed callbacks from a single task, keyed so they can be replaced or cancelled.
+
+    Pending callbacks are kept in a min-heap on their fire time (a UNIX timestamp) and the task sleeps until
+    the earliest is due, so scheduling costs O(log n) and nothing is ever rescanned. Cancelled entries are
+    left in the heap and skipped when they come up, until they make up most of it."""
+
+    def __init__(self):
+        self._heap: list[_Entry] = []
+        self._entries: dict[Hashable, _Entry] = {}
+        self._order = itertools.count()
+        self._cancelled = 0
+
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._firing: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def schedule(self, key: Hashable, when: float, callback: Callable[[], Awaitable]):
+        """Schedules callback to run at the given timestamp, replacing anything already scheduled under key."""
+        self.cancel(key)
+
+        entry = _Entry(when, next(self._order), key, callback)
+        self._entries[key] = entry
+        heapq.heappush(self._heap, entry)
+
+        if self._wakeup is not None and self._heap[0] is entry:
+            self._wakeup.set()
+
+    def schedule_many(self, entries: Iterable[tuple[Hashable, float, Callable[[], Awaitable]]]):
+        """Schedules a batch of (key, when, callback) entries, rebuilding the heap once instead of pushing each."""
+        for key, when, callback in entries:
+            self.cancel(key)
+
+            entry = _Entry(when, next(self._order), key, callback)
+            self._entries[key] = entry
+            self._heap.append(entry)
+
+        heapq.heapify(self._heap)
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        entry.cancelled = True
+        self._cancelled += 1
+
+        if self._cancelled > len(self._heap) // 2:
+            self._heap = [e for e in self._heap if not e.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def next_due(self) -> Optional[float]:
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+
+        return self._heap[0].when if self._heap else None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run(self._wakeup))
+
+    def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self._wakeup = None
+
+    async def _run(self, wakeup: asyncio.Event):
+        # The loop keeps its own reference to its wakeup event and stops once it's no longer the scheduler's,
+        # as wait_for swallows a stop()'s cancellation if the wakeup is set at the same moment.
+        while self._wakeup is wakeup:
+            wakeup.clear()
+            when = self.next_due()
+
+            if when is None or when > time.time():
+                timeout = MAX_SLEEP if when is None else min(when - time.time(), MAX_SLEEP)
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            entry = heapq.heappop(self._heap)
+            del self._entries[entry.key]
+
+            # Callbacks run in their own tasks so a slow one can't hold up the rest.
+            task = asyncio.get_running_loop().create_task(self._fire(entry))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
+
+    @staticmethod
+    async def _fire(entry: _Entry):
+        try:
+            await entry.callback()
+        except Exception as exc:
+            logging.exception(exc)
@@ -0,0 +1,93 @@
+import json
+import os
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+# Formats records can be saved in: a JSON array, newline-delimited JSON, or a stream of msgpack maps.
+FORMATS = ('json', 'ndjson', 'msgpack')
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise ValueError('The msgpack format needs the msgpack package installed (pip install msgpack).') from None
+
+    return msgpack
+
+
+def check_format(file_format: str):
+    """Raises a ValueError if records can't be saved in the given format."""
+    if file_format not in FORMATS:
+        raise ValueError(f'Unknown file format {file_format}; expected one of {", ".join(FORMATS)}.')
+    if file_format == 'msgpack':
+        _msgpack()
+
+
+def detect_format(file: BinaryIO) -> Optional[str]:
+    """Works out which format a file was saved in from its first byte, leaving the file where it was.
+
+    A JSON array starts with [ and newline-delimited JSON with {, while a msgpack map starts with a byte
+    that's never whitespace or either of those. Returns None for an empty file."""
+    start = file.tell()
+    head = file.read(64).lstrip()
+    file.seek(start)
+
+    if not head:
+        return None
+    if head.startswith(b'['):
+        return 'json'
+    if head.startswith(b'{'):
+        return 'ndjson'
+    return 'msgpack'
+
+
+def iter_records(file_path: Path) -> Iterator[dict]:
+    """Lazily yields the records saved in a file, in whichever format it was saved in.
+
+    Newline-delimited JSON and msgpack files are read a record at a time, so the file's contents are never
+    held in memory all at once; a JSON array has to be parsed whole."""
+    if not os.path.isfile(file_path):
+        return
+
+    with open(file_path, 'rb') as file:
+        file_format = detect_format(file)
+
+        if file_format == 'json':
+            yield from json.load(file)
+        elif file_format == 'ndjson':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        elif file_format == 'msgpack':
+            yield from _msgpack().Unpacker(file, raw=False)
+
+
+def write_records(file_path: Path, records: Iterable[dict], file_format: str = 'json'):
+    """Saves records to a file in the given format, replacing it atomically.
+
+    Records are written to a temporary file that's only renamed over the original once it's complete, so
+    neither bad data nor a crash mid-write can leave a truncated file behind."""
+    os.makedirs(file_path.parent, exist_ok=True)
+    temp_path = Path(f'{file_path}.tmp')
+
+    if file_format == 'msgpack':
+        packer = _msgpack().Packer()
+        with open(temp_path, 'wb') as file:
+            for record in records:
+                file.write(packer.pack(record))
+            file.flush()
+            os.fsync(file.fileno())
+    else:
+        with open(temp_path, 'w') as file:
+            if file_format == 'ndjson':
+                for record in records:
+                    file.write(json.dumps(record))
+                    file.write('\n')
+            else:
+                # json.dump would stream the array, but through the pure Python encoder; one string is faster.
+                file.write(json.dumps(records if isinstance(records, list) else list(records)))
+            file.flush()
+            os.fsync(file.fileno())
+
+    os.replace(temp_path, file_path)
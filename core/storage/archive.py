@@ -0,0 +1,92 @@
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+from core import consts, serialization
+from core.metrics import metrics
+from core.objects.event import Event
+
+
+def month_of(event: Event) -> str:
+    """The archive partition an event goes in: the UTC month it starts in, as YYYY-MM."""
+    return datetime.fromtimestamp(event.timestamp, timezone.utc).strftime('%Y-%m')
+
+
+class EventArchive:
+    """A guild's finished events, moved out of its working set into a file per month.
+
+    Archive files are only read when a guild's history is asked for, so loading a guild and saving changes to
+    it cost the same however many events it's had. Each month's file is saved in file_format, but read in
+    whichever format it was saved in. An event archived twice (say, if the bot stopped before its removal from
+    the event file was saved) replaces its earlier copy, matched on name and start time."""
+
+    def __init__(self, guild_id: int, file_format: str = 'json'):
+        self.guild_id = guild_id
+        self.file_format = file_format
+        # Bumped by every add, so whatever's read from the archive can tell when it's out of date.
+        self.version = 0
+
+        # Events may be archived from the event loop and a worker thread at once.
+        self._lock = threading.Lock()
+
+    def _path(self, month: str) -> Optional[Path]:
+        paths = [p for p in (Path(consts.archive_folder(self.guild_id), f'{month}.{file_format}')
+                             for file_format in serialization.FORMATS) if p.is_file()]
+
+        return max(paths, key=os.path.getmtime) if paths else None
+
+    def months(self) -> list[str]:
+        """The months there are archived events for, oldest first."""
+        folder = consts.archive_folder(self.guild_id)
+        if not os.path.isdir(folder):
+            return []
+
+        return sorted({Path(name).stem for name in os.listdir(folder)
+                       if Path(name).suffix[1:] in serialization.FORMATS})
+
+    def _read(self, month: str) -> list[dict]:
+        path = self._path(month)
+        if path is None:
+            return []
+
+        with metrics.timed('file_io_seconds', op='read', file='archive'):
+            return list(serialization.iter_records(path))
+
+    def add(self, events: Iterable[Event]):
+        """Archives finished events, rewriting the file for each month they start in."""
+        by_month: dict[str, list[Event]] = {}
+        for event in events:
+            by_month.setdefault(month_of(event), []).append(event)
+
+        with self._lock:
+            for month, month_events in by_month.items():
+                records = {(r['name'], r['date']): r for r in self._read(month)}
+                for event in month_events:
+                    record = event.to_dict()
+                    record['completed'] = True
+                    records[(record['name'], record['date'])] = record
+
+                old_path = self._path(month)
+                path = Path(consts.archive_folder(self.guild_id), f'{month}.{self.file_format}')
+
+                with metrics.timed('file_io_seconds', op='write', file='archive'):
+                    serialization.write_records(path, sorted(records.values(), key=lambda r: r['date']),
+                                                self.file_format)
+                if old_path is not None and old_path != path:
+                    os.remove(old_path)
+
+            self.version += 1
+
+    def load(self, month: str) -> list[Event]:
+        """Returns the events archived for a month (as YYYY-MM), in order of start time."""
+        return [Event.from_dict(r) for r in self._read(month)]
+
+    def between(self, start: datetime, end: datetime) -> list[Event]:
+        """Returns the archived events starting in the range [start, end), ordered by start time."""
+        first = start.astimezone(timezone.utc).strftime('%Y-%m')
+        last = end.astimezone(timezone.utc).strftime('%Y-%m')
+
+        return [event for month in self.months() if first <= month <= last
+                for event in self.load(month) if start.timestamp() <= event.timestamp < end.timestamp()]
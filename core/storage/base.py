@@ -0,0 +1,46 @@
+from typing import Iterable, Optional
+
+from core.eventstore import EventStore
+from core.objects.event import Event
+
+
+class EventStorage:
+    """Somewhere the events in an EventStore are persisted to.
+
+    The store is the authoritative copy while the bot runs; a storage loads it at startup and is told about
+    each change afterwards, so it only has to persist what changed if it's able to."""
+
+    # Whether every change rewrites everything anyway, so a batch of changes may as well be one save_all.
+    rewrites_all = False
+
+    def needs_store(self, changes: int) -> bool:
+        """Whether writing the given number of changes would need the store's full contents, rather than just
+        the changes; if not, the store passed along with them may be None."""
+        return self.rewrites_all
+
+    def load(self) -> Iterable[Event]:
+        """Returns the saved events; they may be read lazily as the result is iterated over."""
+        raise NotImplementedError
+
+    def put(self, store: EventStore, event: Event, replaces: Optional[str] = None):
+        """Persists a new or edited event. replaces is the event's previous name if it was renamed."""
+        raise NotImplementedError
+
+    def put_many(self, store: EventStore, events: list[Event]):
+        """Persists a batch of new events, for storages that can do better than a put per event."""
+        for event in events:
+            self.put(store, event)
+
+    def delete(self, store: EventStore, event_name: str):
+        raise NotImplementedError
+
+    def save_all(self, store: EventStore):
+        """Persists the store's entire contents in one go, for changes too widespread to apply one at a time."""
+        raise NotImplementedError
+
+    async def flush(self):
+        """Waits until every change made so far has been written; storages that write as they go already have."""
+        pass
+
+    def close(self):
+        pass
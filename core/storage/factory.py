@@ -0,0 +1,46 @@
+import configparser
+import os
+from pathlib import Path
+
+from core import consts, serialization
+from core.storage.base import EventStorage
+from core.storage.instrumented import InstrumentedStorage
+from core.storage.journal import EventJournal
+from core.storage.json_file import JsonFileStorage
+from core.storage.sqlite import SqliteStorage
+from core.storage.writebehind import WriteBehindStorage
+
+
+def create_storage(config: configparser.ConfigParser, guild_id: int) -> EventStorage:
+    """Creates storage for a guild's events, of the kind named by the [storage] mode config option, with its
+    operations timed.
+
+    Unless [storage] write_delay is 0, changes are written behind on a worker thread, batched over that many
+    seconds."""
+    mode = config.get('storage', 'mode', fallback='json')
+    storage = InstrumentedStorage(_create_storage(config, guild_id, mode), mode)
+
+    write_delay = config.getfloat('storage', 'write_delay', fallback=0.5)
+    if write_delay > 0:
+        storage = WriteBehindStorage(storage, write_delay)
+
+    return storage
+
+
+def _create_storage(config: configparser.ConfigParser, guild_id: int, mode: str) -> EventStorage:
+    if mode == 'json':
+        file_format = config.get('storage', 'format', fallback='json')
+        serialization.check_format(file_format)
+        return JsonFileStorage(guild_id, file_format)
+    elif mode == 'journal':
+        os.makedirs(consts.data_folder(guild_id), exist_ok=True)
+        return EventJournal(consts.data_folder(guild_id), config.getint('storage', 'compact_after', fallback=1000))
+    elif mode == 'sqlite':
+        os.makedirs(consts.data_folder(), exist_ok=True)
+        storage = SqliteStorage(Path(consts.data_folder(), 'events.db'), guild_id)
+        event_path = consts.event_file_path(guild_id)
+        if event_path is not None:
+            storage.migrate_json(event_path)
+        return storage
+
+    raise ValueError(f'Unknown storage mode {mode}.')
@@ -0,0 +1,48 @@
+from typing import Iterator, Optional
+
+from core.eventstore import EventStore
+from core.metrics import metrics
+from core.objects.event import Event
+from core.storage.base import EventStorage
+
+
+class InstrumentedStorage(EventStorage):
+    """Wraps another storage, recording how long each of its operations takes as storage_seconds."""
+
+    def __init__(self, storage: EventStorage, backend: str):
+        self.storage = storage
+        self.backend = backend
+
+    def __getattr__(self, name: str):
+        return getattr(self.storage, name)
+
+    @property
+    def rewrites_all(self) -> bool:
+        return self.storage.rewrites_all
+
+    def needs_store(self, changes: int) -> bool:
+        return self.storage.needs_store(changes)
+
+    def load(self) -> Iterator[Event]:
+        # Storages may load lazily, so this times reading the events rather than just starting to.
+        with metrics.timed('storage_seconds', backend=self.backend, op='load'):
+            yield from self.storage.load()
+
+    def put(self, store: EventStore, event: Event, replaces: Optional[str] = None):
+        with metrics.timed('storage_seconds', backend=self.backend, op='put'):
+            self.storage.put(store, event, replaces)
+
+    def put_many(self, store: EventStore, events: list[Event]):
+        with metrics.timed('storage_seconds', backend=self.backend, op='put_many'):
+            self.storage.put_many(store, events)
+
+    def delete(self, store: EventStore, event_name: str):
+        with metrics.timed('storage_seconds', backend=self.backend, op='delete'):
+            self.storage.delete(store, event_name)
+
+    def save_all(self, store: EventStore):
+        with metrics.timed('storage_seconds', backend=self.backend, op='save_all'):
+            self.storage.save_all(store)
+
+    def close(self):
+        self.storage.close()
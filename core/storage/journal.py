@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import threading
+from json import JSONDecodeError
+from pathlib import Path
+from typing import Optional
+
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.base import EventStorage
+
+
+class EventJournal(EventStorage):
+    """Journaled persistence for the event list.
+
+    The event file is kept as a snapshot, and every mutation after it is appended to a journal as a single
+    fsynced line, so the cost of a write doesn't depend on how many events are stored. Once the journal
+    grows past compact_after records it's rotated out and a fresh snapshot is written in the background,
+    then swapped in with an atomic rename.
+
+    Journal records are idempotent puts and deletes keyed by event name, so replaying a rotated journal on
+    top of the snapshot that replaced it is harmless if we crash before it's cleaned up."""
+
+    def __init__(self, folder: Path, compact_after: int = 1000):
+        self.snapshot_path = Path(folder, 'events.json')
+        self.journal_path = Path(folder, 'events.journal')
+        self.rotated_path = Path(folder, 'events.journal.old')
+        self.compact_after = compact_after
+
+        self._journal_file = None
+        self._journal_length = 0
+        self._compaction: Optional[threading.Thread] = None
+
+    def load(self) -> list[Event]:
+        events: dict[str, Event] = {}
+
+        if os.path.isfile(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as snapshot_file:
+                for event in json.load(snapshot_file):
+                    events[event['name']] = Event.from_dict(event)
+
+        for path in (self.rotated_path, self.journal_path):
+            self._replay(path, events)
+
+        return list(events.values())
+
+    def _replay(self, path: Path, events: dict[str, Event]):
+        if not os.path.isfile(path):
+            return
+
+        with open(path, 'r') as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except JSONDecodeError:
+                    logging.warning(f'Skipping torn record in {path}.')
+                    continue
+
+                if record['op'] == 'put':
+                    if record.get('replaces') is not None:
+                        events.pop(record['replaces'], None)
+                    events[record['event']['name']] = Event.from_dict(record['event'])
+                elif record['op'] == 'delete':
+                    events.pop(record['name'], None)
+
+                if path == self.journal_path:
+                    self._journal_length += 1
+
+    def needs_store(self, changes: int) -> bool:
+        # Only a compaction reads the store.
+        return self._journal_length + changes >= self.compact_after
+
+    def put(self, store: EventStore, event: Event, replaces: Optional[str] = None):
+        self._append({'op': 'put', 'event': event.to_dict(), 'replaces': replaces}, store=store)
+
+    def put_many(self, store: EventStore, events: list[Event]):
+        self._append(*({'op': 'put', 'event': event.to_dict(), 'replaces': None} for event in events), store=store)
+
+    def delete(self, store: EventStore, event_name: str):
+        self._append({'op': 'delete', 'name': event_name}, store=store)
+
+    def _append(self, *records: dict, store: EventStore):
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, 'a')
+
+        self._journal_file.write(''.join(json.dumps(record) + '\n' for record in records))
+        self._journal_file.flush()
+        os.fsync(self._journal_file.fileno())
+        self._journal_length += len(records)
+
+        # Without the store (see needs_store), compaction waits for a write that has it.
+        if self._journal_length >= self.compact_after and store is not None:
+            self.compact(store)
+
+    def save_all(self, store: EventStore):
+        if self._compaction is not None:
+            self._compaction.join()
+
+        self.compact(store, wait=True)
+
+    def compact(self, store: EventStore, wait: bool = False):
+        """Rotates the journal and writes the store's current contents as the new snapshot."""
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+        if os.path.isfile(self.journal_path):
+            self._merge_into_rotated()
+        self._journal_length = 0
+
+        snapshot = json.dumps([e.to_dict() for e in store])
+
+        self._compaction = threading.Thread(target=self._write_snapshot, args=(snapshot,), name='EventJournal')
+        self._compaction.start()
+
+        if wait:
+            self._compaction.join()
+
+    def _merge_into_rotated(self):
+        # If a previous compaction never finished, its rotated journal is folded into this one.
+        if not os.path.isfile(self.rotated_path):
+            os.replace(self.journal_path, self.rotated_path)
+            return
+
+        with open(self.journal_path, 'r') as journal_file, open(self.rotated_path, 'a') as rotated_file:
+            rotated_file.write(journal_file.read())
+            rotated_file.flush()
+            os.fsync(rotated_file.fileno())
+        os.remove(self.journal_path)
+
+    def _write_snapshot(self, snapshot: str):
+        temp_path = self.snapshot_path.with_suffix('.json.tmp')
+
+        try:
+            with open(temp_path, 'w') as snapshot_file:
+                snapshot_file.write(snapshot)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+
+            os.replace(temp_path, self.snapshot_path)
+            if os.path.isfile(self.rotated_path):
+                os.remove(self.rotated_path)
+        except OSError as exc:
+            logging.exception(exc)
+
+    def close(self):
+        if self._compaction is not None:
+            self._compaction.join()
+
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
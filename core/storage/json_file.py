@@ -0,0 +1,36 @@
+from typing import Iterator, Optional
+
+from core import consts
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.base import EventStorage
+
+
+class JsonFileStorage(EventStorage):
+    """Persists a guild's events by rewriting its whole event file on every change.
+
+    The file is saved in file_format, but loaded in whichever format it was last saved in, so changing the
+    format converts the file the next time it's saved."""
+    rewrites_all = True
+
+    def __init__(self, guild_id: Optional[int] = None, file_format: str = 'json'):
+        self.guild_id = guild_id
+        self.file_format = file_format
+
+    def load(self) -> Iterator[Event]:
+        return (Event.from_dict(e) for e in consts.iter_event_file(self.guild_id))
+
+    def put(self, store: EventStore, event: Event, replaces: Optional[str] = None):
+        self._write(store)
+
+    def put_many(self, store: EventStore, events: list[Event]):
+        self._write(store)
+
+    def delete(self, store: EventStore, event_name: str):
+        self._write(store)
+
+    def save_all(self, store: EventStore):
+        self._write(store)
+
+    def _write(self, store: EventStore):
+        consts.write_event_file((e.to_dict() for e in store), self.guild_id, self.file_format)
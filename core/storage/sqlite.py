@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from core import serialization
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.base import EventStorage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    guild_id INTEGER NOT NULL DEFAULT 0,
+    name TEXT NOT NULL,
+    id INTEGER,
+    date REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_guild_name ON events (guild_id, name);
+CREATE INDEX IF NOT EXISTS events_guild_date ON events (guild_id, date);
+DROP INDEX IF EXISTS events_date;
+DROP INDEX IF EXISTS events_id;
+"""
+
+
+class SqliteStorage(EventStorage):
+    """Persists events to a local SQLite database, one row per event.
+
+    Each change is written as a single statement against the (guild_id, name) index, so writes stay
+    proportional to the change rather than to the size of the schedule, and loading a guild reads its events
+    in order from the (guild_id, date) index."""
+
+    def __init__(self, db_path: Path | str, guild_id: int = 0):
+        self.db_path = db_path
+        self.guild_id = guild_id
+
+        # Writes may come from a write-behind worker thread; sqlite serializes access to the connection itself.
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.executescript(_SCHEMA)
+
+    def load(self) -> list[Event]:
+        rows = self._connection.execute('SELECT data FROM events WHERE guild_id = ? ORDER BY date',
+                                        (self.guild_id,))
+        return [Event.from_dict(json.loads(data)) for data, in rows]
+
+    def put(self, store: Optional[EventStore], event: Event, replaces: Optional[str] = None):
+        with self._connection:
+            if replaces is not None:
+                self._connection.execute('DELETE FROM events WHERE guild_id = ? AND name = ?',
+                                         (self.guild_id, replaces))
+            self._connection.execute('INSERT OR REPLACE INTO events (guild_id, name, id, date, data) '
+                                     'VALUES (?, ?, ?, ?, ?)',
+                                     (self.guild_id, event.name, event.id, event.timestamp,
+                                      json.dumps(event.to_dict())))
+
+    def put_many(self, store: Optional[EventStore], events: list[Event]):
+        with self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO events (guild_id, name, id, date, data) '
+                                         'VALUES (?, ?, ?, ?, ?)',
+                                         [(self.guild_id, e.name, e.id, e.timestamp, json.dumps(e.to_dict()))
+                                          for e in events])
+
+    def delete(self, store: Optional[EventStore], event_name: str):
+        with self._connection:
+            self._connection.execute('DELETE FROM events WHERE guild_id = ? AND name = ?', (self.guild_id, event_name))
+
+    def save_all(self, store: EventStore):
+        with self._connection:
+            self._connection.execute('DELETE FROM events WHERE guild_id = ?', (self.guild_id,))
+            self._connection.executemany('INSERT INTO events (guild_id, name, id, date, data) VALUES (?, ?, ?, ?, ?)',
+                                         [(self.guild_id, e.name, e.id, e.timestamp, json.dumps(e.to_dict()))
+                                          for e in store])
+
+    def close(self):
+        self._connection.close()
+
+    def migrate_json(self, event_path: Path) -> int:
+        """Imports an existing event file (in any format) into an empty database, then renames it so it's only
+        imported once.
+
+        Returns the number of events imported."""
+        if not os.path.isfile(event_path):
+            return 0
+
+        if self._connection.execute('SELECT 1 FROM events WHERE guild_id = ? LIMIT 1', (self.guild_id,)).fetchone():
+            logging.warning(f'Not migrating {event_path}; the event database already has events in it.')
+            return 0
+
+        events = [Event.from_dict(e) for e in serialization.iter_records(event_path)]
+
+        self.put_many(None, events)
+
+        os.replace(event_path, Path(f'{event_path}.migrated'))
+
+        return len(events)
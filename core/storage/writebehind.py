@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.base import EventStorage
+
+
+class WriteBehindStorage(EventStorage):
+    """Wraps another storage so changes are persisted on a worker thread instead of the event loop.
+
+    Changes made while the event loop is running are collected for delay seconds and then written in one
+    batch, with later changes to an event superseding earlier ones. If the wrapped storage needs the store's
+    full contents to write the batch (see needs_store), it's handed a snapshot of the store's events taken on the
+    event loop, so the worker never reads the store while it's being changed; otherwise, it's only handed the
+    changes, and copying a large store is saved. Batches are written one at a time, in order, on a single thread.
+
+    flush waits until every change made so far has been written, for callers that need them to be durable;
+    close writes anything outstanding before closing the wrapped storage."""
+
+    def __init__(self, storage: EventStorage, delay: float = 0.5):
+        self.storage = storage
+        self.delay = delay
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='EventStorage')
+        self._store: Optional[EventStore] = None
+        # Changed events by name, None meaning deleted.
+        self._changes: dict[str, Optional[Event]] = {}
+        self._save_all = False
+
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Future] = None
+
+    def __getattr__(self, name: str):
+        return getattr(self.storage, name)
+
+    def load(self) -> Iterable[Event]:
+        return self.storage.load()
+
+    def put(self, store: EventStore, event: Event, replaces: Optional[str] = None):
+        if replaces is not None and replaces != event.name:
+            self._changes[replaces] = None
+        self._changes[event.name] = event
+        self._changed(store)
+
+    def put_many(self, store: EventStore, events: list[Event]):
+        for event in events:
+            self._changes[event.name] = event
+        self._changed(store)
+
+    def delete(self, store: EventStore, event_name: str):
+        self._changes[event_name] = None
+        self._changed(store)
+
+    def save_all(self, store: EventStore):
+        self._changes.clear()
+        self._save_all = True
+        self._changed(store)
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._changes) or self._save_all or self._flushing is not None
+
+    async def flush(self):
+        """Waits until every change made so far has been written, raising if writing them failed."""
+        while self.pending:
+            if self._flushing is None:
+                self._start_flush()
+            await asyncio.shield(self._flushing)
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        # Queued behind any batch already being written, which may change what the storage needs, so it gets the
+        # snapshot whether it needs it or not.
+        if self._changes or self._save_all:
+            self._executor.submit(self._write, *self._take_batch(snapshot=True)).result()
+        self._executor.shutdown(wait=True)
+
+        self.storage.close()
+
+    def _changed(self, store: EventStore):
+        self._store = store
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Nothing to wait for the write without blocking (at startup or shutdown), so it's written straight away.
+            self._executor.submit(self._write, *self._take_batch(snapshot=True)).result()
+            return
+
+        if self._timer is None and self._flushing is None:
+            self._timer = loop.call_later(self.delay, self._start_flush)
+
+    def _take_batch(self, snapshot: bool = False) -> tuple[Optional[list[Event]], bool, list[str], list[Event]]:
+        """Takes the changes made so far, along with a snapshot of the store if writing them needs one.
+
+        What the storage needs can change as batches are written, so this is only asked while none is being
+        written, unless the snapshot is taken regardless."""
+        save_all = self._save_all
+        deleted = [name for name, event in self._changes.items() if event is None]
+        changed = [event for event in self._changes.values() if event is not None]
+
+        if snapshot or save_all or self.storage.needs_store(len(deleted) + len(changed)):
+            snapshot = list(self._store) if self._store is not None else []
+        else:
+            snapshot = None
+
+        self._changes = {}
+        self._save_all = False
+
+        return snapshot, save_all, deleted, changed
+
+    def _write(self, snapshot: Optional[list[Event]], save_all: bool, deleted: list[str], changed: list[Event]):
+        if save_all or self.storage.rewrites_all:
+            self.storage.save_all(snapshot)
+            return
+
+        for event_name in deleted:
+            self.storage.delete(snapshot, event_name)
+        if changed:
+            self.storage.put_many(snapshot, changed)
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is not None or not (self._changes or self._save_all):
+            return
+
+        loop = asyncio.get_running_loop()
+        self._flushing = loop.run_in_executor(self._executor, self._write, *self._take_batch())
+        self._flushing.add_done_callback(self._flushed)
+
+    def _flushed(self, future: asyncio.Future):
+        self._flushing = None
+
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logging.exception(future.exception())
+            # What was written is unknown, so the next batch writes everything.
+            self._save_all = True
+
+        if self._changes or self._save_all:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self._start_flush)
@@ -1,17 +1,53 @@
 import configparser
+from functools import lru_cache
 from os import path
+from typing import Optional
 
 import dateutil.tz
 
 from core import consts
 
-_config = configparser.ConfigParser()
-_config.read(path.join(consts.cwd(), 'config.ini'))
+_config: Optional[configparser.ConfigParser] = None
 
 
-def get_config():
+def get_config() -> configparser.ConfigParser:
+    global _config
+
+    if _config is None:
+        _config = configparser.ConfigParser()
+        _config.read(path.join(consts.cwd(), 'config.ini'))
+
     return _config
 
 
-def gettz():
-    return dateutil.tz.gettz(_config['global']['tz'])
+def reload_config() -> configparser.ConfigParser:
+    """Re-reads config.ini, for when it's been changed (or, in tests, written) since it was first read."""
+    global _config
+
+    _config = None
+    return get_config()
+
+
+def get_guild_option(guild_id: Optional[int], option: str, fallback_section: str,
+                     config: Optional[configparser.ConfigParser] = None) -> Optional[str]:
+    """Reads an option from a guild's [guild.<id>] section, falling back to the bot-wide section."""
+    config = config or get_config()
+    section = f'guild.{guild_id}'
+
+    if guild_id is not None and config.has_option(section, option):
+        return config[section][option]
+
+    return config.get(fallback_section, option, fallback=None)
+
+
+def get_voice_channel_id(guild_id: Optional[int], config: Optional[configparser.ConfigParser] = None) -> int:
+    return int(get_guild_option(guild_id, 'voice_channel_id', 'discord', config))
+
+
+@lru_cache(maxsize=None)
+def _zone(name: str):
+    return dateutil.tz.gettz(name)
+
+
+def gettz(guild_id: Optional[int] = None, config: Optional[configparser.ConfigParser] = None):
+    return _zone(get_guild_option(guild_id, 'tz', 'global', config))
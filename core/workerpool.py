@@ -0,0 +1,58 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from core.metrics import metrics
+
+T = TypeVar('T')
+
+# Imported by the fork server up front, so each worker it forks starts with them ready rather than importing
+# them for its first job. Workers need the main module too, which this imports once, in the fork server (where
+# main.py doesn't start the bot), rather than in every worker.
+PRELOAD = ['__main__', 'core.importer', 'core.calendarfeed']
+
+
+class WorkerPool:
+    """Runs CPU-heavy jobs, like parsing an imported file, in a pool of worker processes, so a big input doesn't
+    hold up the event loop (and with it the gateway heartbeat and everyone else's commands) while it's worked on.
+
+    Each kind of job has a threshold: inputs smaller than it are run in the calling process, where they're
+    quicker than the round trip to a worker. With no processes, every job runs in the calling process. The
+    processes are only started by the first job big enough to need them, and jobs, their arguments and their
+    results have to be picklable."""
+
+    def __init__(self, processes: int = 0, thresholds: Optional[dict[str, int]] = None):
+        self.processes = processes
+        self.thresholds = thresholds or {}
+        self.offloaded = 0
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def offloads(self, job: str, size: int) -> bool:
+        """Whether a job of the given kind and size would be run on a worker process."""
+        return self.processes > 0 and size >= self.thresholds.get(job, 0)
+
+    async def run(self, job: str, func: Callable[..., T], *args, size: int = 0) -> T:
+        """Runs func(*args), on a worker process if size is at least the job's threshold."""
+        if not self.offloads(job, size):
+            with metrics.timed('worker_seconds', job=job, where='inline'):
+                return func(*args)
+
+        if self._executor is None:
+            # Forking a process with threads running isn't safe, so workers are forked from a fork server
+            # started for the purpose where there is one.
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            context = multiprocessing.get_context(method)
+            if method == 'forkserver':
+                context.set_forkserver_preload(PRELOAD)
+            self._executor = ProcessPoolExecutor(self.processes, mp_context=context)
+
+        self.offloaded += 1
+        with metrics.timed('worker_seconds', job=job, where='worker'):
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
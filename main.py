@@ -1,38 +1,119 @@
-import configparser
+import io
 import logging
-from datetime import datetime
-from os import path
+import time
+from datetime import datetime, timedelta
 
 import discord
-from discord import option, ScheduledEventStatus
+from discord import option
 from discord.errors import Forbidden
+from discord.ext import tasks
 
-from core import consts
+from core.calendarfeed import CalendarFeed, serve_calendar
 from core.converters import add_tzinfo_to_datetime
+from core.eventlist import EventFilter
 from core.eventmanager import EventManager
+from core.importer import parse_import_file
+from core.metrics import RateLimitLogHandler, metrics, serve_metrics
 from core.utils import config_utils
+from core.workerpool import WorkerPool
 
-event_manager = EventManager()
+# Read once and shared with everything else, rather than each part of the bot parsing config.ini itself.
+_config = config_utils.get_config()
 
-_config = configparser.ConfigParser()
-_config.read(path.join(consts.cwd(), 'config.ini'))
+event_manager = EventManager(_config)
+workers = WorkerPool(_config.getint('workers', 'processes', fallback=2), {
+    'import': _config.getint('workers', 'import_bytes', fallback=64 * 1024),
+    'export': _config.getint('workers', 'export_events', fallback=1000),
+})
 
 
 intents = discord.Intents.default()
 intents.members = True
 
 
-bot = discord.Bot(
-    # debug_guilds=[...],
-    description="A simple scheduler for event nights.",
-    intents=intents,
-)
+if _config.get('discord', 'shard_count', fallback=''):
+    # Each shard process only sees (and so only loads and saves events for) the guilds on its shards.
+    shard_ids = _config.get('discord', 'shard_ids', fallback='')
+    bot = discord.AutoShardedBot(
+        description="A simple scheduler for event nights.",
+        intents=intents,
+        shard_count=_config.getint('discord', 'shard_count'),
+        shard_ids=[int(shard_id) for shard_id in shard_ids.split(',')] if shard_ids else None,
+    )
+else:
+    bot = discord.Bot(
+        # debug_guilds=[...],
+        description="A simple scheduler for event nights.",
+        intents=intents,
+    )
+
+metrics.collectors.append(event_manager.metric_gauges)
+logging.getLogger('discord.http').addHandler(RateLimitLogHandler())
+metrics_server = None
 
-events = consts.read_event_file()
+calendar_feed = CalendarFeed(lambda guild_id: event_manager.guilds[guild_id].store
+                             if guild_id in event_manager.guilds else None,
+                             _config.get('calendar', 'name', fallback='Event nights'), workers,
+                             lambda guild_id: event_manager.guilds[guild_id].archive
+                             if guild_id in event_manager.guilds else None,
+                             _config.getint('calendar', 'archive_days', fallback=90))
+calendar_server = None
+
+# Start times of the commands being run, by interaction id.
+_command_started: dict[int, float] = {}
 
 
 async def get_scheduled_event_names(ctx: discord.AutocompleteContext):
-    return [e.name for e in ctx.bot.guilds[0].scheduled_events if e.status == ScheduledEventStatus.scheduled]
+    return event_manager.scheduled_events.complete(ctx.interaction.guild_id, ctx.value or '')
+
+
+async def get_series_names(ctx: discord.AutocompleteContext):
+    return list(event_manager.guild(ctx.interaction.guild_id).series)
+
+
+async def sync_guilds():
+    for guild in bot.guilds:
+        try:
+            result = await event_manager.reconcile(guild)
+        except discord.HTTPException as exc:
+            logging.exception(exc)
+            continue
+
+        if result:
+            print(f'Synced events for {guild.name} ({result}).')
+
+        try:
+            created = await event_manager.materialize_series(guild)
+        except Exception as exc:
+            logging.exception(exc)
+            continue
+
+        if created:
+            print(f'Scheduled {len(created)} upcoming occurrences of recurring events for {guild.name}.')
+
+
+async def send_reminder(guild_id: int, event, offset):
+    channel_id = config_utils.get_guild_option(guild_id, 'reminder_channel_id', 'reminders', _config)
+    channel = bot.get_channel(int(channel_id)) if channel_id else None
+    if channel is None:
+        return
+
+    await channel.send(f'**{event.name}** starts {discord.utils.format_dt(event.date, "R")}.')
+
+
+event_manager.on_reminder = send_reminder
+
+
+# 0 turns periodic syncing off; the loop is then never started, but still needs a valid interval.
+_sync_interval = _config.getfloat('sync', 'interval_minutes', fallback=15)
+if _sync_interval < 0:
+    logging.warning(f'[sync] interval_minutes is {_sync_interval:g}, which is negative; syncing every minute instead.')
+    _sync_interval = 1
+
+
+@tasks.loop(minutes=_sync_interval or 15)
+async def sync_guilds_periodically():
+    await sync_guilds()
 
 
 @bot.event
@@ -40,23 +121,106 @@ async def on_ready():
     print('Logged in as {0} ({0.id})'.format(bot.user))
     print('------')
 
+    event_manager.scheduler.start()
+
+    global metrics_server
+    if metrics_server is None and _config.get('metrics', 'port', fallback=''):
+        metrics_server = await serve_metrics(_config.get('metrics', 'host', fallback='127.0.0.1'),
+                                             _config.getint('metrics', 'port'))
+
+    global calendar_server
+    if calendar_server is None and _config.get('calendar', 'port', fallback=''):
+        calendar_server = await serve_calendar(calendar_feed, _config.get('calendar', 'host', fallback='127.0.0.1'),
+                                               _config.getint('calendar', 'port'))
+
+    # The first run of the loop happens straight away, so this also catches up on anything changed while we were down.
+    if _sync_interval <= 0:
+        await sync_guilds()
+    elif not sync_guilds_periodically.is_running():
+        sync_guilds_periodically.start()
+
+
+@bot.before_invoke
+async def start_command_timer(ctx: discord.ApplicationContext):
+    _command_started[ctx.interaction.id] = time.perf_counter()
+
+
+@bot.after_invoke
+async def stop_command_timer(ctx: discord.ApplicationContext):
+    started = _command_started.pop(ctx.interaction.id, None)
+    if started is not None:
+        metrics.observe('command_seconds', time.perf_counter() - started, command=ctx.command.qualified_name)
+
+
+@bot.event
+async def on_application_command_error(ctx: discord.ApplicationContext, error: discord.DiscordException):
+    metrics.increment('command_errors_total', command=ctx.command.qualified_name)
+    logging.error(f'Error running /{ctx.command.qualified_name}', exc_info=error)
+
+
+@bot.event
+async def on_guild_available(guild: discord.Guild):
+    await event_manager.preload_guild(guild.id)
+    event_manager.scheduled_events.rebuild(guild.id, guild.scheduled_events)
+
+
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    await event_manager.preload_guild(guild.id)
+    event_manager.scheduled_events.rebuild(guild.id, guild.scheduled_events)
+
+
+@bot.event
+async def on_guild_remove(guild: discord.Guild):
+    event_manager.unload_guild(guild.id)
+
+
+@bot.event
+async def on_scheduled_event_create(scheduled_event: discord.ScheduledEvent):
+    event_manager.scheduled_events.add(scheduled_event)
+
+
+@bot.event
+async def on_scheduled_event_update(before: discord.ScheduledEvent, after: discord.ScheduledEvent):
+    event_manager.scheduled_events.update(after)
+
+
+@bot.event
+async def on_scheduled_event_delete(scheduled_event: discord.ScheduledEvent):
+    event_manager.scheduled_events.remove(scheduled_event)
+
+
+# The raw events, since the others are only sent for members in the cache (and py-cord counts removals as adds).
+@bot.event
+async def on_raw_scheduled_event_user_add(payload: discord.RawScheduledEventSubscription):
+    event_manager.scheduled_events.subscribed(payload.guild.id, payload.event_id, 1)
+
+
+@bot.event
+async def on_raw_scheduled_event_user_remove(payload: discord.RawScheduledEventSubscription):
+    event_manager.scheduled_events.subscribed(payload.guild.id, payload.event_id, -1)
+
 
 @bot.slash_command(name="newevent", description="Schedules a new event.")
 @option("event_name", description="The name of the event.")
 @option("event_date", description="The date and time of the event (time zone required).")
 @option("description", description="An optional description for the event.")
-@option("hours", description="The length of the event in hours (default 1).")
+@option("hours", float, description="The length of the event in hours (default 1).")
 async def new_event(ctx: discord.ApplicationContext,
                     event_name: str,
                     event_date: str,
                     description='',
-                    hours=1):
+                    hours: float = 1):
+    # Discord only waits 3 seconds for a response, which a burst of commands queued behind the rate limit can
+    # take longer than.
+    await ctx.defer()
+
     try:
         event_date = add_tzinfo_to_datetime(event_date)
 
         print(f'Attempting to add event {event_name} at {event_date}.')
 
-        if event_date < datetime.now(config_utils.gettz()):
+        if event_date < datetime.now(config_utils.gettz(ctx.guild_id, _config)):
             await ctx.respond('Cannot create events in the past.')
             return
 
@@ -86,17 +250,187 @@ async def new_event(ctx: discord.ApplicationContext,
             ),
         ],
     )
+    if message:
+        embed.add_field(name="Warning", value=message, inline=False)
     embed.set_author(name=event_name)
 
     await ctx.respond(embeds=[embed])
 
 
+@bot.slash_command(name="freeslots", description="Lists when the event channel is free.")
+@option("days", int, description="How many days ahead to look (default 7).")
+@option("min_hours", float, description="The shortest free stretch to list, in hours (default 1).")
+async def free_slots(ctx: discord.ApplicationContext, days: int = 7, min_hours: float = 1):
+    start = datetime.now(config_utils.gettz(ctx.guild_id, _config))
+    slots = event_manager.free_slots(ctx.guild_id, start, start + timedelta(days=days), timedelta(hours=min_hours))
+
+    description = '\n'.join(f'{discord.utils.format_dt(slot_start, "f")} to {discord.utils.format_dt(slot_end, "f")}'
+                            for slot_start, slot_end in slots) or 'The channel is booked the whole time.'
+    if len(description) > 4096:
+        description = description[:4093] + '...'
+
+    embed = discord.Embed(
+        title=f"Free Slots in the Next {days} Days",
+        description=description,
+    )
+
+    await ctx.respond(embeds=[embed])
+
+
+class EventListView(discord.ui.View):
+    """Previous and Next buttons paging through /listevents for the member who ran it."""
+
+    def __init__(self, guild_id: int, user_id: int, event_filter: EventFilter, title: str):
+        super().__init__(timeout=600)
+
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.event_filter = event_filter
+        self.title = title
+        # Where each page seen so far starts, the current one last, so Previous can step back through them.
+        self.cursors = [None]
+
+    def render(self) -> discord.Embed:
+        page = event_manager.list_events(self.guild_id, self.event_filter, self.cursors[-1])
+
+        self.previous_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = page.next_cursor is None
+        self._next_cursor = page.next_cursor
+
+        embed = discord.Embed(title=self.title, description='\n'.join(page.lines) or 'No events found.')
+        embed.set_footer(text=f'Page {len(self.cursors)}')
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.user_id
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.primary)
+    async def next_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        if self._next_cursor is not None:
+            self.cursors.append(self._next_cursor)
+        await interaction.response.edit_message(embed=self.render(), view=self)
+
+
+def _filter_date(value: str, tz) -> datetime:
+    date = add_tzinfo_to_datetime(value)
+    return date if date.tzinfo is not None else date.replace(tzinfo=tz)
+
+
+@bot.slash_command(name="listevents", description="Lists the scheduled events, a page at a time.")
+@option("from_date", str, description="List events starting from this date (default now).")
+@option("to_date", str, description="List events starting before this date (default no limit).")
+@option("creator", discord.Member, description="Only list events this member created.")
+@option("text", str, description="Only list events with this text in their names.")
+async def list_events(ctx: discord.ApplicationContext, from_date: str = None, to_date: str = None,
+                      creator: discord.Member = None, text: str = None):
+    tz = config_utils.gettz(ctx.guild_id, _config)
+    try:
+        start = _filter_date(from_date, tz) if from_date else datetime.now(tz)
+        end = _filter_date(to_date, tz).timestamp() if to_date else float('inf')
+    except (ValueError, OverflowError) as exc:
+        await ctx.respond(f'Couldn\'t read that date ({exc}).', ephemeral=True)
+        return
+
+    event_filter = EventFilter(start.timestamp(), end, creator.id if creator else None, text)
+    view = EventListView(ctx.guild_id, ctx.interaction.user.id, event_filter,
+                         f"Events by {creator.display_name}" if creator else "Scheduled Events")
+
+    await ctx.respond(embed=view.render(), view=view)
+
+
+@bot.slash_command(name="pastevents", description="Lists the events that have already happened in a month.")
+@option("month", str, description="The month to list, as YYYY-MM (default this month).")
+async def past_events(ctx: discord.ApplicationContext, month: str = None):
+    await ctx.defer()
+
+    tz = config_utils.gettz(ctx.guild_id, _config)
+    try:
+        start = datetime.strptime(month, '%Y-%m').replace(tzinfo=tz) if month else \
+            datetime.now(tz).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    except ValueError:
+        await ctx.respond(f'{month} isn\'t a month; use YYYY-MM, like {datetime.now(tz):%Y-%m}.')
+        return
+    end = (start + timedelta(days=32)).replace(day=1)
+
+    events = await event_manager.past_events(ctx.guild_id, start, end)
+
+    description = '\n'.join(f'{discord.utils.format_dt(event.date, "f")} **{event.name}**'
+                            for event in events) or 'No events happened that month.'
+    if len(description) > 4096:
+        description = description[:4093] + '...'
+
+    embed = discord.Embed(
+        title=f"Past Events in {start:%B %Y}",
+        description=description,
+    )
+
+    await ctx.respond(embeds=[embed])
+
+
+def _histogram_lines(name: str, label: str) -> list[str]:
+    lines = []
+    for labels, histogram in sorted(metrics.histograms.get(name, {}).items()):
+        lines.append(f'{dict(labels)[label]}: {histogram.count} in {histogram.sum:.2f}s, '
+                     f'mean {histogram.mean * 1000:.0f}ms, p95 {histogram.quantile(0.95) * 1000:.0f}ms')
+    return lines
+
+
+@bot.slash_command(name="botstats", description="Shows where the bot's time is going.")
+@discord.default_permissions(administrator=True)
+async def bot_stats(ctx: discord.ApplicationContext):
+    rate_limited = sum(metrics.counters.get('discord_rate_limited_total', {}).values())
+    retries = sum(metrics.counters.get('discord_retries_total', {}).values())
+    queue = event_manager.guild(ctx.guild_id).mutations.stats()
+
+    sections = {
+        "Commands": _histogram_lines('command_seconds', 'command'),
+        "Discord API": _histogram_lines('discord_api_seconds', 'method') +
+                       [f'{rate_limited:.0f} rate limited, {retries:.0f} retried'],
+        "Storage": _histogram_lines('storage_seconds', 'op'),
+        "Event Files": [f'{dict(labels)["file"]} {dict(labels)["op"]}: {h.count} in {h.sum:.2f}s, '
+                        f'p95 {h.quantile(0.95) * 1000:.0f}ms'
+                        for labels, h in sorted(metrics.histograms.get('file_io_seconds', {}).items())],
+        "Queue": [f'{queue["depth"]} queued, {queue["sent"]} sent, {queue["coalesced"]} coalesced, '
+                  f'average wait {queue["average_wait"]:.2f}s'],
+    }
+
+    embed = discord.Embed(
+        title="Bot Stats",
+        fields=[discord.EmbedField(name=name, value='\n'.join(lines)[:1024] or 'Nothing yet', inline=False)
+                for name, lines in sections.items()],
+    )
+
+    await ctx.respond(embeds=[embed], ephemeral=True)
+
+
+@bot.slash_command(name="exportcalendar",
+                   description="Exports the server's upcoming and recently finished events as an iCalendar file.")
+async def export_calendar(ctx: discord.ApplicationContext):
+    # Rendering a big export can start the worker pool, which takes longer than Discord waits for a response.
+    await ctx.defer()
+
+    # Makes sure the guild is loaded, so the feed has its events.
+    event_manager.guild(ctx.guild_id)
+    await calendar_feed.prepare(ctx.guild_id)
+    body, _ = calendar_feed.render(ctx.guild_id)
+
+    await ctx.respond(file=discord.File(io.BytesIO(body.encode()), filename='events.ics'))
+
+
 @bot.slash_command(name="cancelevent", description="Cancels a scheduled event.")
 async def cancel_event(ctx: discord.ApplicationContext,
                        event_name: discord.Option(
                            str,
                            description="The name of the event.",
-                           autocomplete=discord.utils.basic_autocomplete(get_scheduled_event_names))):
+                           autocomplete=get_scheduled_event_names)):
+    await ctx.defer()
+
     try:
         await event_manager.delete_event(ctx, event_name)
     except Forbidden as exc:
@@ -120,5 +454,139 @@ async def cancel_event(ctx: discord.ApplicationContext,
     await ctx.respond(embeds=[embed])
 
 
-bot.run(_config['discord']['token'])
-# TODO: Sync event file with existing events
+@bot.slash_command(name="importevents", description="Schedules every event in a CSV or iCalendar file.")
+@option("file", discord.Attachment,
+        description="A .csv file with name, date, hours and description columns, or an .ics file.")
+async def import_events(ctx: discord.ApplicationContext, file: discord.Attachment):
+    await ctx.defer()
+
+    try:
+        text = (await file.read()).decode('utf-8-sig')
+        rows = await workers.run('import', parse_import_file, file.filename, text, size=len(text))
+        results = await event_manager.import_events(ctx, rows)
+        await event_manager.flush(ctx.guild_id)
+    except Exception as exc:
+        logging.exception(exc)
+
+        await ctx.respond(f'Failed to import events ({exc})')
+        return
+
+    lines = []
+    for row, event in results:
+        if event is not None:
+            lines.append(f'✅ Line {row.line}: **{event.name}** at {discord.utils.format_dt(event.date, "F")}')
+        else:
+            lines.append(f'❌ Line {row.line}: {row.name or "(no name)"} - {row.error}')
+
+    description = '\n'.join(lines) or 'No events were found in that file.'
+    if len(description) > 4096:
+        description = description[:4093] + '...'
+
+    embed = discord.Embed(
+        title=f"Imported {sum(1 for _, event in results if event is not None)} of {len(results)} Events",
+        description=description,
+    )
+
+    await ctx.respond(embeds=[embed])
+
+
+@bot.slash_command(name="syncevents", description="Syncs the bot's events with the server's scheduled events.")
+async def sync_events(ctx: discord.ApplicationContext):
+    await ctx.defer()
+
+    try:
+        result = await event_manager.reconcile(ctx.guild)
+    except discord.HTTPException as exc:
+        logging.exception(exc)
+
+        await ctx.respond(f'Failed to sync events ({exc})')
+        return
+
+    await ctx.respond(f'Events synced ({result}).')
+
+
+@bot.slash_command(name="newseries", description="Schedules a recurring event.")
+@option("series_name", description="The name of the recurring event.")
+@option("first_date", description="The date and time of the first occurrence (time zone required).")
+@option("repeat", description="daily, weekly, biweekly, monthly, or an RRULE such as FREQ=WEEKLY;BYDAY=FR.")
+@option("description", description="An optional description for each occurrence.")
+@option("hours", float, description="The length of each occurrence in hours (default 1).")
+async def new_series(ctx: discord.ApplicationContext,
+                     series_name: str,
+                     first_date: str,
+                     repeat: str,
+                     description='',
+                     hours: float = 1):
+    await ctx.defer()
+
+    try:
+        series, created = await event_manager.add_series(ctx, series_name, add_tzinfo_to_datetime(first_date),
+                                                         repeat, description, hours)
+    except Exception as exc:
+        logging.exception(exc)
+
+        await ctx.respond(f'Failed to add recurring event ({exc})')
+        return
+
+    embed = discord.Embed(
+        title="New Recurring Event Added",
+        fields=[
+            discord.EmbedField(name="Series Name", value=series_name, inline=False),
+            discord.EmbedField(name="Repeats", value=series.rule, inline=False),
+            discord.EmbedField(
+                name="Scheduled Occurrences",
+                value='\n'.join(discord.utils.format_dt(e.date, "F") for e in created) or 'None yet',
+                inline=False,
+            ),
+        ],
+    )
+    embed.set_author(name=series_name)
+
+    await ctx.respond(embeds=[embed])
+
+
+@bot.slash_command(name="cancelseries", description="Cancels a recurring event and its upcoming occurrences.")
+async def cancel_series(ctx: discord.ApplicationContext,
+                        series_name: discord.Option(
+                            str,
+                            description="The name of the recurring event.",
+                            autocomplete=discord.utils.basic_autocomplete(get_series_names))):
+    await ctx.defer()
+
+    try:
+        cancelled = await event_manager.cancel_series(ctx, series_name)
+    except (ValueError, discord.HTTPException) as exc:
+        logging.exception(exc)
+
+        await ctx.respond(f'Failed to cancel recurring event ({exc})')
+        return
+
+    await ctx.respond(f'Cancelled {series_name} and {cancelled} upcoming occurrences.')
+
+
+@bot.slash_command(name="skipoccurrence", description="Skips one occurrence of a recurring event.")
+@option("occurrence_date", description="The date of the occurrence to skip.")
+async def skip_occurrence(ctx: discord.ApplicationContext,
+                          series_name: discord.Option(
+                              str,
+                              description="The name of the recurring event.",
+                              autocomplete=discord.utils.basic_autocomplete(get_series_names)),
+                          occurrence_date: str):
+    await ctx.defer()
+
+    try:
+        occurrence_date = add_tzinfo_to_datetime(occurrence_date).date()
+        await event_manager.skip_occurrence(ctx, series_name, occurrence_date)
+    except (ValueError, discord.HTTPException) as exc:
+        logging.exception(exc)
+
+        await ctx.respond(f'Failed to skip occurrence ({exc})')
+        return
+
+    await ctx.respond(f'Skipped the {occurrence_date:%Y-%m-%d} occurrence of {series_name}.')
+
+
+if __name__ == '__main__':
+    bot.run(_config['discord']['token'])
+    event_manager.close()
+    workers.close()
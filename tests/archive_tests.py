@@ -0,0 +1,51 @@
+import os
+from datetime import datetime, timedelta
+
+from dateutil.tz import gettz
+from pyfakefs.fake_filesystem_unittest import TestCase
+
+from core import consts
+from core.objects.event import Event
+from core.storage.archive import EventArchive
+
+
+class EventArchiveTestCase(TestCase):
+    def setUp(self):
+        self.setUpPyfakefs()
+        os.makedirs(consts.data_folder(1))
+
+        self.start = datetime(2030, 1, 20, 20, tzinfo=gettz('UTC'))
+        self.events = [Event(f'Event {i}', self.start + timedelta(days=i * 10), 1, 0, id=i) for i in range(4)]
+        self.archive = EventArchive(1)
+
+    def test_add_partitions_by_month(self):
+        self.archive.add(self.events)
+
+        assert self.archive.months() == ['2030-01', '2030-02']
+        assert [e.name for e in self.archive.load('2030-01')] == ['Event 0', 'Event 1']
+        assert [e.name for e in self.archive.load('2030-02')] == ['Event 2', 'Event 3']
+        assert all(e.completed for e in self.archive.load('2030-02'))
+        assert self.archive.load('2030-03') == []
+
+    def test_add_replaces_earlier_copy(self):
+        self.archive.add(self.events[:2])
+        self.events[1].subscriber_count = 5
+        self.archive.add(self.events[1:3])
+
+        events = self.archive.load('2030-01')
+        assert [e.name for e in events] == ['Event 0', 'Event 1']
+        assert events[1].subscriber_count == 5
+
+    def test_between(self):
+        self.archive.add(self.events)
+
+        events = self.archive.between(self.start + timedelta(days=5), self.start + timedelta(days=25))
+        assert [e.name for e in events] == ['Event 1', 'Event 2']
+        assert self.archive.between(self.start + timedelta(days=100), self.start + timedelta(days=200)) == []
+
+    def test_change_format(self):
+        self.archive.add(self.events[:1])
+        EventArchive(1, 'ndjson').add(self.events[1:2])
+
+        assert sorted(os.listdir(consts.archive_folder(1))) == ['2030-01.ndjson']
+        assert [e.name for e in self.archive.load('2030-01')] == ['Event 0', 'Event 1']
@@ -0,0 +1,18 @@
+import json
+from unittest import IsolatedAsyncioTestCase
+
+from benchmarks.eventmanager_bench import run_benchmarks
+
+
+class BenchmarkTestCase(IsolatedAsyncioTestCase):
+    async def test_run_benchmarks(self):
+        for storage in ('json', 'journal', 'sqlite'):
+            results = await run_benchmarks(sizes=[10], operations=2, storage=storage)
+
+            # The results have to survive being written out as JSON.
+            results = json.loads(json.dumps(results))
+
+            assert results['storage'] == storage
+            assert [r['size'] for r in results['results']] == [10]
+            for operation in ('add', 'edit', 'cancel', 'autocomplete'):
+                assert results['results'][0][operation]['count'] == 2
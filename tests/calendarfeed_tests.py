@@ -0,0 +1,165 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from dateutil.tz import gettz
+from pyfakefs.fake_filesystem_unittest import TestCase as FakeFsTestCase
+
+from core import calendarfeed, consts
+from core.calendarfeed import CalendarFeed, etag_matches, serve_calendar
+from core.eventstore import EventStore
+from core.importer import parse_ics
+from core.objects.event import Event
+from core.storage.archive import EventArchive
+
+
+class CalendarFeedTestCase(TestCase):
+    def setUp(self):
+        self.start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        self.store = EventStore([Event(f'Event {i}', self.start + timedelta(days=i), 2, 0, id=i + 1)
+                                 for i in range(3)])
+        self.feed = CalendarFeed(lambda guild_id: self.store if guild_id == 1 else None)
+
+    def test_render(self):
+        body, etag = self.feed.render(1)
+
+        assert body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n')
+        assert 'URL:https://discord.com/events/1/2\r\n' in body
+        assert self.feed.render(2) is None
+
+        # What's exported can be imported again.
+        rows = parse_ics(body)
+        assert [row.name for row in rows] == ['Event 0', 'Event 1', 'Event 2']
+        assert rows[1].date == self.start + timedelta(days=1)
+        assert rows[1].hours == 2
+
+    def test_cached_until_changed(self):
+        body, etag = self.feed.render(1)
+
+        with patch.object(calendarfeed, 'render_vevent', wraps=calendarfeed.render_vevent) as render_vevent:
+            assert self.feed.render(1) == (body, etag)
+            render_vevent.assert_not_called()
+
+            self.store.replace('Event 1', Event('Event 1', self.start + timedelta(days=5), 1, 0, id=2))
+            new_body, new_etag = self.feed.render(1)
+
+            # Only the changed event is rendered again.
+            assert render_vevent.call_count == 1
+            assert new_etag != etag
+            assert [row.name for row in parse_ics(new_body)] == ['Event 0', 'Event 2', 'Event 1']
+
+    def test_id_set(self):
+        self.store.add(Event('New Event', self.start - timedelta(days=1), 1, 0))
+        body, _ = self.feed.render(1)
+        uid = next(line for line in body.split('\r\n') if line.startswith('UID:'))
+
+        self.store.set_id('New Event', 10)
+        body, _ = self.feed.render(1)
+
+        assert 'URL:https://discord.com/events/1/10\r\n' in body
+        assert uid in body
+
+    def test_new_store(self):
+        _, etag = self.feed.render(1)
+
+        self.store = EventStore([Event('Reloaded Event', self.start, 1, 0)])
+        body, new_etag = self.feed.render(1)
+
+        assert new_etag != etag
+        assert [row.name for row in parse_ics(body)] == ['Reloaded Event']
+
+    def test_escape_and_fold(self):
+        name = 'Movie night; popcorn, drinks \\ ' + 'é' * 60
+        self.store.add(Event(name, self.start - timedelta(days=1), 1, 'The Cinema'))
+
+        body, _ = self.feed.render(1)
+
+        assert all(len(line.encode()) <= 75 for line in body.split('\r\n'))
+        assert 'LOCATION:The Cinema\r\n' in body
+        assert parse_ics(body)[0].name.startswith('Movie night\\; popcorn, drinks')
+
+    def test_etag_matches(self):
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('"xyz", W/"abc"', '"abc"')
+        assert etag_matches('*', '"abc"')
+        assert not etag_matches('"xyz"', '"abc"')
+        assert not etag_matches(None, '"abc"')
+
+
+class ArchivedEventsTestCase(FakeFsTestCase):
+    def setUp(self):
+        self.setUpPyfakefs()
+        os.makedirs(consts.data_folder(1))
+
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.store = EventStore([Event('Movie Night', now + timedelta(days=1), 2, 0, id=1)])
+        self.archive = EventArchive(1)
+        self.archive.add([Event('Movie Night', now - timedelta(days=7), 2, 0, id=2),
+                          Event('Game Night', now - timedelta(days=3), 1, 0, id=3),
+                          Event('Old Event', now - timedelta(days=60), 1, 0, id=4)])
+        self.feed = CalendarFeed(lambda guild_id: self.store, archives=lambda guild_id: self.archive,
+                                 archive_days=30)
+
+    def test_recently_archived_events_stay(self):
+        body, etag = self.feed.render(1)
+
+        assert [row.name for row in parse_ics(body)] == ['Movie Night', 'Game Night', 'Movie Night']
+
+        # The past Movie Night can't share the upcoming one's UID.
+        uids = [line for line in body.split('\r\n') if line.startswith('UID:')]
+        assert len(set(uids)) == 3
+
+        # Archiving another event changes the feed, even though the store hasn't changed.
+        self.archive.add([Event('Quiz Night', datetime.now(timezone.utc) - timedelta(days=1), 1, 0, id=5)])
+        body, new_etag = self.feed.render(1)
+
+        assert new_etag != etag
+        assert 'SUMMARY:Quiz Night\r\n' in body
+
+    def test_prepare_reads_archive(self):
+        asyncio.run(self.feed.prepare(1))
+
+        with patch.object(self.archive, 'between', side_effect=AssertionError('Read on the event loop.')):
+            body, _ = self.feed.render(1)
+
+        assert 'SUMMARY:Game Night\r\n' in body
+
+    def test_disabled(self):
+        self.feed.archive_days = 0
+
+        assert [row.name for row in parse_ics(self.feed.render(1)[0])] == ['Movie Night']
+
+
+class CalendarServerTestCase(IsolatedAsyncioTestCase):
+    async def test_serve_calendar(self):
+        from aiohttp import ClientSession
+
+        store = EventStore([Event('Event', datetime(2030, 1, 1, 20, tzinfo=gettz('UTC')), 1, 0)])
+        feed = CalendarFeed(lambda guild_id: store if guild_id == 1 else None)
+
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        runner = await serve_calendar(feed, '127.0.0.1', port)
+        try:
+            async with ClientSession() as session:
+                url = f'http://127.0.0.1:{port}/calendar/1.ics'
+
+                async with session.get(url) as response:
+                    assert response.status == 200
+                    assert response.content_type == 'text/calendar'
+                    assert 'SUMMARY:Event' in await response.text()
+                    etag = response.headers['ETag']
+
+                async with session.get(url, headers={'If-None-Match': etag}) as response:
+                    assert response.status == 304
+                    assert response.headers['ETag'] == etag
+
+                async with session.get(f'http://127.0.0.1:{port}/calendar/2.ics') as response:
+                    assert response.status == 404
+        finally:
+            await runner.cleanup()
@@ -0,0 +1,27 @@
+from datetime import timedelta
+from unittest import TestCase
+
+from core.converters import add_tzinfo_to_datetime
+
+
+class ConvertersTestCase(TestCase):
+    def test_generic_abbreviation_follows_dst(self):
+        assert add_tzinfo_to_datetime('2030-01-04 8pm ET').utcoffset() == timedelta(hours=-5)
+        assert add_tzinfo_to_datetime('2030-07-04 8pm ET').utcoffset() == timedelta(hours=-4)
+        assert add_tzinfo_to_datetime('2030-07-04 8pm PT').utcoffset() == timedelta(hours=-7)
+
+    def test_explicit_abbreviation_is_fixed(self):
+        assert add_tzinfo_to_datetime('2030-07-04 8pm EST').utcoffset() == timedelta(hours=-5)
+        assert add_tzinfo_to_datetime('2030-01-04 8pm PDT').utcoffset() == timedelta(hours=-7)
+
+    def test_iso_format(self):
+        date = add_tzinfo_to_datetime('2030-07-04T20:00:00-04:00')
+
+        assert date.hour == 20
+        assert date.utcoffset() == timedelta(hours=-4)
+
+    def test_repeated_input(self):
+        assert add_tzinfo_to_datetime('July 4 2030 8pm CT') is add_tzinfo_to_datetime('July 4 2030 8pm CT')
+
+    def test_missing_timezone(self):
+        assert add_tzinfo_to_datetime('2030-07-04 8pm').tzinfo is None
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from dateutil.tz import gettz
+
+from core.objects.event import Event
+
+
+class EventObjectTestCase(TestCase):
+    def setUp(self):
+        self.start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        self.event = Event('Test Event', self.start, 2, 0, 0, 1, 2)
+
+    def test_round_trip(self):
+        data = self.event.to_dict()
+
+        assert data['tz_offset'] == -5 * 60 * 60
+        assert data['date'] == self.start.timestamp()
+
+        event = Event.from_dict(data)
+
+        assert event == self.event
+        assert event.date == self.start
+        assert event.date.utcoffset() == timedelta(hours=-5)
+        assert event.end_date == self.start + timedelta(hours=2)
+
+    def test_legacy_negative_offset(self):
+        data = self.event.to_dict()
+        data['tz_offset'] = timedelta(hours=-5).seconds
+
+        assert Event.from_dict(data).date.utcoffset() == timedelta(hours=-5)
+
+    def test_legacy_offsets_near_the_date_line(self):
+        for zone, hours in [('Pacific/Honolulu', -10), ('Pacific/Tahiti', -10), ('America/Adak', -10),
+                            ('Pacific/Pago_Pago', -11), ('Pacific/Niue', -11), ('Etc/GMT+12', -12),
+                            ('Pacific/Auckland', 13), ('Pacific/Tongatapu', 13), ('Pacific/Kiritimati', 14),
+                            ('Pacific/Fiji', 12)]:
+            start = datetime(2030, 1, 1, 20, tzinfo=gettz(zone))
+            data = Event('Test Event', start, 2, 0).to_dict()
+            assert data['tz_offset'] == hours * 60 * 60, zone
+
+            # Saved as utcoffset().seconds, which only differs from the real offset for negative ones.
+            data['tz_offset'] = timedelta(hours=hours).seconds
+            event = Event.from_dict(data)
+
+            assert event.date.utcoffset() == timedelta(hours=hours), zone
+            assert event.date == start, zone
+
+    def test_mutation_invalidates_dates(self):
+        assert self.event.end_date == self.start + timedelta(hours=2)
+
+        self.event.hours = 3
+        assert self.event.end_date == self.start + timedelta(hours=3)
+
+        self.event.date = self.start + timedelta(days=1)
+        assert self.event.date == self.start + timedelta(days=1)
+        assert self.event.end_date == self.start + timedelta(days=1, hours=3)
+
+    def test_hours_as_string(self):
+        # As a slash command option not declared as a number arrives.
+        event = Event('Test Event', self.start, '1.5', 0)
+
+        assert event.hours == 1.5
+        assert event.end_date == self.start + timedelta(hours=1.5)
+        assert event.end_timestamp == (self.start + timedelta(hours=1.5)).timestamp()
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.event.unknown_attribute = 1
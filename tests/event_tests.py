@@ -1,4 +1,5 @@
 import asyncio
+import configparser
 import os
 from datetime import datetime, timedelta
 from os import path
@@ -7,12 +8,13 @@ from pyfakefs.fake_filesystem_unittest import TestCase
 from unittest.mock import patch
 
 from core import consts
+from core.eventlist import EventFilter
 from core.eventmanager import EventManager
+from core.importer import ImportRow, parse_import_file
+from core.objects.event import Event
+from core.utils import config_utils
 from core.utils.config_utils import gettz
-
-
-class MockClass(object):
-    pass
+from tests.fakeguild import FakeGuild, MockClass, fake_context
 
 
 # https://stackoverflow.com/a/46324983
@@ -30,87 +32,37 @@ def async_test(coro):
 class EventTestCase(TestCase):
     event_manager: EventManager
 
+    mock_guild: FakeGuild
     mock_discord_context: MockClass
-    mock_discord_events = []
-
-    async def create_scheduled_event(self,
-                                     name,
-                                     description,
-                                     reason,
-                                     start_time,
-                                     end_time,
-                                     location):
-        class MockScheduledEvent:
-            id: int
-            subscriber_count: int
-            creator_id: int
-
-            def __init__(self, id: int, subscriber_count: int, creator_id: int):
-                self.id = id
-                self.subscriber_count = subscriber_count
-                self.creator_id = creator_id
-
-        mock_event = MockClass()
-        mock_event.name = name
-        mock_event.description = description
-        mock_event.reason = reason
-        mock_event.start_time = start_time
-        mock_event.end_time = end_time
-        mock_event.location = location
-        mock_event.subscriber_count = 0
-        mock_event.creator_id = 0
-        mock_event.id = 0
-
-        async def remove_mock_event(reason: str):
-            self.mock_discord_events.remove(mock_event)
-        mock_event.cancel = remove_mock_event
-
-        self.mock_discord_events.append(mock_event)
-
-        async def edit_mock_event(name, description, start_time, end_time, reason):
-            mock_event.name = name
-            mock_event.description = description
-            mock_event.start_time = start_time
-            mock_event.end_time = end_time
-
-            return mock_event
-
-        mock_event.edit = edit_mock_event
-
-        return MockScheduledEvent(1, 0, 1)
-
-    def create_mock_context(self):
-        self.mock_discord_context = MockClass()
-
-        self.mock_discord_context.channel = MockClass()
-        self.mock_discord_context.channel.guild = MockClass()
-        self.mock_discord_context.channel.guild.create_scheduled_event = self.create_scheduled_event
-        self.mock_discord_context.channel.guild.scheduled_events = self.mock_discord_events
-
-        self.mock_discord_context.interaction = MockClass()
-        self.mock_discord_context.interaction.user = MockClass()
-        self.mock_discord_context.interaction.user.name = 'MockUser'
+    mock_discord_events: list
 
     def setUp(self):
         self.setUpPyfakefs()
 
-        self.create_mock_context()
+        self.mock_guild = FakeGuild(1)
+        self.mock_discord_context = fake_context(self.mock_guild)
+        self.mock_discord_events = self.mock_guild.scheduled_events
 
         os.makedirs(consts.cwd())
         os.makedirs(consts.data_folder())
 
-        consts.write_event_file([])
+        consts.write_event_file([], 1)
 
         with open(path.join(consts.cwd(), 'config.ini'), 'w') as config_file:
-            config_file.write('[globals]\n'
-                              'tz = America\\New_York\n\n'
+            config_file.write('[global]\n'
+                              'tz = America/New_York\n\n'
                               '[discord]\n'
                               'token = \n'
                               'invite_url =\n'
-                              'voice_channel_id = 0')
-
+                              'voice_channel_id = 0\n\n'
+                              '[queue]\n'
+                              'rate = 1000\n\n'
+                              '[storage]\n'
+                              'write_delay = 0')
+
+        # The config is read once and shared, so it has to be re-read for each test's file system.
+        config_utils.reload_config()
         self.event_manager = EventManager()
-        self.mock_discord_events = []
 
     @async_test
     async def test_add_event(self):
@@ -121,7 +73,7 @@ class EventTestCase(TestCase):
         assert len(self.mock_discord_events) == 1
         assert self.mock_discord_events[0].name == 'Test Event'
 
-        events_file = consts.read_event_file()
+        events_file = consts.read_event_file(1)
         assert len(events_file) == 1
         assert events_file[0]['name'] == 'Test Event'
 
@@ -130,18 +82,17 @@ class EventTestCase(TestCase):
         event_date = datetime.now(gettz()) + timedelta(hours=1)
 
         await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date)
-        self.mock_discord_context.channel.guild.scheduled_events = self.mock_discord_events
 
         assert len(self.mock_discord_events) == 1
 
-        events_file = consts.read_event_file()
+        events_file = consts.read_event_file(1)
         assert len(events_file) == 1
 
         await self.event_manager.delete_event(self.mock_discord_context, 'Test Event')
 
         assert len(self.mock_discord_events) == 0
 
-        events_file = consts.read_event_file()
+        events_file = consts.read_event_file(1)
         assert len(events_file) == 0
 
     @async_test
@@ -149,12 +100,11 @@ class EventTestCase(TestCase):
         event_date = datetime.now(gettz()) + timedelta(hours=1)
 
         await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date)
-        self.mock_discord_context.channel.guild.scheduled_events = self.mock_discord_events
 
         assert len(self.mock_discord_events) == 1
         assert self.mock_discord_events[0].name == 'Test Event'
 
-        events_file = consts.read_event_file()
+        events_file = consts.read_event_file(1)
         assert len(events_file) == 1
         assert events_file[0]['name'] == 'Test Event'
 
@@ -170,7 +120,7 @@ class EventTestCase(TestCase):
         assert len(self.mock_discord_events) == 1
         assert self.mock_discord_events[0].description == 'Edited description.'
 
-        events_file = consts.read_event_file()
+        events_file = consts.read_event_file(1)
         assert len(events_file) == 1
         assert events_file[0]['name'] == 'Edited Event'
         assert events_file[0]['date'] == event_date.timestamp()
@@ -185,7 +135,7 @@ class EventTestCase(TestCase):
         assert len(self.mock_discord_events) == 1
         assert self.mock_discord_events[0].name == 'Test Event'
 
-        events_file = consts.read_event_file()
+        events_file = consts.read_event_file(1)
         assert len(events_file) == 1
         assert events_file[0]['name'] == 'Test Event'
 
@@ -196,7 +146,7 @@ class EventTestCase(TestCase):
 
         assert len(self.mock_discord_events) == 1
 
-        events_file = consts.read_event_file()
+        events_file = consts.read_event_file(1)
         assert len(events_file) == 1
 
     @async_test
@@ -210,5 +160,337 @@ class EventTestCase(TestCase):
 
         assert len(self.mock_discord_events) == 0
 
-        events_file = consts.read_event_file()
+        events_file = consts.read_event_file(1)
         assert len(events_file) == 0
+
+    @async_test
+    async def test_events_partitioned_by_guild(self):
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date)
+
+        self.mock_discord_context.channel.guild.id = 2
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date)
+
+        assert len(self.mock_discord_events) == 2
+        assert len(consts.read_event_file(1)) == 1
+        assert len(consts.read_event_file(2)) == 1
+
+    def test_adopt_legacy_event_file(self):
+        os.remove(path.join(consts.data_folder(1), 'events.json'))
+
+        event = Event('Legacy Event', datetime.now(gettz()) + timedelta(hours=1), 1, 0)
+        consts.write_event_file([event.to_dict()])
+
+        assert 'Legacy Event' in self.event_manager.guild(1).store
+        assert not os.path.isfile(path.join(consts.data_folder(), 'events.json'))
+        assert 'Legacy Event' not in self.event_manager.guild(2).store
+
+    @async_test
+    async def test_scheduled_event_mirror(self):
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date)
+        scheduled_event = self.mock_discord_events[0]
+
+        # Our own changes are mirrored, so edits and cancels find their scheduled event without the guild's list.
+        class Unscannable(list):
+            def __iter__(self):
+                raise AssertionError('The guild\'s scheduled events were scanned.')
+
+        mirror = self.event_manager.scheduled_events
+        assert mirror.find(1, 'Test Event') == [scheduled_event]
+        self.mock_guild.scheduled_events = Unscannable(self.mock_guild.scheduled_events)
+
+        await self.event_manager.edit_event(self.mock_discord_context, 'Test Event', 'Edited Event',
+                                            event_date, '', 1)
+        assert mirror.find(1, 'Edited Event') == [scheduled_event]
+
+        await self.event_manager.delete_event(self.mock_discord_context, 'Edited Event')
+        assert mirror.find(1, 'Edited Event') == []
+
+    @async_test
+    async def test_cancel_during_sync(self):
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Doomed Event', event_date)
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Other Event',
+                                               event_date + timedelta(hours=1))
+
+        # The cancel completes after Discord answered the fetch, so what was fetched still has the event in it.
+        fetch_scheduled_events = self.mock_guild.fetch_scheduled_events
+
+        async def fetch_then_cancel():
+            scheduled_events = await fetch_scheduled_events()
+            await self.event_manager.delete_event(self.mock_discord_context, 'Doomed Event')
+            return scheduled_events
+
+        with patch.object(self.mock_guild, 'fetch_scheduled_events', fetch_then_cancel):
+            result = await self.event_manager.reconcile(self.mock_guild)
+
+        assert not result
+        assert [e.name for e in self.event_manager.guild(1).store] == ['Other Event']
+        assert [e['name'] for e in consts.read_event_file(1)] == ['Other Event']
+        assert self.event_manager.scheduled_events.complete(1, '') == ['Other Event']
+
+    @async_test
+    async def test_sync_skips_finished_events(self):
+        # Archived once its stored end passed, but still listed by Discord, which hasn't ended it yet.
+        now = datetime.now(gettz())
+        self.mock_guild.add('Finished Event', '', now - timedelta(hours=2), now - timedelta(hours=1), 0)
+        self.mock_guild.add('Running Event', '', now - timedelta(hours=1), now + timedelta(hours=1), 0)
+
+        result = await self.event_manager.reconcile(self.mock_guild)
+
+        assert [e.name for e in result.added] == ['Running Event']
+        assert [e.name for e in self.event_manager.guild(1).store] == ['Running Event']
+
+    @async_test
+    async def test_list_events(self):
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date)
+        scheduled_event = self.mock_discord_events[0]
+
+        event_filter = EventFilter(event_date.timestamp() - 1, float('inf'))
+        page = self.event_manager.list_events(1, event_filter)
+        assert len(page.lines) == 1 and page.lines[0].endswith('**Test Event**')
+        assert page.next_cursor is None
+
+        # Subscriptions heard from the gateway show up in the list straight away.
+        self.event_manager.scheduled_events.subscribed(1, scheduled_event.id, 1)
+        assert self.event_manager.list_events(1, event_filter).lines[0].endswith('(1 interested)')
+
+    @async_test
+    async def test_concurrent_commands(self):
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+
+        # The same name twice: the second waits for the first, then finds it exists, and only one is created.
+        results = await asyncio.gather(
+            self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date),
+            self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date),
+            return_exceptions=True)
+        assert isinstance(results[1], ValueError)
+        assert [e.name for e in self.mock_discord_events] == ['Test Event']
+
+        # Different names in the same slot are created in parallel; the overlap is caught once both are back.
+        results = await asyncio.gather(
+            self.event_manager.add_new_event(self.mock_discord_context, 'First Event', event_date + timedelta(days=1)),
+            self.event_manager.add_new_event(self.mock_discord_context, 'Second Event', event_date + timedelta(days=1)),
+            return_exceptions=True)
+        assert sum(isinstance(result, ValueError) for result in results) == 1
+        assert len(self.mock_discord_events) == 2
+        assert len(self.event_manager.guild(1).store) == 2
+
+        # An edit and a cancel of the same event: the cancel waits, and the edit doesn't bring the event back.
+        await asyncio.gather(
+            self.event_manager.edit_event(self.mock_discord_context, 'Test Event', None,
+                                          event_date + timedelta(days=2), '', 1),
+            self.event_manager.delete_event(self.mock_discord_context, 'Test Event'))
+        assert 'Test Event' not in self.event_manager.guild(1).store
+        assert 'Test Event' not in [e.name for e in self.mock_discord_events]
+        assert 'Test Event' not in [e['name'] for e in consts.read_event_file(1)]
+
+        assert len(self.event_manager.guild(1).locks) == 0
+
+    @async_test
+    async def test_overlapping_events(self):
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date, hours=2)
+
+        with self.assertRaises(ValueError):
+            await self.event_manager.add_new_event(self.mock_discord_context, 'Overlapping Event',
+                                                   event_date + timedelta(hours=1))
+
+        # Back to back events don't overlap.
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Next Event', event_date + timedelta(hours=2))
+
+        with self.assertRaises(ValueError):
+            await self.event_manager.edit_event(self.mock_discord_context, 'Next Event', None,
+                                                event_date + timedelta(hours=1), '', 1)
+
+        # An event can be moved over its own old time.
+        assert await self.event_manager.edit_event(self.mock_discord_context, 'Test Event', None,
+                                                   event_date + timedelta(minutes=30), '', 1) == ''
+
+        slots = self.event_manager.free_slots(1, event_date, event_date + timedelta(hours=4), timedelta(minutes=30))
+        assert slots == [(event_date, event_date + timedelta(minutes=30)),
+                         (event_date + timedelta(hours=1, minutes=30), event_date + timedelta(hours=2)),
+                         (event_date + timedelta(hours=3), event_date + timedelta(hours=4))]
+
+    @async_test
+    async def test_import_events(self):
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Existing Event', event_date)
+
+        rows = [ImportRow(i + 1, f'Imported Event {i}', event_date + timedelta(days=i + 1)) for i in range(10)]
+        rows.append(ImportRow(11, 'Existing Event', event_date))
+        rows.append(ImportRow(12, 'Past Event', event_date - timedelta(days=1)))
+        rows.append(ImportRow(13, 'Overlapping Event', event_date + timedelta(days=1, minutes=30)))
+
+        results = await self.event_manager.import_events(self.mock_discord_context, rows)
+
+        assert [event is not None for _, event in results] == [True] * 10 + [False, False, False]
+        assert results[-1][0].error == 'Overlaps with Imported Event 0.'
+        assert len(self.mock_discord_events) == 11
+
+        events_file = consts.read_event_file(1)
+        assert len(events_file) == 11
+
+    @async_test
+    async def test_import_fractional_hours(self):
+        event_date = (datetime.now(gettz()) + timedelta(days=1)).replace(second=0, microsecond=0)
+        text = ('name,date,hours\n'
+                f'Short Event,{event_date.isoformat()},0.5\n'
+                f'Long Event,{(event_date + timedelta(hours=1)).isoformat()},1.5\n'
+                f'Overlapping Event,{(event_date + timedelta(hours=2, minutes=20)).isoformat()},1\n'
+                f'Following Event,{(event_date + timedelta(hours=2, minutes=30)).isoformat()},1\n')
+
+        results = await self.event_manager.import_events(self.mock_discord_context,
+                                                         parse_import_file('events.csv', text))
+
+        assert [event is not None for _, event in results] == [True, True, False, True]
+        assert results[2][0].error == 'Overlaps with Long Event.'
+
+        short, long = self.mock_discord_events[:2]
+        assert short.end_time - short.start_time == timedelta(minutes=30)
+        assert long.end_time - long.start_time == timedelta(minutes=90)
+
+        store = self.event_manager.guild(1).store
+        assert store.get('Short Event').end_timestamp == (event_date + timedelta(minutes=30)).timestamp()
+        assert store.get('Long Event').hours == 1.5
+
+    @async_test
+    async def test_acknowledge_early(self):
+        self.event_manager._acknowledge_early = True
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+
+        event, _ = await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date)
+
+        assert event.id is None
+        assert len(self.mock_discord_events) == 0
+
+        await self.event_manager.guild(1).mutations.join()
+
+        assert len(self.mock_discord_events) == 1
+        assert self.event_manager.guild(1).store.get_by_id(1) is event
+        assert consts.read_event_file(1)[0]['id'] == 1
+
+    @async_test
+    async def test_time_zone_from_given_config(self):
+        config = configparser.ConfigParser()
+        config.read_dict(config_utils.get_config())
+        config['global']['tz'] = 'Asia/Tokyo'
+        event_manager = EventManager(config)
+
+        first_date = datetime.now(gettz()) + timedelta(hours=1)
+        series, created = await event_manager.add_series(self.mock_discord_context, 'Game Night', first_date,
+                                                         'weekly')
+
+        assert series.tz_name == 'Asia/Tokyo'
+        assert created[0].date.utcoffset() == timedelta(hours=9)
+
+        event_manager.close()
+
+    @async_test
+    async def test_recurring_events(self):
+        first_date = datetime.now(gettz()) + timedelta(hours=1)
+
+        series, created = await self.event_manager.add_series(self.mock_discord_context, 'Game Night', first_date,
+                                                              'weekly')
+
+        # Only the occurrences within the two-week horizon are created.
+        assert len(created) == 2
+        assert len(self.mock_discord_events) == 2
+        assert len(consts.read_event_file(1)) == 2
+
+        assert await self.event_manager.materialize_series(self.mock_discord_context.channel.guild) == []
+
+        await self.event_manager.skip_occurrence(self.mock_discord_context, 'Game Night', first_date.date())
+
+        assert len(self.mock_discord_events) == 1
+        assert consts.read_series_file(1)[0]['exceptions'] == [first_date.date().isoformat()]
+
+        assert await self.event_manager.cancel_series(self.mock_discord_context, 'Game Night') == 1
+        assert len(self.mock_discord_events) == 0
+        assert consts.read_event_file(1) == []
+        assert consts.read_series_file(1) == []
+
+    @async_test
+    async def test_reminders_and_completion(self):
+        reminders = []
+
+        async def on_reminder(guild_id, event, offset):
+            reminders.append((guild_id, event.name, offset))
+
+        self.event_manager.on_reminder = on_reminder
+        self.event_manager._reminder_offsets = [timedelta(minutes=30)]
+        self.event_manager.scheduler.start()
+
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+        await self.event_manager.add_new_event(self.mock_discord_context, 'Test Event', event_date)
+
+        assert (1, 'Test Event', timedelta(minutes=30)) in self.event_manager.scheduler
+        assert (1, 'Test Event', 'complete') in self.event_manager.scheduler
+
+        # Bring the reminder and the end of the event forward.
+        scheduler = self.event_manager.scheduler
+        scheduler.schedule((1, 'Test Event', timedelta(minutes=30)), 0,
+                           scheduler._entries[(1, 'Test Event', timedelta(minutes=30))].callback)
+        scheduler.schedule((1, 'Test Event', 'complete'), 0,
+                           scheduler._entries[(1, 'Test Event', 'complete')].callback)
+        await asyncio.sleep(0.05)
+
+        assert reminders == [(1, 'Test Event', timedelta(minutes=30))]
+        assert len(self.event_manager.scheduler) == 0
+
+        # Finished events are moved out of the event file and into the archive.
+        assert 'Test Event' not in self.event_manager.guild(1).store
+        assert consts.read_event_file(1) == []
+
+        past_events = await self.event_manager.past_events(1, event_date - timedelta(days=1),
+                                                           event_date + timedelta(days=1))
+        assert [e.name for e in past_events] == ['Test Event']
+        assert past_events[0].completed
+
+        self.event_manager.close()
+        await asyncio.sleep(0.01)
+
+    @async_test
+    async def test_archive_on_load(self):
+        now = datetime.now(gettz())
+        consts.write_event_file([Event('Finished Event', now - timedelta(days=40), 1, 0).to_dict(),
+                                 Event('Running Event', now - timedelta(minutes=30), 1, 0).to_dict(),
+                                 Event('Upcoming Event', now + timedelta(days=1), 1, 0).to_dict()], 1)
+
+        guild = self.event_manager.guild(1)
+
+        assert [e.name for e in guild.store] == ['Running Event', 'Upcoming Event']
+        assert [e['name'] for e in consts.read_event_file(1)] == ['Running Event', 'Upcoming Event']
+        assert [e.name for e in guild.archive.between(now - timedelta(days=60), now)] == ['Finished Event']
+
+        self.event_manager.close()
+
+    @async_test
+    async def test_write_behind(self):
+        self.event_manager._config['storage']['write_delay'] = '60'
+        event_date = datetime.now(gettz()) + timedelta(hours=1)
+
+        for i in range(3):
+            await self.event_manager.add_new_event(self.mock_discord_context, f'Test Event {i}',
+                                                   event_date + timedelta(days=i))
+        await self.event_manager.delete_event(self.mock_discord_context, 'Test Event 1')
+
+        # Nothing's written until the batch is due, or until someone needs it to be.
+        assert consts.read_event_file(1) == []
+
+        with patch.object(consts, 'write_event_file', wraps=consts.write_event_file) as write_event_file:
+            await self.event_manager.flush(1)
+
+        assert write_event_file.call_count == 1
+        assert [e['name'] for e in consts.read_event_file(1)] == ['Test Event 0', 'Test Event 2']
+
+        await self.event_manager.delete_event(self.mock_discord_context, 'Test Event 2')
+        self.event_manager.close()
+
+        assert [e['name'] for e in consts.read_event_file(1)] == ['Test Event 0']
+
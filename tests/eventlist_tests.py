@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+from dateutil.tz import gettz
+
+from core import eventlist
+from core.eventlist import EventFilter, EventListCache
+from core.eventstore import EventStore
+from core.objects.event import Event
+
+
+class EventListTestCase(TestCase):
+    def setUp(self):
+        self.start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        self.store = EventStore([Event(f'Event {i}', self.start + timedelta(days=i), 1, 0, subscriber_count=i,
+                                       creator_id=i % 2, id=i + 1) for i in range(25)])
+        self.cache = EventListCache(page_size=10)
+        self.everything = EventFilter(self.start.timestamp(), float('inf'))
+
+    def pages(self, event_filter: EventFilter) -> list[list[str]]:
+        pages = []
+        cursor = None
+        while True:
+            page = self.cache.page(1, self.store, event_filter, cursor)
+            pages.append([line.split('**')[1] for line in page.lines])
+            if page.next_cursor is None:
+                return pages
+            cursor = page.next_cursor
+
+    def test_paging(self):
+        pages = self.pages(self.everything)
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert sum(pages, []) == [f'Event {i}' for i in range(25)]
+
+        first = self.cache.page(1, self.store, self.everything)
+        assert first.lines[0] == f'<t:{int(self.start.timestamp())}:f> **Event 0**'
+        assert first.lines[3].endswith('**Event 3** (3 interested)')
+
+    def test_exactly_one_page(self):
+        event_filter = self.everything._replace(end=(self.start + timedelta(days=10)).timestamp())
+
+        assert self.pages(event_filter) == [[f'Event {i}' for i in range(10)]]
+
+    def test_filters(self):
+        later = self.everything._replace(start=(self.start + timedelta(days=20)).timestamp())
+        assert self.pages(later) == [[f'Event {i}' for i in range(20, 25)]]
+
+        odd = self.everything._replace(creator_id=1)
+        assert sum(self.pages(odd), []) == [f'Event {i}' for i in range(1, 25, 2)]
+
+        assert self.pages(self.everything._replace(text='EVENT 2')) == \
+               [['Event 2', 'Event 20', 'Event 21', 'Event 22', 'Event 23', 'Event 24']]
+        assert self.pages(self.everything._replace(text='Missing')) == [[]]
+
+    def test_cached_until_changed(self):
+        first = self.cache.page(1, self.store, self.everything)
+
+        with patch.object(eventlist, 'render_line', wraps=eventlist.render_line) as render_line:
+            assert self.cache.page(1, self.store, self.everything) is first
+            render_line.assert_not_called()
+
+            self.store.add(Event('New Event', self.start - timedelta(hours=1), 1, 0))
+            self.store.add(Event('Earlier Event', self.start - timedelta(days=1), 1, 0))
+            page = self.cache.page(1, self.store, self.everything)
+
+            assert render_line.call_count == 10
+            assert '**Event 0**' in page.lines[0]
+
+            # The filter starts after the new events, but any change throws the guild's pages away.
+            self.store.set_id('Event 0', 100)
+            self.cache.page(1, self.store, self.everything)
+            assert render_line.call_count == 20
+
+    def test_subscriber_version(self):
+        counts = {}
+        first = self.cache.page(1, self.store, self.everything, subscriber_count=lambda e: counts.get(e.id),
+                                subscriber_version=1)
+        assert not any('interested' in line for line in first.lines)
+
+        counts[2] = 7
+        assert self.cache.page(1, self.store, self.everything, subscriber_count=lambda e: counts.get(e.id),
+                               subscriber_version=1) is first
+
+        page = self.cache.page(1, self.store, self.everything, subscriber_count=lambda e: counts.get(e.id),
+                               subscriber_version=2)
+        assert page.lines[1].endswith('(7 interested)')
+
+    def test_new_store(self):
+        self.cache.page(1, self.store, self.everything)
+
+        self.store = EventStore([Event('Reloaded Event', self.start, 1, 0)])
+        assert self.pages(self.everything) == [['Reloaded Event']]
+
+    def test_evicts_least_recently_used(self):
+        self.cache.max_pages = 2
+        filters = [self.everything._replace(creator_id=i) for i in range(3)]
+
+        first = self.cache.page(1, self.store, filters[0])
+        self.cache.page(1, self.store, filters[1])
+        assert self.cache.page(1, self.store, filters[0]) is first
+        self.cache.page(1, self.store, filters[2])
+
+        assert self.cache.page(1, self.store, filters[0]) is first
+        assert len(self.cache._pages[1][2]) == 2
+
+        self.cache.forget(1)
+        assert self.cache.page(1, self.store, filters[0]) is not first
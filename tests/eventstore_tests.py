@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from dateutil.tz import gettz
+
+from core.eventstore import ConflictError, EventStore
+from core.objects.event import Event
+
+
+class EventStoreTestCase(TestCase):
+    def setUp(self):
+        self.start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        self.store = EventStore([Event(f'Event {i}', self.start + timedelta(days=i), 1, 0, id=i) for i in range(5)])
+
+    def test_lookup(self):
+        assert len(self.store) == 5
+        assert 'Event 3' in self.store
+        assert self.store.get('Event 3').id == 3
+        assert self.store.get_by_id(4).name == 'Event 4'
+        assert self.store.get('Missing Event') is None
+
+    def test_add_duplicate(self):
+        with self.assertRaises(ValueError):
+            self.store.add(Event('Event 1', self.start, 1, 0))
+
+        assert len(self.store) == 5
+
+    def test_remove(self):
+        removed = self.store.remove('Event 2')
+
+        assert removed.name == 'Event 2'
+        assert 'Event 2' not in self.store
+        assert self.store.get_by_id(2) is None
+        assert [e.name for e in self.store] == ['Event 0', 'Event 1', 'Event 3', 'Event 4']
+        assert self.store.remove('Event 2') is None
+
+    def test_replace(self):
+        self.store.replace('Event 0', Event('Renamed Event', self.start + timedelta(days=10), 2, 0, id=0))
+
+        assert 'Event 0' not in self.store
+        assert self.store.get_by_id(0).name == 'Renamed Event'
+        assert [e.name for e in self.store][-1] == 'Renamed Event'
+
+    def test_versions(self):
+        version = self.store.version_of('Event 0')
+        self.store.set_id('Event 0', 10)
+
+        with self.assertRaises(ConflictError):
+            self.store.replace('Event 0', Event('Event 0', self.start, 2, 0), expected_version=version)
+        with self.assertRaises(ConflictError):
+            self.store.remove('Event 0', expected_version=version)
+
+        self.store.replace('Event 0', Event('Event 0', self.start, 2, 0),
+                           expected_version=self.store.version_of('Event 0'))
+        assert self.store.get('Event 0').hours == 2
+        assert self.store.version_of('Event 0') == self.store.version
+        assert self.store.version_of('Missing Event') is None
+
+    def test_range(self):
+        start = (self.start + timedelta(days=1)).timestamp()
+        end = (self.start + timedelta(days=4)).timestamp()
+
+        assert [e.name for e in self.store.range(start, end)] == ['Event 1', 'Event 2', 'Event 3']
+
+        event = self.store.get('Event 1')
+        assert [e.name for e in self.store.range(start, end, (event.timestamp, event.name))] == ['Event 2', 'Event 3']
+        assert list(self.store.range(end, float('inf'), (end + 1, ''))) == []
+
+    def test_overlapping(self):
+        self.store.add(Event('Late Event', self.start + timedelta(minutes=30), 1, 0))
+        self.store.add(Event('Elsewhere', self.start, 1, 1))
+
+        assert [e.name for e in self.store.overlapping(0, self.start, self.start + timedelta(hours=1))] == \
+               ['Event 0', 'Late Event']
+        assert self.store.overlapping(0, self.start, self.start + timedelta(minutes=15), ignore='Event 0') == []
+
+        self.store.remove('Late Event')
+        assert [e.name for e in self.store.overlapping(0, self.start, self.start + timedelta(hours=1))] == ['Event 0']
+
+    def test_free_slots(self):
+        slots = self.store.free_slots(0, self.start, self.start + timedelta(days=2))
+
+        assert slots == [(self.start + timedelta(hours=1), self.start + timedelta(days=1)),
+                         (self.start + timedelta(days=1, hours=1), self.start + timedelta(days=2))]
+        assert self.store.free_slots(1, self.start, self.start + timedelta(hours=1)) == \
+               [(self.start, self.start + timedelta(hours=1))]
+
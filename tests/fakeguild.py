@@ -0,0 +1,159 @@
+import asyncio
+import copy
+import random
+from itertools import count
+from typing import Callable, Optional
+
+from discord import HTTPException, ScheduledEventLocation, ScheduledEventStatus
+
+
+class MockClass(object):
+    pass
+
+
+def rate_limited_error(retry_after: float = 0) -> HTTPException:
+    """Builds the exception discord raises when Discord answers a request with a 429."""
+    response = MockClass()
+    response.status = 429
+    response.reason = 'Too Many Requests'
+    response.headers = {'Retry-After': str(retry_after)}
+
+    return HTTPException(response, 'You are being rate limited.')
+
+
+class FakeScheduledEvent:
+    """Stands in for a discord.ScheduledEvent, living in its FakeGuild's scheduled_events."""
+
+    def __init__(self, guild: 'FakeGuild', id: int, name, description, start_time, end_time, location,
+                 creator_id: int = 1, subscriber_count: int = 0, status=ScheduledEventStatus.scheduled):
+        self.guild = guild
+        self.id = id
+        self.name = name
+        self.description = description
+        self.start_time = start_time
+        self.end_time = end_time
+        self.location = location
+        self.subscriber_count = subscriber_count
+        self.creator_id = creator_id
+        self.status = status
+
+    async def edit(self, name=None, description=None, start_time=None, end_time=None, reason=None, **kwargs):
+        await self.guild.wait()
+
+        self.name = name if name is not None else self.name
+        self.description = description if description is not None else self.description
+        self.start_time = start_time if start_time is not None else self.start_time
+        self.end_time = end_time if end_time is not None else self.end_time
+        self.guild.calls.append(('edit', self.name))
+        self.guild.send_gateway_event('scheduled_event_update', self, self)
+
+        return self
+
+    async def cancel(self, reason=None):
+        await self.guild.wait()
+
+        self.guild.scheduled_events.remove(self)
+        self.status = ScheduledEventStatus.canceled
+        self.guild.calls.append(('cancel', self.name))
+        self.guild.send_gateway_event('scheduled_event_delete', self)
+
+        return self
+
+
+class FakeGuild:
+    """Stands in for a discord.Guild's scheduled event endpoints, keeping the events it creates in memory.
+
+    Every call waits latency seconds, to simulate the round trip to Discord, and then fails with a 429 with
+    probability rate_limit (or, while rate_limits is above zero, always, counting it down). If dispatch is set,
+    it's called with the name and arguments of the gateway event Discord would send after each change, as a
+    discord.Client's dispatch is. Locations are given back as Discord gives them, as ScheduledEventLocations."""
+
+    def __init__(self, id: int = 1, latency: float = 0, rate_limit: float = 0, retry_after: float = 0,
+                 seed: Optional[int] = None):
+        self.id = id
+        self.name = f'Fake Guild {id}'
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.rate_limits = 0
+        self.rate_limited = 0
+        self.dispatch: Optional[Callable[..., None]] = None
+        self._random = random.Random(seed)
+
+        self.scheduled_events: list[FakeScheduledEvent] = []
+        self.calls: list[tuple[str, str]] = []
+        self._ids = count(1)
+
+    async def wait(self):
+        # Always yield, so callers see the same interleaving as they would with a real request.
+        await asyncio.sleep(self.latency)
+
+        if self.rate_limits or (self.rate_limit and self._random.random() < self.rate_limit):
+            self.rate_limits = max(0, self.rate_limits - 1)
+            self.rate_limited += 1
+            raise rate_limited_error(self.retry_after)
+
+    def get_channel(self, id: int):
+        """The fake has no channels, so a discord.ScheduledEventLocation built with it as its state holds a
+        discord.Object for a channel id, as it would for a channel the bot can't see."""
+        return None
+
+    def send_gateway_event(self, event: str, *args):
+        if self.dispatch is not None:
+            self.dispatch(event, *args)
+
+    def add(self, name, description, start_time, end_time, location) -> FakeScheduledEvent:
+        """Adds a scheduled event straight away, as if it had been created before the test started."""
+        scheduled_event = FakeScheduledEvent(self, next(self._ids), name, description, start_time, end_time,
+                                             ScheduledEventLocation(state=self, value=location))
+        self.scheduled_events.append(scheduled_event)
+
+        return scheduled_event
+
+    async def create_scheduled_event(self, name, description, start_time, end_time, location, reason=None,
+                                     **kwargs) -> FakeScheduledEvent:
+        await self.wait()
+
+        self.calls.append(('create', name))
+        scheduled_event = self.add(name, description, start_time, end_time, location)
+        self.send_gateway_event('scheduled_event_create', scheduled_event)
+
+        return scheduled_event
+
+    async def fetch_scheduled_events(self) -> list[FakeScheduledEvent]:
+        await self.wait()
+
+        # Fresh objects, as Discord's answer is, so later changes to the events don't show up in what was fetched.
+        return [copy.copy(scheduled_event) for scheduled_event in self.scheduled_events]
+
+
+def fake_context(guild: FakeGuild, user_name: str = 'MockUser', value: Optional[str] = None) -> MockClass:
+    """Builds an application (or, with value, autocomplete) context for a command run in the given guild."""
+    ctx = MockClass()
+
+    ctx.guild = guild
+    ctx.guild_id = guild.id
+    ctx.value = value
+
+    ctx.channel = MockClass()
+    ctx.channel.guild = guild
+
+    ctx.interaction = MockClass()
+    ctx.interaction.guild_id = guild.id
+    ctx.interaction.user = MockClass()
+    ctx.interaction.user.name = user_name
+
+    # What the command responded with, as (args, kwargs) of each call to respond.
+    ctx.responses = []
+    ctx.deferred = False
+
+    async def respond(*args, **kwargs):
+        ctx.responses.append((args, kwargs))
+
+    async def defer(*args, **kwargs):
+        ctx.deferred = True
+
+    ctx.respond = respond
+    ctx.defer = defer
+
+    return ctx
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from core.importer import parse_csv, parse_ics, parse_import_file, validate_import_rows
+
+CSV_FILE = '''name,date,hours,description
+Game Night,2030-07-04 8pm ET,3,Bring snacks
+Movie Night,2030-07-05T20:00:00-04:00,,
+Broken Night,not a date,1,
+'''
+
+ICS_FILE = '''BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+SUMMARY:Game Night
+DTSTART;TZID=America/New_York:20300704T200000
+DTEND;TZID=America/New_York:20300704T230000
+DESCRIPTION:Bring snacks\\, drinks
+END:VEVENT
+BEGIN:VEVENT
+SUMMARY:Movie
+  Night
+DTSTART:20300706T000000Z
+DURATION:PT2H30M
+END:VEVENT
+BEGIN:VEVENT
+SUMMARY:Holiday
+DTSTART;VALUE=DATE:20300704
+END:VEVENT
+END:VCALENDAR
+'''
+
+
+class ImporterTestCase(TestCase):
+    def test_parse_csv(self):
+        rows = parse_csv(CSV_FILE)
+
+        assert [row.name for row in rows] == ['Game Night', 'Movie Night', 'Broken Night']
+        assert rows[0].hours == 3
+        assert rows[0].description == 'Bring snacks'
+        assert rows[0].date.utcoffset() == timedelta(hours=-4)
+        assert rows[1].hours == 1
+        assert rows[2].error is not None
+
+    def test_parse_csv_without_header(self):
+        rows = parse_csv('Game Night,2030-07-04 8pm ET\n')
+
+        assert len(rows) == 1
+        assert rows[0].error is not None
+
+    def test_parse_ics(self):
+        rows = parse_import_file('events.ics', ICS_FILE)
+
+        assert [row.name for row in rows] == ['Game Night', 'Movie Night', 'Holiday']
+        assert rows[0].hours == 3
+        assert rows[0].description == 'Bring snacks, drinks'
+        assert rows[1].date == datetime(2030, 7, 6, tzinfo=timezone.utc)
+        assert rows[1].hours == 2.5
+        assert rows[2].error is not None
+
+    def test_parse_ics_floating_end(self):
+        rows = parse_ics('BEGIN:VEVENT\nSUMMARY:Game Night\nDTSTART;TZID=America/New_York:20300704T200000\n'
+                         'DTEND:20300704T223000\nEND:VEVENT\n'
+                         'BEGIN:VEVENT\nSUMMARY:Movie Night\nDTSTART:20300705T200000\n'
+                         'DTEND;TZID=America/New_York:20300705T220000\nEND:VEVENT\n')
+
+        assert rows[0].error is None
+        assert rows[0].hours == 2.5
+        assert rows[1].hours == 2
+
+    def test_validate(self):
+        rows = parse_ics(ICS_FILE) + parse_csv(CSV_FILE)
+        validate_import_rows(rows, {'Movie Night'}, datetime(2030, 1, 1, tzinfo=timezone.utc))
+
+        assert [row.error is None for row in rows] == [True, False, False, False, False, False]
+
+        rows = parse_ics(ICS_FILE)
+        validate_import_rows(rows, set(), datetime(2031, 1, 1, tzinfo=timezone.utc))
+
+        assert rows[0].error == 'Cannot create events in the past.'
@@ -0,0 +1,36 @@
+from unittest import TestCase
+
+from core.intervalindex import IntervalIndex
+
+
+class IntervalIndexTestCase(TestCase):
+    def setUp(self):
+        self.index = IntervalIndex()
+        self.index.add(0, 10, 'a')
+        self.index.add(20, 30, 'b')
+        self.index.add(25, 100, 'long')
+
+    def test_overlapping(self):
+        assert [key for _, _, key in self.index.overlapping(5, 21)] == ['a', 'b']
+        assert [key for _, _, key in self.index.overlapping(50, 60)] == ['long']
+        assert list(self.index.overlapping(10, 20)) == []
+
+    def test_bulk_load(self):
+        index = IntervalIndex([(25, 100, 'long'), (20, 30, 'b'), (0, 10, 'a')])
+
+        assert index._intervals == self.index._intervals
+        assert index._max_length == 75
+        assert [key for _, _, key in index.overlapping(50, 60)] == ['long']
+
+    def test_remove(self):
+        self.index.remove(25, 100, 'long')
+        self.index.remove(25, 100, 'missing')
+
+        assert len(self.index) == 2
+        assert self.index._max_length == 10
+        assert list(self.index.overlapping(50, 60)) == []
+
+    def test_gaps(self):
+        assert self.index.gaps(-5, 120) == [(-5, 0), (10, 20), (100, 120)]
+        assert self.index.gaps(-5, 120, min_length=10) == [(10, 20), (100, 120)]
+        assert self.index.gaps(30, 40) == []
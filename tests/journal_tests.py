@@ -0,0 +1,81 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from dateutil.tz import gettz
+from pyfakefs.fake_filesystem_unittest import TestCase
+
+from core import consts
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.journal import EventJournal
+
+
+class JournalTestCase(TestCase):
+    def setUp(self):
+        self.setUpPyfakefs()
+        os.makedirs(consts.data_folder())
+
+        self.start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        self.store = EventStore()
+        self.journal = EventJournal(consts.data_folder(), compact_after=100)
+
+    def tearDown(self):
+        self.journal.close()
+
+    def add_event(self, name: str, days: int = 0) -> Event:
+        event = Event(name, self.start + timedelta(days=days), 1, 0)
+        self.store.add(event)
+        self.journal.put(self.store, event)
+        return event
+
+    def reload(self) -> list[str]:
+        self.journal.close()
+        return sorted(e.name for e in EventJournal(consts.data_folder()).load())
+
+    def test_replay(self):
+        self.add_event('Event 1')
+        self.add_event('Event 2', 1)
+
+        edited = Event('Edited Event', self.start, 2, 0)
+        self.store.replace('Event 1', edited)
+        self.journal.put(self.store, edited, replaces='Event 1')
+
+        self.store.remove('Event 2')
+        self.journal.delete(self.store, 'Event 2')
+
+        assert not os.path.isfile(self.journal.snapshot_path)
+        assert self.reload() == ['Edited Event']
+
+    def test_compaction(self):
+        for i in range(150):
+            self.add_event(f'Event {i}', i)
+        self.journal.close()
+
+        with open(self.journal.snapshot_path, 'r') as snapshot_file:
+            assert len(json.load(snapshot_file)) == 100
+        assert not os.path.isfile(self.journal.rotated_path)
+        assert len(self.reload()) == 150
+
+    def test_interrupted_compaction(self):
+        self.add_event('Event 1')
+        self.journal.close()
+        os.replace(self.journal.journal_path, self.journal.rotated_path)
+        self.add_event('Event 2')
+
+        assert self.reload() == ['Event 1', 'Event 2']
+
+        self.journal = EventJournal(consts.data_folder())
+        self.journal.compact(self.store, wait=True)
+
+        assert not os.path.isfile(self.journal.rotated_path)
+        assert self.reload() == ['Event 1', 'Event 2']
+
+    def test_torn_record(self):
+        self.add_event('Event 1')
+        self.journal.close()
+
+        with open(self.journal.journal_path, 'a') as journal_file:
+            journal_file.write('{"op": "put", "ev')
+
+        assert self.reload() == ['Event 1']
@@ -0,0 +1,46 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from core.keyedlock import KeyedLock
+
+
+class KeyedLockTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.locks = KeyedLock()
+        self.log = []
+
+    async def hold(self, name, *keys):
+        async with self.locks(*keys):
+            self.log.append(f'{name} start')
+            await asyncio.sleep(0.01)
+            self.log.append(f'{name} end')
+
+    async def test_same_key_waits(self):
+        await asyncio.gather(self.hold('a', 'x'), self.hold('b', 'x'))
+
+        assert self.log == ['a start', 'a end', 'b start', 'b end']
+
+    async def test_different_keys_run_together(self):
+        await asyncio.gather(self.hold('a', 'x'), self.hold('b', 'y'))
+
+        assert self.log == ['a start', 'b start', 'a end', 'b end']
+
+    async def test_several_keys(self):
+        # Locked in opposite orders, which would deadlock without the keys being sorted.
+        await asyncio.wait_for(asyncio.gather(self.hold('a', 'x', 'y'), self.hold('b', 'y', 'x'),
+                                              self.hold('c', 'z', None)), 1)
+
+        assert self.log.index('a end') < self.log.index('b start')
+        assert self.log.index('c start') < self.log.index('a end')
+
+    async def test_locks_released(self):
+        assert not self.locks.locked('x')
+
+        async with self.locks('x'):
+            assert self.locks.locked('x')
+
+        with self.assertRaises(RuntimeError):
+            async with self.locks('x', 'y'):
+                raise RuntimeError()
+
+        assert len(self.locks) == 0
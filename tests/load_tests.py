@@ -0,0 +1,55 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+
+from benchmarks.load_bench import generate_trace, read_trace, run_benchmark, write_trace
+
+
+class LoadTestCase(IsolatedAsyncioTestCase):
+    def test_generate_trace(self):
+        trace = generate_trace(duration=10, rate=10, burst_every=5, burst_size=3, seed=1)
+
+        assert [interaction['at'] for interaction in trace] == sorted(interaction['at'] for interaction in trace)
+        assert sum(1 for interaction in trace if interaction['at'] == 5) == 3
+
+        # Every cancel is of an event created earlier, and is typed into autocomplete first.
+        created = {}
+        for interaction in trace:
+            if interaction['command'] == 'newevent':
+                created[interaction['options']['event_name']] = interaction['at']
+            elif 'autocomplete' in interaction:
+                assert any(name.startswith(interaction['value']) for name in created)
+            else:
+                assert created.pop(interaction['options']['event_name']) < interaction['at']
+
+        with tempfile.TemporaryDirectory() as folder:
+            write_trace(trace, Path(folder, 'trace.jsonl'))
+            assert read_trace(Path(folder, 'trace.jsonl')) == trace
+
+    async def test_run_benchmark(self):
+        trace = generate_trace(duration=4, rate=10, burst_every=2, burst_size=5, seed=1)
+        results = await run_benchmark(trace, size=10, rate_limit=0.2, speed=20, seed_value=1)
+
+        # The results have to survive being written out as JSON.
+        results = json.loads(json.dumps(results))['results']
+
+        assert results['interactions'] == len(trace)
+        assert results['throughput'] > 0
+        assert results['loop_lag']['count'] > 0
+        assert results['rate_limited'] > 0
+
+        commands = results['commands']
+        assert commands['newevent']['count'] == sum(1 for i in trace if i['command'] == 'newevent')
+        assert commands['cancelevent:autocomplete']['count'] == sum(1 for i in trace if 'autocomplete' in i)
+        assert sum(command['errors'] for command in commands.values()) == 0
+
+    async def test_rate_limited_run_reports_errors(self):
+        trace = generate_trace(duration=4, rate=10, burst_every=2, burst_size=5, seed=1)
+        results = await run_benchmark(trace, size=10, rate_limit=1, speed=20, seed_value=1)
+
+        commands = results['results']['commands']
+        # Nothing can be created, so every new event, and every cancel of one, fails.
+        assert commands['newevent']['errors'] == commands['newevent']['count']
+        assert commands['cancelevent']['errors'] == commands['cancelevent']['count']
+        assert commands['cancelevent:autocomplete']['errors'] == 0
@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from unittest import IsolatedAsyncioTestCase
+
+from core.metrics import Histogram, Metrics, RateLimitLogHandler
+
+
+class MetricsTestCase(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for value in (0.001, 0.02, 0.02, 0.3, 4):
+            histogram.observe(value)
+
+        assert histogram.count == 5
+        assert histogram.mean == (0.001 + 0.02 + 0.02 + 0.3 + 4) / 5
+        assert histogram.quantile(0.5) == 0.025
+        assert histogram.quantile(0.95) == 4
+
+    async def test_instrument(self):
+        @self.metrics.instrument('test_seconds')
+        def sync_function():
+            return 1
+
+        @self.metrics.instrument('test_seconds')
+        async def async_function():
+            await asyncio.sleep(0)
+            return 2
+
+        assert sync_function() == 1
+        assert await async_function() == 2
+        assert await async_function() == 2
+
+        assert self.metrics.histogram('test_seconds', method='sync_function').count == 1
+        assert self.metrics.histogram('test_seconds', method='async_function').count == 2
+
+    def test_timed_records_failures(self):
+        with self.assertRaises(ValueError):
+            with self.metrics.timed('test_seconds', op='fail'):
+                raise ValueError()
+
+        assert self.metrics.histogram('test_seconds', op='fail').count == 1
+
+    def test_render(self):
+        self.metrics.observe('command_seconds', 0.02, command='newevent')
+        self.metrics.increment('discord_rate_limited_total', method='edit')
+        self.metrics.increment('discord_rate_limited_total', method='edit')
+        self.metrics.collectors.append(lambda: [('queue_depth', {'guild': 1}, 3)])
+
+        lines = self.metrics.render().splitlines()
+
+        assert '# TYPE eventnite_command_seconds histogram' in lines
+        assert 'eventnite_command_seconds_bucket{command="newevent",le="0.01"} 0' in lines
+        assert 'eventnite_command_seconds_bucket{command="newevent",le="0.025"} 1' in lines
+        assert 'eventnite_command_seconds_bucket{command="newevent",le="+Inf"} 1' in lines
+        assert 'eventnite_command_seconds_count{command="newevent"} 1' in lines
+        assert 'eventnite_discord_rate_limited_total{method="edit"} 2' in lines
+        assert 'eventnite_queue_depth{guild="1"} 3' in lines
+
+    def test_rate_limit_log_handler(self):
+        handler = RateLimitLogHandler(self.metrics)
+
+        # As py-cord logs them before sleeping out each 429 and retrying.
+        for msg, args in [('We are being rate limited. Retrying in %.2f seconds. Handled under the bucket "%s"',
+                           (1.5, 'None:123:/guilds/{guild_id}/scheduled-events')),
+                          ('Global rate limit has been hit. Retrying in %.2f seconds.', (1.5,))]:
+            handler.handle(logging.LogRecord('discord.http', logging.WARNING, __file__, 0, msg, args, None))
+
+        assert self.metrics.counter('discord_rate_limited_total', route='/guilds/{guild_id}/scheduled-events') == 1
+        assert sum(self.metrics.counters['discord_rate_limited_total'].values()) == 1
@@ -0,0 +1,69 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from discord import HTTPException
+
+from core.mutationqueue import MutationQueue, CREATE, EDIT, CANCEL
+from tests.fakeguild import FakeGuild
+
+
+def details(**kwargs) -> dict:
+    return {'description': '', 'start_time': None, 'end_time': None, 'location': 0} | kwargs
+
+
+class MutationQueueTestCase(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.guild = FakeGuild()
+        self.queue = MutationQueue(rate=1000)
+
+    async def test_edits_fold_into_create(self):
+        created = self.queue.submit('Event', self.guild, CREATE, name='Event', **details())
+        edited = self.queue.submit('Event', None, EDIT, name='Renamed Event', description='Edited')
+
+        assert len(self.queue) == 1
+        assert (await created).name == 'Renamed Event'
+        assert (await created).description == 'Edited'
+        assert await edited is await created
+        assert self.guild.calls == [('create', 'Renamed Event')]
+
+    async def test_cancel_drops_create(self):
+        created = self.queue.submit('Event', self.guild, CREATE, name='Event', **details())
+        cancelled = self.queue.submit('Event', None, CANCEL, reason='')
+
+        assert await created is None
+        assert await cancelled is None
+        assert len(self.queue) == 0
+
+        await self.queue.join()
+        assert self.guild.calls == []
+
+    async def test_edits_coalesce(self):
+        scheduled_event = await self.queue.submit('Event', self.guild, CREATE, name='Event', **details())
+
+        first = self.queue.submit('Event', scheduled_event, EDIT, description='First')
+        second = self.queue.submit('Event', scheduled_event, EDIT, description='Second')
+        await asyncio.gather(first, second)
+
+        assert self.guild.calls[1:] == [('edit', 'Event')]
+        assert scheduled_event.description == 'Second'
+        assert self.queue.stats()['coalesced'] == 1
+
+    async def test_edit_waits_for_in_flight_create(self):
+        created = self.queue.submit('Event', self.guild, CREATE, name='Event', **details())
+        await asyncio.sleep(0)
+
+        cancelled = self.queue.submit('Event', self.queue.created('Event'), CANCEL, reason='')
+        await asyncio.gather(created, cancelled)
+
+        assert [call for call, _ in self.guild.calls] == ['create', 'cancel']
+
+    async def test_rate_limit_retry(self):
+        self.guild.rate_limits = 2
+
+        assert (await self.queue.submit('Event', self.guild, CREATE, name='Event', **details())).name == 'Event'
+        assert self.queue.stats()['rate_limited'] == 2
+
+        self.guild.rate_limits = 3
+
+        with self.assertRaises(HTTPException):
+            await self.queue.submit('Other Event', self.guild, CREATE, name='Other Event', **details())
@@ -0,0 +1,26 @@
+from unittest import TestCase
+
+from core.nameindex import PrefixIndex, MAX_CHOICES
+
+
+class PrefixIndexTestCase(TestCase):
+    def test_complete(self):
+        index = PrefixIndex(['Game Night', 'game jam', 'Movie Night', 'Gardening'])
+
+        assert index.complete('ga') == ['game jam', 'Game Night', 'Gardening']
+        assert index.complete('GAME') == ['game jam', 'Game Night']
+        assert index.complete('x') == []
+        assert len(index.complete('')) == 4
+
+    def test_limit(self):
+        index = PrefixIndex(f'Event {i}' for i in range(100))
+
+        assert len(index.complete('event')) == MAX_CHOICES
+
+    def test_remove(self):
+        index = PrefixIndex(['Game Night', 'Game Jam'])
+        index.remove('Game Night')
+        index.remove('Missing Event')
+
+        assert index.complete('game') == ['Game Jam']
+
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from dateutil.tz import gettz
+from discord import ScheduledEventLocation, ScheduledEventStatus
+
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.reconcile import reconcile
+from tests.fakeguild import FakeGuild, FakeScheduledEvent
+
+
+class ReconcileTestCase(TestCase):
+    def scheduled_event(self, event: Event, status=ScheduledEventStatus.scheduled) -> FakeScheduledEvent:
+        return FakeScheduledEvent(self.guild, event.id, event.name, '',
+                                  event.date.astimezone(timezone.utc), event.end_date.astimezone(timezone.utc),
+                                  ScheduledEventLocation(state=self.guild, value=event.location),
+                                  event.creator_id, event.subscriber_count, status)
+
+    def setUp(self):
+        self.guild = FakeGuild()
+        self.start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        self.events = [Event(f'Event {i}', self.start + timedelta(days=i), 2, 10, 0, 1, i) for i in range(4)]
+        self.store = EventStore(self.events)
+
+    def test_unchanged(self):
+        result = reconcile(self.store, [self.scheduled_event(e) for e in self.events], {e.id for e in self.events})
+
+        assert not result
+        assert len(self.store) == 4
+
+    def test_diff(self):
+        changed = Event('Renamed Event', self.start + timedelta(days=5), 3, 10, 4, 1, 1)
+        new = Event('New Event', self.start, 1, 10, 0, 2, 10)
+
+        scheduled_events = [self.scheduled_event(self.events[0]),
+                            self.scheduled_event(changed),
+                            self.scheduled_event(self.events[2], ScheduledEventStatus.canceled),
+                            self.scheduled_event(new)]
+
+        result = reconcile(self.store, scheduled_events, {e.id for e in self.events}, tz=gettz('America/New_York'))
+
+        assert [e.name for e in result.added] == ['New Event']
+        assert [e.name for e in result.changed] == ['Renamed Event']
+        assert sorted(e.name for e in result.removed) == ['Event 2', 'Event 3']
+
+        assert sorted(e.name for e in self.store) == ['Event 0', 'New Event', 'Renamed Event']
+        assert self.store.get('Renamed Event').hours == 3
+        assert self.store.get('Renamed Event').subscriber_count == 4
+        assert self.store.get('Renamed Event').date == changed.date
+        assert self.store.get('New Event').date.utcoffset() == timedelta(hours=-5)
+
+    def test_events_added_during_fetch_are_kept(self):
+        result = reconcile(self.store, [], {0, 1})
+
+        assert sorted(e.name for e in result.removed) == ['Event 0', 'Event 1']
+        assert sorted(e.name for e in self.store) == ['Event 2', 'Event 3']
+
+    def test_skip_names(self):
+        result = reconcile(self.store, [], {e.id for e in self.events}, skip_names={'Event 0'})
+
+        assert len(result.removed) == 3
+        assert 'Event 0' in self.store
+
+    def test_skip_ids(self):
+        changed = Event('Renamed Event', self.start + timedelta(days=5), 3, 10, 4, 1, 1)
+        new = Event('New Event', self.start, 1, 10, 0, 2, 10)
+
+        result = reconcile(self.store, [self.scheduled_event(changed), self.scheduled_event(new)],
+                           {e.id for e in self.events}, skip_ids={1, 2, 10})
+
+        assert sorted(e.name for e in result.removed) == ['Event 0', 'Event 3']
+        assert sorted(e.name for e in self.store) == ['Event 1', 'Event 2']
+
+    def test_finished_events_not_added(self):
+        finished = Event('Finished Event', self.start - timedelta(hours=3), 2, 10, 0, 1, 10)
+        running = Event('Running Event', self.start - timedelta(hours=1), 2, 10, 0, 1, 11)
+
+        result = reconcile(self.store, [*(self.scheduled_event(e) for e in self.events),
+                                        self.scheduled_event(finished), self.scheduled_event(running)],
+                           {e.id for e in self.events}, now=self.start.timestamp())
+
+        assert [e.name for e in result.added] == ['Running Event']
+
+    def test_sub_hour_event(self):
+        short = Event('Short Event', self.start + timedelta(days=10), 0.5, 10, 0, 1, 20)
+
+        result = reconcile(self.store, [*(self.scheduled_event(e) for e in self.events), self.scheduled_event(short)],
+                           {e.id for e in self.events})
+
+        assert [e.name for e in result.added] == ['Short Event']
+        event = self.store.get('Short Event')
+        assert event.hours == 0.5
+        assert event.end_timestamp == (short.date + timedelta(minutes=30)).timestamp()
+        assert event.end_date - event.date == timedelta(minutes=30)
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase
+
+from discord import ScheduledEventStatus
+
+from core.scheduledeventmirror import ScheduledEventMirror
+from tests.fakeguild import FakeGuild
+
+
+class ScheduledEventMirrorTestCase(TestCase):
+    def setUp(self):
+        self.guild = FakeGuild(1)
+        start = datetime(2030, 1, 1, 20, tzinfo=timezone.utc)
+
+        self.first = self.guild.add('First Event', '', start, start + timedelta(hours=1), 0)
+        self.first.subscriber_count = 3
+        self.second = self.guild.add('Second Event', '', start, start + timedelta(hours=1), 0)
+
+        self.mirror = ScheduledEventMirror()
+        self.mirror.rebuild(1, self.guild.scheduled_events)
+
+    def test_lookup(self):
+        assert 1 in self.mirror and 2 not in self.mirror
+        assert self.mirror.get(1, self.first.id) is self.first
+        assert self.mirror.find(1, 'Second Event') == [self.second]
+        assert self.mirror.find(1, 'Missing Event') == []
+        assert self.mirror.find(2, 'First Event') == []
+
+    def test_complete(self):
+        self.second.status = ScheduledEventStatus.active
+        self.mirror.update(self.second)
+        self.mirror.add(self.guild.add('first look', '', None, None, 0))
+
+        assert self.mirror.complete(1, 'FIRST') == ['First Event', 'first look']
+        assert self.mirror.complete(1, 'second') == []
+        assert self.mirror.complete(2, '') == []
+
+        self.first.name = 'Renamed Event'
+        self.mirror.update(self.first)
+        self.second.status = ScheduledEventStatus.scheduled
+        self.mirror.update(self.second)
+
+        assert self.mirror.complete(1, '') == ['first look', 'Renamed Event', 'Second Event']
+
+        self.mirror.remove(self.first)
+
+        assert self.mirror.complete(1, '') == ['first look', 'Second Event']
+
+    def test_gateway_events(self):
+        start = datetime(2030, 2, 1, 20, tzinfo=timezone.utc)
+        third = self.guild.add('First Event', '', start, start + timedelta(hours=1), 0)
+        self.mirror.add(third)
+
+        assert self.mirror.find(1, 'First Event') == [self.first, third]
+
+        # Edited in place, as a scheduled event object is.
+        third.name = 'Third Event'
+        self.mirror.update(third)
+        assert self.mirror.find(1, 'First Event') == [self.first]
+        assert self.mirror.find(1, 'Third Event') == [third]
+
+        self.mirror.remove(third)
+        assert self.mirror.find(1, 'Third Event') == []
+
+        self.second.status = ScheduledEventStatus.completed
+        self.mirror.update(self.second)
+        assert self.mirror.find(1, 'Second Event') == []
+        assert len(self.mirror) == 1
+
+    def test_subscriber_counts(self):
+        assert self.mirror.subscriber_count(1, self.first.id) == 3
+
+        self.mirror.subscribed(1, self.first.id, 1)
+        self.mirror.subscribed(1, self.second.id, -1)
+        assert self.mirror.subscriber_count(1, self.first.id) == 4
+        assert self.mirror.subscriber_count(1, self.second.id) == 0
+
+        # Updates don't carry subscriber counts, so the counted one is kept.
+        self.mirror.update(self.first)
+        assert self.mirror.subscriber_count(1, self.first.id) == 4
+
+        self.mirror.remove(self.first)
+        assert self.mirror.subscriber_count(1, self.first.id) is None
+        assert self.mirror.subscriber_count(1, None) is None
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from unittest import IsolatedAsyncioTestCase
+
+from core.scheduler import Scheduler
+
+
+class SchedulerTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.scheduler = Scheduler()
+        self.scheduler.start()
+        self.fired = []
+
+    async def asyncTearDown(self):
+        self.scheduler.stop()
+
+    def callback(self, name):
+        async def fire():
+            self.fired.append(name)
+        return fire
+
+    async def test_fires_in_order(self):
+        now = time.time()
+        self.scheduler.schedule('b', now + 0.02, self.callback('b'))
+        self.scheduler.schedule('a', now + 0.01, self.callback('a'))
+        self.scheduler.schedule('past', now - 60, self.callback('past'))
+
+        await asyncio.sleep(0.1)
+
+        assert self.fired == ['past', 'a', 'b']
+        assert len(self.scheduler) == 0
+
+    async def test_schedule_many(self):
+        now = time.time()
+        self.scheduler.schedule('a', now + 60, self.callback('replaced'))
+        self.scheduler.schedule_many([('b', now + 0.02, self.callback('b')),
+                                      ('a', now + 0.01, self.callback('a'))])
+
+        await asyncio.sleep(0.1)
+
+        assert self.fired == ['a', 'b']
+        assert len(self.scheduler) == 0
+
+    async def test_earlier_entry_wakes_scheduler(self):
+        self.scheduler.schedule('later', time.time() + 60, self.callback('later'))
+        await asyncio.sleep(0)
+
+        self.scheduler.schedule('sooner', time.time(), self.callback('sooner'))
+        await asyncio.sleep(0.05)
+
+        assert self.fired == ['sooner']
+        assert 'later' in self.scheduler
+
+    async def test_replace_and_cancel(self):
+        now = time.time()
+        self.scheduler.schedule('a', now + 0.01, self.callback('first'))
+        self.scheduler.schedule('a', now + 0.01, self.callback('second'))
+        self.scheduler.schedule('b', now + 0.01, self.callback('b'))
+        self.scheduler.cancel('b')
+
+        await asyncio.sleep(0.05)
+
+        assert self.fired == ['second']
+
+    async def test_cancelled_entries_are_compacted(self):
+        for i in range(100):
+            self.scheduler.schedule(i, time.time() + 60, self.callback(i))
+        for i in range(90):
+            self.scheduler.cancel(i)
+
+        assert len(self.scheduler) == 10
+        assert len(self.scheduler._heap) < 100
+
+    async def test_stop_while_waking(self):
+        await asyncio.sleep(0)
+        task = self.scheduler._task
+
+        # The wakeup and the cancellation arrive together, and wait_for lets the wakeup win.
+        self.scheduler.schedule('a', time.time() + 60, self.callback('a'))
+        self.scheduler.stop()
+        await asyncio.sleep(0.01)
+
+        assert task.done()
+        assert task.cancelled() or task.exception() is None
+
+    async def test_failing_callback_does_not_stop_scheduler(self):
+        async def fail():
+            raise RuntimeError('Failed.')
+
+        now = time.time()
+        self.scheduler.schedule('fail', now, fail)
+        self.scheduler.schedule('a', now + 0.01, self.callback('a'))
+
+        with self.assertLogs(level='ERROR'):
+            await asyncio.sleep(0.05)
+
+        assert self.fired == ['a']
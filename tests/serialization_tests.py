@@ -0,0 +1,75 @@
+import importlib.util
+import os
+import types
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import skipUnless
+
+from dateutil.tz import gettz
+from pyfakefs.fake_filesystem_unittest import TestCase
+
+from core import consts, serialization
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.json_file import JsonFileStorage
+
+HAS_MSGPACK = importlib.util.find_spec('msgpack') is not None
+
+
+class SerializationTestCase(TestCase):
+    def setUp(self):
+        self.setUpPyfakefs()
+        os.makedirs(consts.data_folder(1))
+
+        start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        self.events = [Event(f'Event {i}', start + timedelta(days=i), 1, 0, id=i) for i in range(5)]
+        self.records = [e.to_dict() for e in self.events]
+
+    def round_trip(self, file_format: str):
+        path = Path(consts.data_folder(1), f'records.{file_format}')
+        serialization.write_records(path, (r for r in self.records), file_format)
+
+        with open(path, 'rb') as file:
+            assert serialization.detect_format(file) == file_format
+            assert file.tell() == 0
+
+        records = serialization.iter_records(path)
+        assert isinstance(records, types.GeneratorType)
+        assert list(records) == self.records
+
+    def test_json(self):
+        self.round_trip('json')
+
+    def test_ndjson(self):
+        self.round_trip('ndjson')
+
+    @skipUnless(HAS_MSGPACK, 'msgpack is not installed')
+    def test_msgpack(self):
+        self.round_trip('msgpack')
+
+    def test_empty_and_missing_files(self):
+        path = Path(consts.data_folder(1), 'records.ndjson')
+        serialization.write_records(path, [], 'ndjson')
+
+        assert list(serialization.iter_records(path)) == []
+        assert list(serialization.iter_records(Path(consts.data_folder(1), 'missing.json'))) == []
+
+    def test_check_format(self):
+        with self.assertRaises(ValueError):
+            serialization.check_format('yaml')
+
+        if not HAS_MSGPACK:
+            with self.assertRaises(ValueError):
+                serialization.check_format('msgpack')
+
+    def test_changing_format_converts_event_file(self):
+        consts.write_event_file(self.records, 1)
+
+        storage = JsonFileStorage(1, 'ndjson')
+        assert list(storage.load()) == self.events
+
+        storage.save_all(EventStore(self.events[:2]))
+
+        assert consts.event_file_path(1).name == 'events.ndjson'
+        assert not os.path.isfile(Path(consts.data_folder(1), 'events.json'))
+        assert consts.read_event_file(1) == self.records[:2]
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, date
+from itertools import islice
+from unittest import TestCase
+
+from dateutil.tz import gettz
+
+from core.objects.series import Series
+
+
+class SeriesTestCase(TestCase):
+    def setUp(self):
+        self.tz = gettz('America/New_York')
+        self.series = Series('Game Night', 'weekly', datetime(2030, 3, 1, 20, tzinfo=self.tz), 'America/New_York', 2)
+
+    def test_occurrences_keep_local_time_across_dst(self):
+        occurrences = list(islice(self.series.occurrences(datetime(2030, 2, 1, tzinfo=self.tz)), 3))
+
+        assert [d.hour for d in occurrences] == [20, 20, 20]
+        assert occurrences[0].utcoffset() == timedelta(hours=-5)
+        assert occurrences[2].utcoffset() == timedelta(hours=-4)
+
+    def test_exceptions(self):
+        self.series.exceptions.add(date(2030, 3, 8))
+
+        occurrences = list(islice(self.series.occurrences(datetime(2030, 3, 1, 21, tzinfo=self.tz)), 2))
+
+        assert [d.date() for d in occurrences] == [date(2030, 3, 15), date(2030, 3, 22)]
+
+    def test_round_trip(self):
+        self.series.exceptions.add(date(2030, 3, 8))
+        self.series.materialized_until = datetime(2030, 3, 15, 20, tzinfo=self.tz).timestamp()
+
+        assert Series.from_dict(self.series.to_dict()).to_dict() == self.series.to_dict()
+
+    def test_hours_as_string(self):
+        series = Series('Game Night', 'weekly', datetime(2030, 3, 1, 20, tzinfo=self.tz), 'America/New_York', '2')
+
+        assert series.hours == 2
+        assert Series.from_dict(series.to_dict()).hours == 2
+
+    def test_rrule(self):
+        series = Series('Game Night', 'RRULE:FREQ=MONTHLY;BYDAY=1FR', datetime(2030, 3, 1, 20, tzinfo=self.tz),
+                        'America/New_York', 2)
+
+        occurrences = list(islice(series.occurrences(datetime(2030, 3, 2, tzinfo=self.tz)), 2))
+
+        assert [d.date() for d in occurrences] == [date(2030, 4, 5), date(2030, 5, 3)]
+
+    def test_invalid_rule(self):
+        with self.assertRaises(ValueError):
+            Series('Game Night', 'every other tuesday', datetime(2030, 3, 1, 20, tzinfo=self.tz),
+                   'America/New_York', 2)
@@ -0,0 +1,55 @@
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from dateutil.tz import gettz
+
+from core.objects.event import Event
+from core.storage.sqlite import SqliteStorage
+
+
+class SqliteStorageTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.db_path = Path(self.temp_dir.name, 'events.db')
+        self.storage = SqliteStorage(self.db_path)
+
+        self.start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+
+    def tearDown(self):
+        self.storage.close()
+        self.temp_dir.cleanup()
+
+    def test_put_and_delete(self):
+        for i in range(3):
+            self.storage.put(None, Event(f'Event {i}', self.start + timedelta(days=i), 1, 0, id=i))
+
+        self.storage.put(None, Event('Edited Event', self.start, 2, 0, id=0), replaces='Event 0')
+        self.storage.delete(None, 'Event 1')
+
+        self.storage.close()
+        self.storage = SqliteStorage(self.db_path)
+
+        assert [e.name for e in self.storage.load()] == ['Edited Event', 'Event 2']
+
+    def test_load_uses_index(self):
+        plan = self.storage._connection.execute('EXPLAIN QUERY PLAN SELECT data FROM events WHERE guild_id = ? '
+                                                'ORDER BY date', (0,)).fetchall()
+
+        # One step, so the rows come out of the index in order rather than being sorted afterwards.
+        assert len(plan) == 1 and 'events_guild_date' in plan[0][-1]
+
+    def test_migrate_json(self):
+        event_path = Path(self.temp_dir.name, 'events.json')
+        with open(event_path, 'w') as event_file:
+            json.dump([Event(f'Event {i}', self.start + timedelta(days=i), 1, 0).to_dict() for i in range(3)],
+                      event_file)
+
+        assert self.storage.migrate_json(event_path) == 3
+        assert not os.path.isfile(event_path)
+        assert len(self.storage.load()) == 3
+
+        assert self.storage.migrate_json(event_path) == 0
@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest import TestCase
+
+from benchmarks.startup_bench import run_benchmarks
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class StartupTestCase(TestCase):
+    def test_core_imports_without_discord(self):
+        # A fresh interpreter, since this one has already imported discord for the other tests.
+        modules = ['core.consts', 'core.eventstore', 'core.guildstate', 'core.importer', 'core.objects.event',
+                   'core.objects.series', 'core.scheduler', 'core.storage.factory', 'core.utils.config_utils']
+        code = ''.join(f'import {module}\n' for module in modules) + 'import sys\nprint("discord" in sys.modules)'
+
+        output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+        assert output.stdout.strip() == 'False'
+
+    def test_run_benchmarks(self):
+        results = json.loads(json.dumps(run_benchmarks(sizes=[10], guilds=2, runs=1)))
+
+        result = results['results'][0]
+        assert result['events'] == 20
+        assert not result['core_imports_discord']
+        for stage in ('core_import', 'main_import', 'load_guilds', 'total'):
+            assert result[stage]['count'] == 1
@@ -0,0 +1,66 @@
+import os
+from datetime import datetime, timedelta
+from unittest import IsolatedAsyncioTestCase
+
+from dateutil.tz import gettz
+
+from core.calendarfeed import CalendarFeed
+from core.eventstore import EventStore
+from core.importer import parse_ics, parse_import_file
+from core.objects.event import Event
+from core.workerpool import WorkerPool
+
+
+class WorkerPoolTestCase(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.workers = WorkerPool(1, {'import': 100, 'export': 3})
+
+    def tearDown(self):
+        self.workers.close()
+
+    async def test_thresholds(self):
+        assert await self.workers.run('import', os.getpid, size=99) == os.getpid()
+        assert self.workers.offloaded == 0
+
+        assert await self.workers.run('import', os.getpid, size=100) != os.getpid()
+        assert self.workers.offloaded == 1
+
+        # Jobs without a threshold of their own are always offloaded.
+        assert self.workers.offloads('other', 0)
+
+    async def test_no_processes(self):
+        workers = WorkerPool(0, {'import': 0})
+
+        assert await workers.run('import', os.getpid, size=10 ** 9) == os.getpid()
+        assert workers._executor is None
+
+    async def test_parse_import_file(self):
+        text = 'name,date,hours\n' + ''.join(f'Event {i},January {i + 1} 2030 8pm ET,2\n'
+                                               for i in range(10))
+
+        rows = await self.workers.run('import', parse_import_file, 'events.csv', text, size=len(text))
+
+        assert self.workers.offloaded == 1
+        assert [(row.name, row.date, row.hours) for row in rows] == \
+               [(row.name, row.date, row.hours) for row in parse_import_file('events.csv', text)]
+        assert rows[0].date == datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+
+    async def test_calendar_export(self):
+        start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        store = EventStore([Event(f'Event {i}', start + timedelta(days=i), 2, 0, id=i + 1) for i in range(5)])
+        feed = CalendarFeed(lambda guild_id: store, workers=self.workers)
+
+        await feed.prepare(1)
+        assert self.workers.offloaded == 1
+
+        body, _ = feed.render(1)
+        rows = parse_ics(body)
+        assert [row.name for row in rows] == [f'Event {i}' for i in range(5)]
+        assert rows[1].date == start + timedelta(days=1)
+        assert 'URL:https://discord.com/events/1/2\r\n' in body
+
+        # Too few changed events to be worth a worker.
+        store.replace('Event 1', Event('Event 1', start + timedelta(days=10), 1, 0, id=2))
+        await feed.prepare(1)
+        assert self.workers.offloaded == 1
+        assert [row.name for row in parse_ics(feed.render(1)[0])][-1] == 'Event 1'
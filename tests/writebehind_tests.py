@@ -0,0 +1,138 @@
+import asyncio
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+
+from dateutil.tz import gettz
+
+from core.eventstore import EventStore
+from core.objects.event import Event
+from core.storage.base import EventStorage
+from core.storage.journal import EventJournal
+from core.storage.writebehind import WriteBehindStorage
+
+
+class RecordingStorage(EventStorage):
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+        self.fail = False
+
+    def _record(self, *call):
+        if self.fail:
+            raise OSError('Disk full.')
+
+        self.calls.append(call)
+        self.threads.add(threading.current_thread().name)
+
+    def load(self):
+        return []
+
+    def put_many(self, store, events):
+        self._record('put_many', sorted(e.name for e in events), len(store) if store is not None else None)
+
+    def delete(self, store, event_name):
+        self._record('delete', event_name, len(store) if store is not None else None)
+
+    def save_all(self, store):
+        self._record('save_all', len(store))
+
+
+class WriteBehindTestCase(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.start = datetime(2030, 1, 1, 20, tzinfo=gettz('America/New_York'))
+        self.store = EventStore()
+        self.recording = RecordingStorage()
+        self.storage = WriteBehindStorage(self.recording, delay=0.01)
+
+    def tearDown(self):
+        self.storage.close()
+
+    def add(self, name: str, days: int = 0) -> Event:
+        event = Event(name, self.start + timedelta(days=days), 1, 0)
+        self.store.add(event)
+        self.storage.put(self.store, event)
+        return event
+
+    async def test_batches_changes(self):
+        self.add('Event 0')
+        self.add('Event 1', 1)
+        self.add('Event 2', 2)
+        self.store.remove('Event 1')
+        self.storage.delete(self.store, 'Event 1')
+
+        assert self.recording.calls == []
+
+        await asyncio.sleep(0.05)
+
+        # The store's contents aren't copied for storages that only write the changes.
+        assert self.recording.calls == [('delete', 'Event 1', None), ('put_many', ['Event 0', 'Event 2'], None)]
+        assert self.recording.threads != {threading.current_thread().name}
+
+    async def test_snapshot_when_needed(self):
+        self.recording.rewrites_all = True
+        self.add('Event 0')
+        await self.storage.flush()
+
+        assert self.recording.calls == [('save_all', 1)]
+
+    async def test_journal_compacts(self):
+        with tempfile.TemporaryDirectory() as folder:
+            journal = EventJournal(Path(folder), compact_after=3)
+            storage = WriteBehindStorage(journal, delay=0.01)
+
+            for i in range(5):
+                event = Event(f'Event {i}', self.start + timedelta(days=i), 1, 0)
+                self.store.add(event)
+                storage.put(self.store, event)
+                # One change per batch, so the third is the one that has to bring the store along.
+                await storage.flush()
+            storage.close()
+
+            assert Path(folder, 'events.json').is_file()
+            assert [e.name for e in EventJournal(Path(folder)).load()] == [f'Event {i}' for i in range(5)]
+
+    async def test_rename(self):
+        event = self.add('Event 0')
+        await self.storage.flush()
+
+        renamed = Event('Renamed Event', event.date, 1, 0)
+        self.store.replace('Event 0', renamed)
+        self.storage.put(self.store, renamed, replaces='Event 0')
+        await self.storage.flush()
+
+        assert self.recording.calls[1:] == [('delete', 'Event 0', None), ('put_many', ['Renamed Event'], None)]
+
+    async def test_save_all_supersedes_changes(self):
+        self.add('Event 0')
+        self.storage.save_all(self.store)
+        await self.storage.flush()
+
+        assert self.recording.calls == [('save_all', 1)]
+
+    async def test_failed_write_is_retried_in_full(self):
+        self.recording.fail = True
+        self.add('Event 0')
+
+        with self.assertLogs(level='ERROR'), self.assertRaises(OSError):
+            await self.storage.flush()
+
+        self.recording.fail = False
+        await self.storage.flush()
+
+        assert self.recording.calls == [('save_all', 1)]
+
+    async def test_close_writes_outstanding_changes(self):
+        self.storage.delay = 60
+        self.add('Event 0')
+
+        self.storage.close()
+
+        assert self.recording.calls == [('put_many', ['Event 0'], 1)]
+
+    def test_writes_straight_away_without_event_loop(self):
+        self.add('Event 0')
+
+        assert self.recording.calls == [('put_many', ['Event 0'], 1)]